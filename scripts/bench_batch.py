@@ -0,0 +1,141 @@
+"""Benchmark the column conversions against the scalar conversions.
+
+Converts random observations with both, checks that the results are the
+same, and reports the time for a year of minute data:
+
+    python scripts/bench_batch.py
+    python scripts/bench_batch.py --rows 525600 --units imperial
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weatherflow2mqtt.batch import BatchConversionFunctions, column  # noqa: E402
+from weatherflow2mqtt.const import (  # noqa: E402
+    UNITS_IMPERIAL,
+    UNITS_METRIC,
+    WETBULB_METHOD_NEWTON,
+    WETBULB_METHOD_STULL,
+)
+from weatherflow2mqtt.helpers import ConversionFunctions  # noqa: E402
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+ELEVATION = 35.2
+
+
+def timed(function, *args) -> tuple[float, list]:
+    """Return the seconds the function took and its result."""
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, list(result)
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--units", choices=(UNITS_METRIC, UNITS_IMPERIAL), default=UNITS_METRIC)
+    parser.add_argument(
+        "--wetbulb", choices=(WETBULB_METHOD_NEWTON, WETBULB_METHOD_STULL),
+        default=WETBULB_METHOD_NEWTON,
+    )
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    rows = args.rows
+    temperatures = [rnd.uniform(-30, 45) for _ in range(rows)]
+    humidities = [rnd.uniform(5, 100) for _ in range(rows)]
+    pressures = [rnd.uniform(950, 1050) for _ in range(rows)]
+    wind_speeds = [rnd.uniform(0, 25) for _ in range(rows)]
+    solar_radiations = [rnd.uniform(0, 1200) for _ in range(rows)]
+
+    cnv = ConversionFunctions(args.units, "en", args.wetbulb)
+    batch = BatchConversionFunctions(cnv)
+    columns = {
+        "temperatures": column(temperatures),
+        "humidities": column(humidities),
+        "pressures": column(pressures),
+        "wind_speeds": column(wind_speeds),
+        "solar_radiations": column(solar_radiations),
+    }
+    cases = {
+        "temperature": (
+            lambda: [cnv.temperature(t) for t in temperatures],
+            lambda: batch.temperature(columns["temperatures"]),
+        ),
+        "dewpoint": (
+            lambda: [cnv.dewpoint(t, h) for t, h in zip(temperatures, humidities)],
+            lambda: batch.dewpoint(columns["temperatures"], columns["humidities"]),
+        ),
+        "feels_like": (
+            lambda: [
+                cnv.feels_like(t, h, w)
+                for t, h, w in zip(temperatures, humidities, wind_speeds)
+            ],
+            lambda: batch.feels_like(
+                columns["temperatures"], columns["humidities"], columns["wind_speeds"]
+            ),
+        ),
+        "visibility": (
+            lambda: [
+                cnv.visibility(ELEVATION, t, h) for t, h in zip(temperatures, humidities)
+            ],
+            lambda: batch.visibility(ELEVATION, columns["temperatures"], columns["humidities"]),
+        ),
+        "wetbulb": (
+            lambda: [
+                cnv.wetbulb(t, h, p) for t, h, p in zip(temperatures, humidities, pressures)
+            ],
+            lambda: batch.wetbulb(
+                columns["temperatures"], columns["humidities"], columns["pressures"]
+            ),
+        ),
+        "wbgt": (
+            lambda: [
+                cnv.wbgt(t, h, p, s)
+                for t, h, p, s in zip(temperatures, humidities, pressures, solar_radiations)
+            ],
+            lambda: batch.wbgt(
+                columns["temperatures"],
+                columns["humidities"],
+                columns["pressures"],
+                columns["solar_radiations"],
+            ),
+        ),
+    }
+
+    year = MINUTES_PER_YEAR / rows
+    total_scalar = total_batch = 0.0
+    failed = False
+    print(f"{rows} rows, {args.units}, {args.wetbulb}. Seconds per year of minute data:")
+    for name, (scalar, batched) in cases.items():
+        scalar_time, expected = timed(scalar)
+        batch_time, result = timed(batched)
+        total_scalar += scalar_time
+        total_batch += batch_time
+        same = all(
+            value == scalar_value or (math.isnan(value) and scalar_value is None)
+            for value, scalar_value in zip(result, expected)
+        )
+        failed |= not same
+        print(
+            f"  {name:12} scalar {scalar_time * year:7.2f} s"
+            f"  batch {batch_time * year:7.2f} s"
+            f"  {scalar_time / batch_time:4.1f}x{'' if same else '  DIFFERENT RESULTS'}"
+        )
+    print(
+        f"  {'total':12} scalar {total_scalar * year:7.2f} s"
+        f"  batch {total_batch * year:7.2f} s  {total_scalar / total_batch:4.1f}x"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Benchmark the cached unit conversions against pint.
+
+Times `convert_quantity` and `Quantity.to` for the unit pairs the sensors
+convert:
+
+    python scripts/bench_convert_quantity.py
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyweatherflowudp.const import (  # noqa: E402
+    UNIT_DEGREES_CELSIUS,
+    UNIT_METERS,
+    UNIT_METERS_PER_SECOND,
+    UNIT_MILLIBARS,
+    UNIT_MILLIMETERS_PER_HOUR,
+)
+
+from weatherflow2mqtt.helpers import convert_quantity  # noqa: E402
+
+PAIRS = (
+    (22.37 * UNIT_DEGREES_CELSIUS, "°F"),
+    (22.37 * UNIT_DEGREES_CELSIUS, "°C"),
+    (1017.57 * UNIT_MILLIBARS, "inHg"),
+    (0.22 * UNIT_METERS_PER_SECOND, "mph"),
+    (2.4 * UNIT_MILLIMETERS_PER_HOUR, "in/h"),
+    (1250 * UNIT_METERS, "ft"),
+)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=20000, help="Conversions to time")
+    args = parser.parse_args()
+
+    for quantity, unit in PAIRS:
+        cached = timeit.timeit(lambda: convert_quantity(quantity, unit), number=args.number)
+        pint = timeit.timeit(lambda: quantity.to(unit).m, number=args.number)
+        label = f"{quantity.units:~P} -> {unit}"
+        print(
+            f"{label:14}"
+            f"  convert_quantity {cached / args.number * 1e6:6.2f} us"
+            f"  pint {pint / args.number * 1e6:6.2f} us"
+            f"  {pint / cached:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Benchmark the throughput of the UDP to MQTT path on each event loop.
+
+Datagrams are sent over loopback to the UDP listener, handled by
+WeatherFlowMqtt and published to a client that only records the messages,
+so the numbers show the cost of the handlers and the event loop:
+
+    python scripts/bench_event_loop.py --messages 5000
+    python scripts/bench_event_loop.py --kind obs_st --messages 500
+
+Observations write to SQLite, so fewer of them are needed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Doesn't import the constants, which read the data directory when imported
+from weatherflow2mqtt.event_loop import (  # noqa: E402
+    EVENT_LOOP_ASYNCIO,
+    EVENT_LOOP_UVLOOP,
+    set_event_loop,
+)
+
+HOST = "127.0.0.1"
+PORT = 50333
+HUB_STATUS = {
+    "serial_number": "HB-00000001",
+    "type": "hub_status",
+    "firmware_revision": "35",
+    "uptime": 1670133,
+    "rssi": -62,
+    "timestamp": 0,
+    "reset_flags": "BOR,PIN,POR",
+    "seq": 48,
+    "fs": [1, 0, 15675411, 524288],
+    "radio_stats": [2, 1, 0, 3, 2839],
+    "mqtt_stats": [1, 0],
+}
+DEVICE_STATUS = {
+    "serial_number": "ST-00000512",
+    "type": "device_status",
+    "hub_sn": "HB-00000001",
+    "timestamp": 0,
+    "uptime": 2189,
+    "voltage": 2.60,
+    "firmware_revision": 17,
+    "rssi": -17,
+    "hub_rssi": -87,
+    "sensor_status": 0,
+    "debug": 0,
+}
+OBS_ST = {
+    "serial_number": "ST-00000512",
+    "type": "obs_st",
+    "hub_sn": "HB-00000001",
+    "obs": [
+        [0, 0.18, 0.22, 0.27, 144, 6, 1017.57, 22.37, 50.26, 328, 0.03, 3, 0, 0, 0, 0, 2.41, 1]
+    ],
+    "firmware_revision": 129,
+}
+RAPID_WIND = {
+    "serial_number": "ST-00000512",
+    "type": "rapid_wind",
+    "hub_sn": "HB-00000001",
+    "ob": [0, 2.3, 128],
+}
+
+
+class PublishResult:
+    """Result of a publish that succeeded."""
+
+    rc = 0
+
+    def __init__(self, mid: int) -> None:
+        self.mid = mid
+
+
+class RecordingClient:
+    """MQTT client that records the messages instead of sending them."""
+
+    def __init__(self) -> None:
+        self.published = 0
+        self.on_connect = None
+
+    def is_connected(self) -> bool:
+        return True
+
+    def publish(self, topic, payload=None, qos=0, retain=False) -> PublishResult:
+        self.published += 1
+        return PublishResult(self.published)
+
+    def loop_stop(self) -> None:
+        pass
+
+
+def datagram(message: dict) -> bytes:
+    """Return a message stamped with the current time."""
+    now = int(time.time())
+    message = json.loads(json.dumps(message))
+    if "timestamp" in message:
+        message["timestamp"] = now
+    for row in message.get("obs", []):
+        row[0] = now
+    if "ob" in message:
+        message["ob"][0] = now
+    return json.dumps(message).encode()
+
+
+async def run(kind: str, count: int, directory: str) -> tuple[float, float]:
+    """Send `count` datagrams and return the datagrams and publishes per second."""
+    from weatherflow2mqtt import weatherflow_mqtt
+
+    database = os.path.join(directory, "weatherflow2mqtt.db")
+    weatherflow = weatherflow_mqtt.WeatherFlowMqtt(
+        elevation=30,
+        latitude=55.6,
+        longitude=12.5,
+        unit_system="metric",
+        language="en",
+        database_file=database,
+        rapid_wind_interval=0,
+        mqtt_config=weatherflow_mqtt.MqttConfig(rate_limit=0),
+        udp_config=weatherflow_mqtt.WeatherFlowUdpConfig(host=HOST, port=PORT),
+    )
+    # Publish to the recording client, without a broker or rate limit
+    output = weatherflow.mqtt_outputs[0]
+    output.attach_client(client := RecordingClient())
+    client.on_connect(client, None, {}, 0)
+    weatherflow._init_sql_db(database)
+    weatherflow.listener = weatherflow_mqtt.WeatherFlowListener(HOST, PORT)
+    weatherflow.listener.on(
+        weatherflow_mqtt.EVENT_DEVICE_DISCOVERED, weatherflow._device_discovered
+    )
+    await weatherflow.listener.start_listening()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # Discover the hub and the device first
+    for message in (HUB_STATUS, DEVICE_STATUS, OBS_ST):
+        sock.sendto(datagram(message), (HOST, PORT))
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.2)
+    await output.join()
+
+    data = datagram(RAPID_WIND if kind == "rapid_wind" else OBS_ST)
+    published = client.published
+    start = time.perf_counter()
+    sent = 0
+    while sent < count:
+        # Send in bursts small enough for the socket buffer
+        for _ in range(50):
+            sock.sendto(data, (HOST, PORT))
+        sent += 50
+        await asyncio.sleep(0)
+        while output.health["queue_size"]:
+            await asyncio.sleep(0)
+    await output.join()
+    elapsed = time.perf_counter() - start
+
+    sock.close()
+    await weatherflow.listener.stop_listening()
+    await weatherflow.close()
+    return sent / elapsed, (client.published - published) / elapsed
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--kind", choices=("rapid_wind", "obs_st"), default="rapid_wind"
+    )
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument(
+        "--loops",
+        default=f"{EVENT_LOOP_ASYNCIO},{EVENT_LOOP_UVLOOP}",
+        help="Comma-separated event loops to compare",
+    )
+    args = parser.parse_args()
+
+    if len(loops := args.loops.split(",")) > 1:
+        # Each loop gets a new interpreter, so the runs don't affect each other
+        for name in loops:
+            subprocess.run(
+                [sys.executable, __file__, "--kind", args.kind,
+                 "--messages", str(args.messages), "--loops", name],
+                check=True,
+            )
+        return
+
+    logging.disable(logging.WARNING)
+    if set_event_loop(name := loops[0]) != name:
+        print(f"{name:8} not available")
+        return
+    with tempfile.TemporaryDirectory(prefix="weatherflow2mqtt_bench_") as directory:
+        # The data directory is read when the constants are imported
+        os.environ["EXTERNAL_DIRECTORY"] = directory
+        datagrams, publishes = asyncio.run(run(args.kind, args.messages, directory))
+    print(
+        f"{name:8} {args.kind:10} {datagrams:9.0f} datagrams/s"
+        f" {publishes:9.0f} publishes/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark formatting a 10 day forecast response.
+
+Times `Forecast.format_forecast` on tests/fixtures/better_forecast.json, 10
+days and 240 hours, and the daily aggregation and condition lookups against
+the loops they replaced:
+
+    python scripts/bench_forecast.py
+    python scripts/bench_forecast.py --number 2000 --units imperial
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+
+from weatherflow2mqtt.const import (  # noqa: E402
+    CONDITION_CLASSES,
+    UNITS_IMPERIAL,
+    UNITS_METRIC,
+)
+from weatherflow2mqtt.forecast import CONDITION_BY_ICON, Forecast  # noqa: E402
+from weatherflow2mqtt.helpers import ConversionFunctions  # noqa: E402
+
+FIXTURE = os.path.join(ROOT_DIRECTORY, "tests", "fixtures", "better_forecast.json")
+
+
+def load_payload() -> dict:
+    """Return the forecast response, moved to today so no day or hour is skipped."""
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        payload = json.load(fixture)
+    # The days are skipped by their local date, like on the station
+    os.environ["TZ"] = payload["timezone"]
+    time.tzset()
+    # Whole days, so the hours still fall on the same days
+    days = -(-(time.time() - payload["current_conditions"]["time"]) // 86400)
+    shift = int(days) * 86400
+    for row in payload["forecast"]["daily"]:
+        row["day_start_local"] += shift
+    for row in payload["forecast"]["hourly"]:
+        row["time"] += shift
+    return payload
+
+
+def legacy_aggregate(forecast_data: dict) -> dict:
+    """Aggregate the hourly rows of each day by scanning them all, like the loop did."""
+    days = {}
+    for row in forecast_data["daily"]:
+        precip = 0
+        wind_avg = []
+        wind_bearing = []
+        for hourly in forecast_data["hourly"]:
+            if hourly["local_day"] == row["day_num"]:
+                precip += hourly["precip"]
+                wind_avg.append(hourly["wind_avg"])
+                wind_bearing.append(hourly["wind_direction"])
+        days[row["day_num"]] = (
+            precip,
+            sum(wind_avg) / len(wind_avg),
+            int(sum(wind_bearing) / len(wind_bearing) % 360),
+        )
+    return days
+
+
+def legacy_conditions(icons: list[str]) -> list[str | None]:
+    """Look up the conditions with a linear search, like before the reverse index."""
+    return [
+        next((k for k, v in CONDITION_CLASSES.items() if icon in v), None) for icon in icons
+    ]
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=500, help="Responses to format")
+    parser.add_argument("--units", choices=(UNITS_METRIC, UNITS_IMPERIAL), default=UNITS_METRIC)
+    args = parser.parse_args()
+
+    payload = load_payload()
+    forecast_data = payload["forecast"]
+    icons = [row["icon"] for row in forecast_data["daily"] + forecast_data["hourly"]]
+    forecast = Forecast("12345", "token", conversions=ConversionFunctions(args.units, "en"))
+
+    def report(label: str, seconds: float, legacy: float | None = None) -> None:
+        line = f"{label:20} {seconds / args.number * 1e6:9.1f} us"
+        if legacy is not None:
+            line += f"  legacy {legacy / args.number * 1e6:9.1f} us  {legacy / seconds:5.1f}x"
+        print(line)
+
+    report(
+        "aggregate_hourly",
+        timeit.timeit(
+            lambda: Forecast.aggregate_hourly(forecast_data["hourly"]), number=args.number
+        ),
+        timeit.timeit(lambda: legacy_aggregate(forecast_data), number=args.number),
+    )
+    report(
+        "conditions",
+        timeit.timeit(lambda: [CONDITION_BY_ICON.get(icon) for icon in icons], number=args.number),
+        timeit.timeit(lambda: legacy_conditions(icons), number=args.number),
+    )
+    report(
+        "format_forecast",
+        timeit.timeit(lambda: forecast.format_forecast(payload), number=args.number),
+    )
+
+
+if __name__ == "__main__":
+    main()
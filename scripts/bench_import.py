@@ -0,0 +1,164 @@
+"""Benchmark the time it takes to import the application.
+
+Runs `python -X importtime` on the main module several times and reports the
+median cumulative import time of the module and of each module it imports
+directly. The same module is imported from a reference revision, checked out
+in a temporary git worktree, in turns with this checkout, so both are timed
+on the same machine under the same load. Exits with an error if:
+
+- a package that is only needed by optional features is imported, or
+- the median import time is more than the tolerance above the reference.
+
+The reference revision and the tolerance, as a fraction, are read from
+`IMPORT_TIME_REFERENCE` (default: HEAD) and `IMPORT_TIME_TOLERANCE`
+(default: 0.3), or given as arguments:
+
+    python scripts/bench_import.py --reference origin/main --tolerance 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+MODULE = "weatherflow2mqtt.weatherflow_mqtt"
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages that must only be imported once the feature using them is enabled
+LAZY_PACKAGES = (
+    # Forecasts, the Supervisor API and webhook event sinks
+    "aiohttp",
+    # config.yaml
+    "yaml",
+    # EVENT_LOOP=uvloop
+    "uvloop",
+)
+
+
+def import_times(module: str, directory: str) -> tuple[int, dict[str, int], list[str]]:
+    """Import a module from a checkout in a new interpreter.
+
+    Returns the cumulative import time of the module in microseconds, the
+    cumulative time of each module imported while importing it, by name, and
+    the names of the modules it imported directly.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+        # Import the package from the checkout
+        cwd=directory,
+    )
+    times: dict[str, int] = {}
+    direct: list[str] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, field = line[len("import time:"):].split("|")
+        name = field.strip()
+        # A module is reported after everything it imported, indented by depth
+        depth = (len(field) - len(field.lstrip()) - 1) // 2
+        if name == module:
+            return int(cumulative), times, direct
+        if depth == 0:
+            # A module imported before this one, like the site packages
+            times.clear()
+            direct.clear()
+            continue
+        times[name] = int(cumulative)
+        if depth == 1:
+            direct.append(name)
+    raise RuntimeError(f"{module} was not imported")
+
+
+@contextmanager
+def worktree(revision: str) -> Iterator[str | None]:
+    """Check out a revision in a temporary worktree, or yield `None` if it can't be."""
+    with tempfile.TemporaryDirectory(prefix="weatherflow2mqtt_reference_") as directory:
+        path = os.path.join(directory, "reference")
+        result = subprocess.run(
+            ["git", "worktree", "add", "--detach", path, revision],
+            capture_output=True,
+            cwd=ROOT_DIRECTORY,
+            text=True,
+        )
+        if result.returncode:
+            print(f"Could not check out {revision}: {result.stderr.strip()}")
+            yield None
+            return
+        try:
+            yield path
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", path],
+                capture_output=True,
+                cwd=ROOT_DIRECTORY,
+            )
+
+
+def main() -> int:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=7, help="Number of imports to time")
+    parser.add_argument(
+        "--reference",
+        default=os.getenv("IMPORT_TIME_REFERENCE", "HEAD"),
+        help="Revision to compare with (default: HEAD)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=float(os.getenv("IMPORT_TIME_TOLERANCE", "0.3")),
+        help="Allowed increase over the reference, as a fraction (default: 0.3)",
+    )
+    args = parser.parse_args()
+
+    totals = []
+    reference = []
+    per_module: dict[str, list[int]] = {}
+    with worktree(args.reference) as reference_directory:
+        # The first import writes the bytecode, so it isn't timed
+        for directory in (ROOT_DIRECTORY, reference_directory):
+            if directory is not None:
+                import_times(MODULE, directory)
+        # Alternate between the checkouts, so a change in load affects both
+        for _ in range(args.runs):
+            total, times, direct = import_times(MODULE, ROOT_DIRECTORY)
+            totals.append(total)
+            for name, cumulative in times.items():
+                per_module.setdefault(name, []).append(cumulative)
+            if reference_directory is not None:
+                reference.append(import_times(MODULE, reference_directory)[0])
+    total = statistics.median(totals) / 1000
+
+    print(f"{MODULE}: {total:.1f} ms (median of {args.runs} runs)")
+    costs = {name: statistics.median(per_module[name]) / 1000 for name in direct}
+    for name, cost in sorted(costs.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {cost:8.1f} ms  {name}")
+
+    failed = False
+    if imported := sorted(
+        {name.split(".")[0] for name in per_module} & set(LAZY_PACKAGES)
+    ):
+        print(f"FAIL: imported at startup: {', '.join(imported)}")
+        failed = True
+
+    if reference:
+        baseline = statistics.median(reference) / 1000
+        limit = baseline * (1 + args.tolerance)
+        print(f"{args.reference}: {baseline:.1f} ms, limit: {limit:.1f} ms")
+        if total > limit:
+            print(f"FAIL: import time regressed by {total / baseline - 1:.0%}")
+            failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Benchmark the JSON serializers on typical MQTT payloads.
+
+Reports the payloads and the bytes written per second by each serializer
+that is installed:
+
+    python scripts/bench_serializer.py
+    python scripts/bench_serializer.py --payload observation --seconds 2
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weatherflow2mqtt.serializer import (  # noqa: E402
+    SERIALIZER_JSON,
+    SERIALIZER_ORJSON,
+    get_serializer,
+    orjson,
+)
+
+OBSERVATION = {
+    "air_temperature": 22.37,
+    "relative_humidity": 50.26,
+    "sealevel_pressure": 1021.2,
+    "station_pressure": 1017.57,
+    "wind_lull": 0.18,
+    "wind_speed_avg": 0.22,
+    "wind_gust": 0.27,
+    "wind_bearing_avg": 144,
+    "wind_direction": "SE",
+    "illuminance": 328,
+    "uv": 0.03,
+    "uv_description": "Low",
+    "solar_radiation": 3,
+    "rain_rate": 0.0,
+    "precipitation_type": "None",
+    "battery": 2.41,
+    "dewpoint": 11.4,
+    "dewpoint_description": "Comfortable",
+    "feelslike": 22.4,
+    "wetbulb": 15.6,
+    "delta_t": 6.8,
+    "visibility": 25.4,
+    "pressure_trend": "Steady",
+    "pressure_trend_value": 0.2,
+    "beaufort": 0,
+    "beaufort_description": "Calm",
+}
+DISCOVERY = {
+    "name": "Air Temperature",
+    "unique_id": "ST-00000512-air_temperature",
+    "unit_of_measurement": "°C",
+    "device_class": "temperature",
+    "state_class": "measurement",
+    "state_topic": "homeassistant/sensor/weatherflow2mqtt_ST-00000512/observation/state",
+    "value_template": "{{ value_json.air_temperature }}",
+    "json_attributes_topic": "homeassistant/sensor/weatherflow2mqtt_ST-00000512/high_low/state",
+    "json_attributes_template": '{"attribution": "Powered by WeatherFlow2MQTT"}',
+    "availability_topic": "homeassistant/sensor/weatherflow2mqtt_ST-00000512/status",
+    "device": {
+        "identifiers": ["ST-00000512"],
+        "manufacturer": "WeatherFlow",
+        "name": "Tempest ST-00000512",
+        "model": "Tempest",
+        "sw_version": 129,
+        "via_device": "HB-00000001",
+    },
+}
+FORECAST = [
+    {
+        "datetime": f"2022-06-{day:02d}T00:00:00+00:00",
+        "condition": "partlycloudy",
+        "temperature": 24.0,
+        "templow": 13.0,
+        "precipitation_probability": 20,
+        "wind_bearing": 270,
+        "wind_speed": 14.4,
+    }
+    for day in range(1, 11)
+]
+PAYLOADS = {"observation": OBSERVATION, "discovery": DISCOVERY, "forecast": FORECAST}
+
+
+def bench(name: str, payload, seconds: float) -> tuple[float, float]:
+    """Return the payloads and the bytes written per second."""
+    dumps = get_serializer(name).dumps
+    size = len(dumps(payload).encode())
+    count = 0
+    batch = 1000
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        for _ in range(batch):
+            dumps(payload)
+        count += batch
+    return count / elapsed, count * size / elapsed
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--payload", choices=sorted(PAYLOADS), action="append")
+    parser.add_argument("--seconds", type=float, default=1, help="Time per measurement")
+    args = parser.parse_args()
+
+    names = [SERIALIZER_JSON] + ([] if orjson is None else [SERIALIZER_ORJSON])
+    for payload_name in args.payload or PAYLOADS:
+        for name in names:
+            rate, throughput = bench(name, PAYLOADS[payload_name], args.seconds)
+            print(
+                f"{payload_name:12} {name:7} {rate:10.0f} payloads/s"
+                f" {throughput / 1e6:8.1f} MB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark the time from importing the application until it listens for UDP data.
+
+Every run starts a new interpreter, imports the main module, creates
+WeatherFlowMqtt with a new database and connects, like the add-on does at
+startup. The MQTT broker is a closed local port, so connecting to it is only
+started, as it is when the broker is not up yet. Reports the median time of
+each phase since the package was imported:
+
+    python scripts/bench_startup.py --runs 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PHASES = ("import", "init", "listening")
+
+
+def closed_port() -> int:
+    """Return a local TCP port nothing is listening on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start(directory: str, broker_port: int) -> dict[str, float]:
+    """Start listening and return the time each phase ended, since the import."""
+    # Imported here, so the import is timed from the package import
+    from weatherflow2mqtt import STARTUP_TIME
+    from weatherflow2mqtt import weatherflow_mqtt
+
+    times = {"import": time.perf_counter() - STARTUP_TIME}
+    weatherflow = weatherflow_mqtt.WeatherFlowMqtt(
+        database_file=os.path.join(directory, "weatherflow2mqtt.db"),
+        outbox_file=os.path.join(directory, "weatherflow2mqtt_outbox.db"),
+        mqtt_config=weatherflow_mqtt.MqttConfig(port=broker_port),
+        udp_config=weatherflow_mqtt.WeatherFlowUdpConfig(host="127.0.0.1", port=0),
+    )
+    times["init"] = time.perf_counter() - STARTUP_TIME
+    await weatherflow.connect()
+    times["listening"] = time.perf_counter() - STARTUP_TIME
+
+    await weatherflow.listener.stop_listening()
+    await weatherflow.close()
+    return times
+
+
+def run_once() -> dict[str, float]:
+    """Start the application in a new interpreter and return its phase times."""
+    with tempfile.TemporaryDirectory(prefix="weatherflow2mqtt_bench_") as directory:
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", directory, "--broker-port", str(closed_port())],
+            capture_output=True,
+            check=True,
+            text=True,
+            # The data directory is read when the constants are imported
+            env={**os.environ, "EXTERNAL_DIRECTORY": directory},
+        )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=7, help="Number of startups to time")
+    parser.add_argument("--child", metavar="DIRECTORY", help=argparse.SUPPRESS)
+    parser.add_argument("--broker-port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        logging.disable(logging.CRITICAL)
+        print(json.dumps(asyncio.run(start(args.child, args.broker_port))))
+        return
+
+    runs = [run_once() for _ in range(args.runs)]
+    print(f"Startup phases (median of {args.runs} runs, since the package import):")
+    for phase in PHASES:
+        print(f"  {phase:10} {statistics.median(run[phase] for run in runs) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,10 @@ if sys.version_info < (3,10):
 
 install_requires = list(val.strip() for val in open('requirements.txt'))
 tests_require = list(val.strip() for val in open('test_requirements.txt'))
+# Optional speedups, installable as extras by their package name
+extras_require = {
+    val.strip().split('==')[0]: [val.strip()] for val in open('requirements_optional.txt')
+}
 
 setup(name='weatherflow2mqtt',
       version=VERSION,
@@ -28,6 +32,7 @@ setup(name='weatherflow2mqtt',
       },
       license='MIT',
       install_requires=install_requires,
+      extras_require=extras_require,
       tests_require=tests_require,
       classifiers=[
         'Programming Language :: Python :: 3.10',
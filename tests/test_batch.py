@@ -0,0 +1,161 @@
+"""Tests for the column conversions.
+
+Every column is compared row by row with the scalar conversion, for both
+unit systems and both wet bulb methods, including missing values.
+"""
+from __future__ import annotations
+
+import math
+import random
+
+import pytest
+
+from weatherflow2mqtt.batch import BatchConversionFunctions, column
+from weatherflow2mqtt.const import (
+    UNITS_IMPERIAL,
+    UNITS_METRIC,
+    WETBULB_METHOD_NEWTON,
+    WETBULB_METHOD_STULL,
+)
+from weatherflow2mqtt.helpers import ConversionFunctions
+
+ROWS = 2000
+ELEVATION = 35.2
+
+
+def values(low: float, high: float, seed: int) -> list[float | None]:
+    """Return random values with some missing, and the ends of the range."""
+    rnd = random.Random(seed)
+    rows = [low, high] + [rnd.uniform(low, high) for _ in range(ROWS - 2)]
+    for index in rnd.sample(range(ROWS), ROWS // 50):
+        rows[index] = None
+    return rows
+
+
+TEMPERATURES = values(-40, 50, 1)
+HUMIDITIES = values(1, 100, 2)
+PRESSURES = values(600, 1060, 3)
+WIND_SPEEDS = values(0, 40, 4)
+SOLAR_RADIATIONS = values(0, 1400, 5)
+RAIN = values(0, 80, 6)
+
+
+@pytest.fixture(
+    params=[
+        (UNITS_METRIC, WETBULB_METHOD_NEWTON),
+        (UNITS_IMPERIAL, WETBULB_METHOD_NEWTON),
+        (UNITS_METRIC, WETBULB_METHOD_STULL),
+    ],
+    ids=lambda param: "-".join(param),
+)
+def cnv(request) -> ConversionFunctions:
+    """Return the scalar conversions."""
+    unit_system, wetbulb_method = request.param
+    return ConversionFunctions(unit_system, "en", wetbulb_method)
+
+
+def same(result, expected) -> None:
+    """Assert that a column is the scalar results, with NaN for None."""
+    assert len(result) == len(expected)
+    for row, (value, scalar) in enumerate(zip(result, expected)):
+        if scalar is None:
+            assert math.isnan(value), row
+        else:
+            assert value == scalar, row
+
+
+def scalar(function, *columns):
+    """Return the scalar function for each row, `None` if a value is missing."""
+    return [
+        None if None in row else function(*row) for row in zip(*columns)
+    ]
+
+
+@pytest.mark.parametrize(
+    "name, rows", [
+        ("temperature", TEMPERATURES),
+        ("pressure", PRESSURES),
+        ("speed", WIND_SPEEDS),
+        ("distance", RAIN),
+        ("rain", RAIN),
+    ]
+)
+def test_units(cnv, name, rows):
+    """Unit conversions are the same as the scalar conversions."""
+    batch = BatchConversionFunctions(cnv)
+    same(getattr(batch, name)(column(rows)), scalar(getattr(cnv, name), rows))
+
+
+def test_speed_kmh(cnv):
+    """Wind speeds in km/h are the same as the scalar conversion."""
+    batch = BatchConversionFunctions(cnv)
+    same(
+        batch.speed(column(WIND_SPEEDS), kmh=True),
+        scalar(lambda value: cnv.speed(value, True), WIND_SPEEDS),
+    )
+
+
+def test_derived(cnv):
+    """Derived values are the same as the scalar functions."""
+    batch = BatchConversionFunctions(cnv)
+    temperatures = column(TEMPERATURES)
+    humidities = column(HUMIDITIES)
+    pressures = column(PRESSURES)
+
+    same(batch.dewpoint(temperatures, humidities), scalar(cnv.dewpoint, TEMPERATURES, HUMIDITIES))
+    same(
+        batch.dewpoint(temperatures, humidities, no_conversion=True),
+        scalar(lambda t, h: cnv.dewpoint(t, h, True), TEMPERATURES, HUMIDITIES),
+    )
+    same(
+        batch.absolute_humidity(temperatures, humidities),
+        scalar(cnv.absolute_humidity, TEMPERATURES, HUMIDITIES),
+    )
+    # Missing values give a feels like temperature of 0
+    same(
+        batch.feels_like(temperatures, humidities, column(WIND_SPEEDS)),
+        [cnv.feels_like(*row) for row in zip(TEMPERATURES, HUMIDITIES, WIND_SPEEDS)],
+    )
+    same(
+        batch.visibility(ELEVATION, temperatures, humidities),
+        scalar(lambda t, h: cnv.visibility(ELEVATION, t, h), TEMPERATURES, HUMIDITIES),
+    )
+    same(
+        batch.wetbulb(temperatures, humidities, pressures),
+        scalar(cnv.wetbulb, TEMPERATURES, HUMIDITIES, PRESSURES),
+    )
+    same(
+        batch.wetbulb(temperatures, humidities, pressures, no_conversion=True),
+        scalar(lambda t, h, p: cnv.wetbulb(t, h, p, True), TEMPERATURES, HUMIDITIES, PRESSURES),
+    )
+    same(
+        batch.wbgt(temperatures, humidities, pressures, column(SOLAR_RADIATIONS)),
+        scalar(cnv.wbgt, TEMPERATURES, HUMIDITIES, PRESSURES, SOLAR_RADIATIONS),
+    )
+
+
+def test_visibility_elevations(cnv):
+    """The visibility is the same below sea level and on a mountain."""
+    batch = BatchConversionFunctions(cnv)
+    for elevation in (-10, 0, 2, 2.5, 3000):
+        same(
+            batch.visibility(elevation, column(TEMPERATURES), column(HUMIDITIES)),
+            scalar(lambda t, h: cnv.visibility(elevation, t, h), TEMPERATURES, HUMIDITIES),
+        )
+
+
+def test_columns_of_any_sequence(cnv):
+    """Lists work as columns, like arrays."""
+    batch = BatchConversionFunctions(cnv)
+    assert batch.temperature([20.0, math.nan]).tolist()[0] == cnv.temperature(20.0)
+    assert len(batch.wetbulb([], [], [])) == 0
+
+
+def test_numpy_columns(cnv):
+    """NumPy arrays work as columns and can wrap the results."""
+    np = pytest.importorskip("numpy")
+    batch = BatchConversionFunctions(cnv)
+    temperatures = np.array(column(TEMPERATURES))
+    humidities = np.array(column(HUMIDITIES))
+    result = np.frombuffer(batch.dewpoint(temperatures, humidities), dtype=np.float64)
+    same(result.tolist(), scalar(cnv.dewpoint, TEMPERATURES, HUMIDITIES))
@@ -0,0 +1,680 @@
+"""Tests for the forecast.
+
+tests/fixtures/better_forecast.json is a better_forecast response with every
+field the API returns, for 10 days and 240 hours from 1 June 2023 at 14:17 in
+Copenhagen. The wind turns through north on two of the days.
+
+Requests go to a local aiohttp server that answers with that response. The formatted forecast is compared with the loops the single
+pass aggregation and the row transformers replaced.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from weatherflow2mqtt import forecast as forecast_module
+from weatherflow2mqtt.const import (
+    ATTR_FORECAST_CONDITION,
+    ATTR_FORECAST_HUMIDITY,
+    ATTR_FORECAST_PRECIPITATION,
+    ATTR_FORECAST_PRECIPITATION_PROBABILITY,
+    ATTR_FORECAST_PRESSURE,
+    ATTR_FORECAST_TEMP,
+    ATTR_FORECAST_TEMP_LOW,
+    ATTR_FORECAST_TIME,
+    ATTR_FORECAST_WIND_BEARING,
+    ATTR_FORECAST_WIND_SPEED,
+    CONDITION_CLASSES,
+    FORECAST_BACKOFF_BASE,
+    FORECAST_BACKOFF_MAX,
+    FORECAST_CIRCUIT_FAILURES,
+    FORECAST_CIRCUIT_TIMEOUT,
+    FORECAST_HOURLY_HOURS,
+    FORECAST_JITTER,
+    FORECAST_MAX_CONCURRENT,
+    UNITS_IMPERIAL,
+    UNITS_METRIC,
+)
+from weatherflow2mqtt.forecast import Forecast, ForecastConfig, ForecastScheduler
+from weatherflow2mqtt.helpers import ConversionFunctions
+from weatherflow2mqtt.weatherflow_mqtt import WeatherFlowMqtt, parse_forecast_stations
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "better_forecast.json")
+
+
+@pytest.fixture
+def payload() -> dict:
+    """Return the forecast response."""
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        return json.load(fixture)
+
+
+@pytest.fixture(autouse=True)
+def station_time(monkeypatch, payload):
+    """Run in the time zone of the station, at the time of the response."""
+    monkeypatch.setenv("TZ", payload["timezone"])
+    time.tzset()
+    now = datetime.fromtimestamp(payload["current_conditions"]["time"])
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    monkeypatch.setattr(forecast_module, "datetime", FrozenDatetime)
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture(params=[UNITS_METRIC, UNITS_IMPERIAL])
+def forecast(request) -> Forecast:
+    """Return a forecast converting to a unit system."""
+    return Forecast("12345", "token", conversions=ConversionFunctions(request.param, "en"))
+
+
+class ForecastServer:
+    """Local better_forecast server, answering with the forecast response.
+
+    Requests are recorded, and the status of the next responses can be set.
+    Conditional requests for the current ETag get a 304 response.
+    """
+
+    def __init__(self, payload: dict) -> None:
+        self.payload = payload
+        self.etag = '"1"'
+        self.requests: list[web.Request] = []
+        self.statuses: list[int] = []
+        # Seconds to wait before answering, and the most requests answered at once
+        self.delay = 0.0
+        self.active = self.max_active = 0
+        self.server = TestServer(web.Application())
+        self.server.app.router.add_get("/better_forecast", self.handle)
+
+    @property
+    def base_url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(request)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        if self.statuses and (status := self.statuses.pop(0)) != 200:
+            return web.Response(status=status)
+        if request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304, headers={"ETag": self.etag})
+        return web.json_response(self.payload, headers={"ETag": self.etag})
+
+    async def __aenter__(self) -> ForecastServer:
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.server.close()
+
+
+def run(coro):
+    """Run a test coroutine."""
+    return asyncio.run(coro)
+
+
+def hours(*rows: tuple[int, float, float, int]) -> list[dict]:
+    """Return hourly rows from (day, precipitation, wind speed, wind bearing)."""
+    return [
+        {"local_day": day, "precip": precip, "wind_avg": wind_avg, "wind_direction": bearing}
+        for day, precip, wind_avg, bearing in rows
+    ]
+
+
+# The loops the aggregation and the row transformers replaced
+
+
+def legacy_condition(value):
+    return next((k for k, v in CONDITION_CLASSES.items() if value in v), None)
+
+
+def legacy_daily_forecast(cnv, forecast_data):
+    today = datetime.date(forecast_module.datetime.now())
+    items = []
+    for row in forecast_data["daily"]:
+        forecast_time = datetime.date(datetime.fromtimestamp(row["day_start_local"]))
+        if today > forecast_time:
+            continue
+        precip = 0
+        wind_avg = []
+        wind_bearing = []
+        for hourly in forecast_data["hourly"]:
+            if hourly["local_day"] == row["day_num"]:
+                precip += hourly["precip"]
+                wind_avg.append(hourly["wind_avg"])
+                wind_bearing.append(hourly["wind_direction"])
+        sum_wind_avg = sum(wind_avg) / len(wind_avg)
+        sum_wind_bearing = sum(wind_bearing) / len(wind_bearing) % 360
+        items.append({
+            ATTR_FORECAST_TIME: cnv.utc_from_timestamp(row["day_start_local"]),
+            ATTR_FORECAST_CONDITION: "cloudy" if row.get("icon") is None else legacy_condition(row["icon"]),
+            ATTR_FORECAST_TEMP: cnv.temperature(row["air_temp_high"]),
+            ATTR_FORECAST_TEMP_LOW: cnv.temperature(row["air_temp_low"]),
+            ATTR_FORECAST_PRECIPITATION: cnv.rain(precip),
+            ATTR_FORECAST_PRECIPITATION_PROBABILITY: row["precip_probability"],
+            ATTR_FORECAST_WIND_SPEED: cnv.speed(sum_wind_avg, True),
+            ATTR_FORECAST_WIND_BEARING: int(sum_wind_bearing),
+        })
+    return items
+
+
+def legacy_hourly_forecast(cnv, forecast_data):
+    items = []
+    for row in forecast_data["hourly"]:
+        forecast_time = datetime.fromtimestamp(row["time"])
+        if forecast_module.datetime.now() > forecast_time:
+            continue
+        items.append({
+            ATTR_FORECAST_TIME: cnv.utc_from_timestamp(row["time"]),
+            ATTR_FORECAST_CONDITION: legacy_condition(row.get("icon")),
+            ATTR_FORECAST_TEMP: cnv.temperature(row["air_temperature"]),
+            ATTR_FORECAST_PRESSURE: cnv.pressure(row.get("sea_level_pressure", 0)),
+            ATTR_FORECAST_HUMIDITY: row["relative_humidity"],
+            ATTR_FORECAST_PRECIPITATION: cnv.rain(row["precip"]),
+            ATTR_FORECAST_PRECIPITATION_PROBABILITY: row["precip_probability"],
+            ATTR_FORECAST_WIND_SPEED: cnv.speed(row["wind_avg"], True),
+            ATTR_FORECAST_WIND_BEARING: row["wind_direction"],
+        })
+        if len(items) >= FORECAST_HOURLY_HOURS:
+            break
+    return items
+
+
+def test_aggregate_hourly():
+    """Precipitation is summed and wind speed averaged per day."""
+    assert Forecast.aggregate_hourly(
+        hours((1, 0.5, 2, 90), (1, 0.25, 4, 90), (2, 0, 3, 180))
+    ) == {1: (0.75, 3, 90), 2: (0, 3, 180)}
+    assert Forecast.aggregate_hourly([]) == {}
+
+
+@pytest.mark.parametrize(
+    "bearings, expected",
+    [((350, 10), 0), ((10, 350), 0), ((340, 350, 10, 20), 0), ((270, 0), 315), ((90, 100), 95)],
+)
+def test_aggregate_hourly_bearing(bearings, expected):
+    """The wind bearing is the mean direction, also across north."""
+    rows = hours(*((1, 0, 1, bearing) for bearing in bearings))
+    assert Forecast.aggregate_hourly(rows)[1][2] == expected
+
+
+def test_format_forecast(forecast, payload):
+    """The response is formatted like the loops formatted it."""
+    state, daily, hourly = forecast.format_forecast(payload)
+    cnv = forecast.conversions
+    assert state == {"weather": "rainy", "weather_hourly": "rainy"}
+    assert daily["temp_high_today"] == cnv.temperature(payload["forecast"]["daily"][0]["air_temp_high"])
+    assert len(daily["daily_forecast"]) == 10
+    assert len(hourly["hourly_forecast"]) == FORECAST_HOURLY_HOURS
+    assert hourly["hourly_forecast"] == legacy_hourly_forecast(cnv, payload["forecast"])
+
+    legacy = legacy_daily_forecast(cnv, payload["forecast"])
+    rows = payload["forecast"]["daily"]
+    for row, item, legacy_item in zip(rows, daily["daily_forecast"], legacy, strict=True):
+        bearing = item.pop(ATTR_FORECAST_WIND_BEARING)
+        legacy_bearing = legacy_item.pop(ATTR_FORECAST_WIND_BEARING)
+        assert item == legacy_item
+        # The loop averaged the bearings as numbers, which only works if they
+        # don't wrap around north
+        bearings = [
+            hour["wind_direction"]
+            for hour in payload["forecast"]["hourly"]
+            if hour["local_day"] == row["day_num"]
+        ]
+        if max(bearings) - min(bearings) < 180:
+            assert abs(bearing - legacy_bearing) <= 1
+        else:
+            assert bearing < 45 or bearing > 315
+
+
+def test_format_forecast_empty_day(forecast, payload):
+    """A day without hourly rows has no wind, where the loop raised ZeroDivisionError."""
+    forecast_data = payload["forecast"]
+    forecast_data["hourly"] = [row for row in forecast_data["hourly"] if row["local_day"] != 10]
+    with pytest.raises(ZeroDivisionError):
+        legacy_daily_forecast(forecast.conversions, forecast_data)
+
+    _, daily, _ = forecast.format_forecast(payload)
+    last = daily["daily_forecast"][-1]
+    assert last[ATTR_FORECAST_PRECIPITATION] == 0
+    assert last[ATTR_FORECAST_WIND_SPEED] is None
+    assert last[ATTR_FORECAST_WIND_BEARING] is None
+    assert all(item[ATTR_FORECAST_WIND_SPEED] is not None for item in daily["daily_forecast"][:-1])
+
+
+def test_format_forecast_missing_fields(forecast, payload):
+    """Rows without an icon or a pressure are formatted like the loops did."""
+    forecast_data = payload["forecast"]
+    for row in forecast_data["daily"][::3]:
+        del row["icon"]
+    for row in forecast_data["hourly"][::5]:
+        del row["icon"]
+        del row["sea_level_pressure"]
+    _, daily, hourly = forecast.format_forecast(payload)
+
+    assert daily["daily_forecast"][0][ATTR_FORECAST_CONDITION] == "cloudy"
+    first_hour = hourly["hourly_forecast"][0]
+    assert first_hour[ATTR_FORECAST_CONDITION] is None
+    assert first_hour[ATTR_FORECAST_PRESSURE] == forecast.conversions.pressure(0)
+    assert hourly["hourly_forecast"] == legacy_hourly_forecast(
+        forecast.conversions, copy.deepcopy(forecast_data)
+    )
+    for item, legacy_item in zip(
+        daily["daily_forecast"], legacy_daily_forecast(forecast.conversions, forecast_data)
+    ):
+        assert item[ATTR_FORECAST_CONDITION] == legacy_item[ATTR_FORECAST_CONDITION]
+
+
+def test_format_forecast_past_rows(forecast, payload):
+    """Days and hours before now are skipped."""
+    forecast_data = payload["forecast"]
+    yesterday = dict(forecast_data["daily"][0], day_start_local=forecast_data["daily"][0]["day_start_local"] - 86400)
+    earlier = dict(forecast_data["hourly"][0], time=forecast_data["hourly"][0]["time"] - 7200)
+    forecast_data["daily"].insert(0, yesterday)
+    forecast_data["hourly"].insert(0, earlier)
+    _, daily, hourly = forecast.format_forecast(payload)
+    assert len(daily["daily_forecast"]) == 10
+    assert hourly["hourly_forecast"][0][ATTR_FORECAST_TIME] == forecast.conversions.utc_from_timestamp(
+        forecast_data["hourly"][1]["time"]
+    )
+
+
+def test_condition_by_icon():
+    """Every icon gets the condition the linear search found."""
+    icons = {icon for icons in CONDITION_CLASSES.values() for icon in icons}
+    for icon in icons | {"unknown", None}:
+        assert forecast_module.CONDITION_BY_ICON.get(icon) == legacy_condition(icon), icon
+
+
+def test_pooled_session(payload):
+    """Requests reuse the connection of the session, and are timed."""
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", base_url=server.base_url)
+            for _ in range(2):
+                state, daily, hourly = await forecast.update_forecast()
+                assert state == {"weather": "rainy", "weather_hourly": "rainy"}
+            session = forecast._get_session()
+            assert not session.closed
+            timings = forecast.request_timings
+            # The second request didn't connect
+            assert timings["dns"] == 0 and timings["connect"] == 0
+            assert timings["ttfb"] is not None and timings["body"] is not None
+            assert timings["total"] >= timings["ttfb"]
+            assert [request.query["station_id"] for request in server.requests] == ["12345"] * 2
+            await forecast.close()
+            assert session.closed
+
+    run(test())
+
+
+def test_request_failure(payload):
+    """A failed request returns no forecast."""
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", base_url=server.base_url)
+            server.statuses = [500]
+            assert await forecast.update_forecast() == (None, None, None)
+            assert forecast.request_timings["total"] is not None
+            await forecast.close()
+
+    run(test())
+
+
+def read_cache(cache_file) -> dict:
+    with open(cache_file, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def write_cache(cache_file, payload: dict, fetched: float, etag: str | None = '"1"') -> None:
+    with open(cache_file, "w", encoding="utf-8") as file:
+        json.dump({"fetched": fetched, "etag": etag, "last_modified": None, "data": payload}, file)
+
+
+def test_cache_miss(payload, tmp_path):
+    """Without a cache, the forecast is downloaded and cached."""
+    cache_file = tmp_path / "forecast.json"
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", base_url=server.base_url, cache_file=cache_file)
+            assert forecast.cached_forecast() is None
+            data = await forecast.update_forecast()
+            await forecast.close()
+            assert "If-None-Match" not in server.requests[0].headers
+        return data
+
+    before = time.time()
+    assert run(test()) == Forecast("12345", "token").format_forecast(payload)
+    cache = read_cache(cache_file)
+    assert cache["etag"] == '"1"'
+    assert cache["data"] == payload
+    assert cache["fetched"] >= before
+
+
+def test_cache_hit(payload, tmp_path):
+    """An unchanged forecast isn't downloaded again, the cached response is used."""
+    cache_file = tmp_path / "forecast.json"
+    write_cache(cache_file, payload, fetched=time.time() - 3600)
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", base_url=server.base_url, cache_file=cache_file)
+            data = await forecast.update_forecast()
+            await forecast.close()
+            assert server.requests[0].headers["If-None-Match"] == '"1"'
+        return data
+
+    before = time.time()
+    assert run(test()) == Forecast("12345", "token").format_forecast(payload)
+    cache = read_cache(cache_file)
+    assert cache["data"] == payload
+    # The cached response is fresh again
+    assert cache["fetched"] >= before
+
+
+def test_cache_changed(payload, tmp_path):
+    """A changed forecast replaces the cached response."""
+    cache_file = tmp_path / "forecast.json"
+    write_cache(cache_file, payload, fetched=time.time() - 3600, etag='"0"')
+    payload["current_conditions"]["icon"] = "clear-day"
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", base_url=server.base_url, cache_file=cache_file)
+            state, _, _ = await forecast.update_forecast()
+            await forecast.close()
+        return state
+
+    assert run(test())["weather"] == "sunny"
+    assert read_cache(cache_file)["etag"] == '"1"'
+    assert read_cache(cache_file)["data"]["current_conditions"]["icon"] == "clear-day"
+
+
+@pytest.mark.parametrize("contents", ["{not json", "", "null", "[]", '{"etag": "\\"1\\""}'])
+def test_cache_corrupt(payload, tmp_path, contents):
+    """A corrupt cache is ignored and replaced by the downloaded forecast."""
+    cache_file = tmp_path / "forecast.json"
+    cache_file.write_text(contents)
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", base_url=server.base_url, cache_file=cache_file)
+            assert forecast.cached_forecast() is None
+            data = await forecast.update_forecast()
+            await forecast.close()
+            assert "If-None-Match" not in server.requests[0].headers
+        return data
+
+    assert run(test()) is not None
+    assert read_cache(cache_file)["data"] == payload
+
+
+def test_cache_invalid_response(payload, tmp_path):
+    """A cached response that can't be formatted is discarded."""
+    cache_file = tmp_path / "forecast.json"
+    del payload["forecast"]["daily"]
+    write_cache(cache_file, payload, fetched=time.time())
+    forecast = Forecast("12345", "token", cache_file=cache_file)
+    assert forecast.cached_forecast() is None
+    assert not cache_file.exists()
+
+
+async def wait_for(condition, timeout: float = 5) -> None:
+    """Wait until a condition is true."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.parametrize("age, requests", [(60, 0), (3 * 3600, 1)])
+def test_cache_at_startup(payload, tmp_path, age, requests):
+    """The cached forecast is published at startup, and refreshed right away if stale."""
+    cache_file = tmp_path / "forecast.json"
+    fetched = time.time() - age
+    write_cache(cache_file, payload, fetched=fetched)
+    published = []
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast(
+                "12345", "token", interval=30, base_url=server.base_url, cache_file=cache_file
+            )
+            scheduler = ForecastScheduler(
+                forecast, lambda forecast, data: published.append((len(server.requests), data))
+            )
+            scheduler.start()
+            await wait_for(lambda: len(published) > requests)
+            await asyncio.sleep(0.05)
+            await scheduler.stop()
+            await forecast.close()
+            assert len(server.requests) == requests
+        return scheduler
+
+    scheduler = run(test())
+    data = Forecast("12345", "token").format_forecast(payload)
+    # The cached forecast is published before anything is requested
+    assert published == [(0, data)] + [(1, data)] * requests
+    if requests:
+        assert scheduler.last_success > fetched
+    else:
+        assert scheduler.last_success == fetched
+        assert scheduler.next_run == fetched + 30 * 60
+
+
+def test_publish_changed_parts(payload, tmp_path):
+    """Only the topics of the parts of the forecast that changed are published."""
+    published = []
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            weatherflow = WeatherFlowMqtt(
+                database_file=str(tmp_path / "weatherflow2mqtt.db"),
+                forecast_config=ForecastConfig("12345", "token", base_url=server.base_url),
+            )
+            weatherflow.forecast.cache_file = None
+            weatherflow._add_to_queue = lambda topic, payload, qos, retain: published.append(
+                topic.split("/")[-2:]
+            )
+            scheduler = weatherflow.forecast_schedulers[0]
+
+            async def update(change=None) -> list[list[str]]:
+                if change is not None:
+                    change(server.payload)
+                    server.etag = f'"{len(server.requests)}"'
+                published.clear()
+                assert await scheduler.update()
+                return sorted(published)
+
+            assert await update() == [
+                ["weather", "attributes"], ["weather", "state"], ["weather_hourly", "attributes"]
+            ]
+            # Unchanged, answered with 304 or with the same response
+            assert await update() == []
+            assert await update(lambda payload: None) == []
+
+            def hourly(payload):
+                payload["forecast"]["hourly"][5]["air_temperature"] += 1
+
+            def daily(payload):
+                payload["forecast"]["daily"][3]["air_temp_high"] += 1
+
+            def current(payload):
+                payload["current_conditions"]["icon"] = "clear-day"
+
+            assert await update(hourly) == [["weather_hourly", "attributes"]]
+            assert await update(daily) == [["weather", "attributes"]]
+            assert await update(current) == [["weather", "state"]]
+            await weatherflow.forecast.close()
+
+    run(test())
+
+
+def test_parse_forecast_stations():
+    """The first station keeps the plain entity ids."""
+    assert parse_forecast_stations("1, 2", "a", 15) == [
+        ForecastConfig("1", "a", 15),
+        ForecastConfig("2", "a", 15, entity_suffix="_2"),
+    ]
+    assert [config.token for config in parse_forecast_stations("1,2", "a,b")] == ["a", "b"]
+    assert parse_forecast_stations("1,2,3", "a,b") == []
+    assert parse_forecast_stations(None, "a") == []
+
+
+def test_several_stations(payload, tmp_path):
+    """Stations are requested concurrently over one session, a few at a time."""
+    station_ids = [str(station_id) for station_id in range(1, 8)]
+    published = {}
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            server.delay = 0.05
+            configs = parse_forecast_stations(",".join(station_ids), "token")
+            for config in configs:
+                config.base_url = server.base_url
+            weatherflow = WeatherFlowMqtt(
+                database_file=str(tmp_path / "weatherflow2mqtt.db"),
+                forecast_config=configs[0],
+                extra_forecast_configs=configs[1:],
+            )
+            weatherflow._add_to_queue = lambda topic, payload, qos, retain: published.setdefault(
+                tuple(topic.split("/")[-2:]), json.loads(payload)
+            )
+            for forecast in weatherflow.forecasts:
+                forecast.cache_file = None
+            try:
+                results = await asyncio.gather(
+                    *(scheduler.update() for scheduler in weatherflow.forecast_schedulers)
+                )
+                sessions = {forecast._get_session() for forecast in weatherflow.forecasts}
+            finally:
+                for forecast in reversed(weatherflow.forecasts):
+                    await forecast.close()
+            assert all(results)
+            assert len(sessions) == 1
+            assert sorted(request.query["station_id"] for request in server.requests) == station_ids
+            assert server.max_active == FORECAST_MAX_CONCURRENT
+            assert sessions.pop().closed
+
+    run(test())
+    assert published["weather", "state"] == {"weather": "rainy", "weather_hourly": "rainy"}
+    for station_id in station_ids[1:]:
+        assert published[f"weather_{station_id}", "state"] == {
+            f"weather_{station_id}": "rainy",
+            f"weather_hourly_{station_id}": "rainy",
+        }
+        assert published[f"weather_{station_id}", "attributes"]["daily_forecast"]
+        assert published[f"weather_hourly_{station_id}", "attributes"]["hourly_forecast"]
+
+
+async def timed_update(scheduler: ForecastScheduler) -> tuple[bool, float, float]:
+    """Update the forecast and return the result and when the next run is due.
+
+    The due time is returned as the range of delays since the update that
+    it can be, as the update doesn't happen at a single instant.
+    """
+    before = time.time()
+    updated = await scheduler.update()
+    after = time.time()
+    return updated, scheduler.next_run - after, scheduler.next_run - before
+
+
+def test_backoff(payload):
+    """Failed requests are retried with exponential backoff, between half and all of it."""
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", interval=5, base_url=server.base_url)
+            scheduler = ForecastScheduler(forecast, lambda forecast, data: None)
+            server.statuses = [500] * (FORECAST_CIRCUIT_FAILURES - 1)
+            try:
+                for failures in range(1, FORECAST_CIRCUIT_FAILURES):
+                    updated, earliest, latest = await timed_update(scheduler)
+                    delay = min(FORECAST_BACKOFF_MAX, FORECAST_BACKOFF_BASE * 2 ** (failures - 1))
+                    assert not updated
+                    assert delay / 2 <= latest and earliest <= delay, failures
+                    assert scheduler.consecutive_failures == failures
+                    assert not scheduler.circuit_open
+
+                updated, earliest, latest = await timed_update(scheduler)
+            finally:
+                await forecast.close()
+        assert updated
+        assert 5 * 60 <= latest and earliest <= 5 * 60 + FORECAST_JITTER
+        assert scheduler.diagnostics()["consecutive_failures"] == 0
+        assert scheduler.successes == 1
+        assert scheduler.failures == FORECAST_CIRCUIT_FAILURES - 1
+
+    run(test())
+
+
+def test_backoff_limit(monkeypatch):
+    """The backoff doesn't grow past its maximum."""
+    # Keep the circuit closed long enough to reach the maximum
+    monkeypatch.setattr(forecast_module, "FORECAST_CIRCUIT_FAILURES", 100)
+    scheduler = ForecastScheduler(Forecast("12345", "token"), lambda forecast, data: None)
+    scheduler.consecutive_failures = 20
+
+    async def update_forecast():
+        return None, None, None
+
+    scheduler.forecast.update_forecast = update_forecast
+    _, earliest, latest = run(timed_update(scheduler))
+    assert FORECAST_BACKOFF_MAX / 2 <= latest and earliest <= FORECAST_BACKOFF_MAX
+
+
+@pytest.mark.parametrize("interval", [5, 60])
+def test_circuit_breaker(payload, interval):
+    """The circuit opens after repeated failures, and a trial request closes it again."""
+
+    async def test():
+        async with ForecastServer(payload) as server:
+            forecast = Forecast("12345", "token", interval=interval, base_url=server.base_url)
+            scheduler = ForecastScheduler(forecast, lambda forecast, data: None)
+            # Two trials fail, the third succeeds
+            server.statuses = [500] * (FORECAST_CIRCUIT_FAILURES + 2)
+            timeout = max(FORECAST_CIRCUIT_TIMEOUT, interval * 60)
+            try:
+                for _ in range(FORECAST_CIRCUIT_FAILURES - 1):
+                    await scheduler.update()
+                assert not scheduler.circuit_open
+
+                # Open, and then half open: one trial request per timeout
+                for _ in range(3):
+                    requests = len(server.requests)
+                    updated, earliest, latest = await timed_update(scheduler)
+                    assert len(server.requests) == requests + 1
+                    assert not updated
+                    assert scheduler.circuit_open
+                    assert scheduler.diagnostics()["circuit_open"]
+                    assert timeout / 2 <= latest and earliest <= timeout
+
+                # The server answers again
+                server.statuses.clear()
+                updated, earliest, latest = await timed_update(scheduler)
+            finally:
+                await forecast.close()
+        assert updated
+        assert not scheduler.circuit_open
+        assert interval * 60 <= latest and earliest <= interval * 60 + FORECAST_JITTER
+
+    run(test())
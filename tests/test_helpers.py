@@ -0,0 +1,589 @@
+"""Tests for the conversion functions.
+
+The lookup tables replaced if/elif chains, so every lookup is compared with
+the chain it replaced, on both sides of each threshold, for both unit
+systems and all languages. The cached unit conversions are compared with
+pint for every unit pair the sensors use, and the wet bulb solver with the
+stepping solver it replaced and the psychrometric equation it solves.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import math
+import time
+from types import SimpleNamespace
+
+import pytest
+from pint import Quantity
+from pyweatherflowudp.const import UNIT_METERS
+from pyweatherflowudp.device import determine_device
+
+from weatherflow2mqtt import helpers
+from weatherflow2mqtt.const import (
+    BATTERY_MODE_DESCRIPTION,
+    SUPPORTED_LANGUAGES,
+    UNITS_IMPERIAL,
+    UNITS_METRIC,
+    WETBULB_METHOD_NEWTON,
+    WETBULB_METHOD_STULL,
+)
+from weatherflow2mqtt.helpers import ConversionFunctions, convert_quantity
+from weatherflow2mqtt.sensor_description import DEVICE_SENSORS, SensorDescription
+
+UNIT_SYSTEMS = (UNITS_METRIC, UNITS_IMPERIAL)
+
+
+def edges(*thresholds: float, step: float = 0.05) -> list[float]:
+    """Return values on and around each threshold."""
+    values = [math.nan]
+    for threshold in thresholds:
+        values += [
+            math.nextafter(threshold, -math.inf),
+            threshold,
+            math.nextafter(threshold, math.inf),
+            threshold - step,
+            threshold + step,
+        ]
+    return values
+
+
+def grid(start: float, stop: float, step: float) -> list[float]:
+    """Return evenly spaced values, rounded like the observations are."""
+    count = int(round((stop - start) / step))
+    return [round(start + i * step, 3) for i in range(count + 1)]
+
+
+@pytest.fixture(
+    params=[(units, language) for units in UNIT_SYSTEMS for language in SUPPORTED_LANGUAGES],
+    ids=lambda param: "-".join(param),
+)
+def cnv(request) -> ConversionFunctions:
+    """Return the conversion functions for a unit system and language."""
+    return ConversionFunctions(*request.param)
+
+
+# The if/elif chains the lookup tables replaced
+
+
+def legacy_direction(translations, value):
+    direction_array = [
+        "N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+        "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW", "N",
+    ]
+    direction_str = direction_array[int((value + 11.25) / 22.5)]
+    return translations["wind_dir"][direction_str]
+
+
+def legacy_rain_intensity(translations, rain_rate):
+    if rain_rate == 0:
+        intensity = "NONE"
+    elif rain_rate < 0.25:
+        intensity = "VERYLIGHT"
+    elif rain_rate < 1:
+        intensity = "LIGHT"
+    elif rain_rate < 4:
+        intensity = "MODERATE"
+    elif rain_rate < 16:
+        intensity = "HEAVY"
+    elif rain_rate < 50:
+        intensity = "VERYHEAVY"
+    else:
+        intensity = "EXTREME"
+    return translations["rain_intensity"][intensity]
+
+
+def legacy_battery_mode(voltage, solar_radiation):
+    if voltage >= 2.455:
+        batt_mode = 0
+    elif voltage <= 2.355:
+        batt_mode = 3
+    elif solar_radiation > 100:
+        if voltage >= 2.41:
+            batt_mode = 1
+        elif voltage > 2.375:
+            batt_mode = 2
+        else:
+            batt_mode = 3
+    else:
+        if voltage > 2.415:
+            batt_mode = 0
+        elif voltage > 2.39:
+            batt_mode = 1
+        elif voltage > 2.355:
+            batt_mode = 2
+        else:
+            batt_mode = 3
+    return batt_mode, BATTERY_MODE_DESCRIPTION[batt_mode]
+
+
+def legacy_beaufort(translations, wind_speed):
+    if wind_speed > 32.7:
+        bft_value = 12
+    elif wind_speed >= 28.5:
+        bft_value = 11
+    elif wind_speed >= 24.5:
+        bft_value = 10
+    elif wind_speed >= 20.8:
+        bft_value = 9
+    elif wind_speed >= 17.2:
+        bft_value = 8
+    elif wind_speed >= 13.9:
+        bft_value = 7
+    elif wind_speed >= 10.8:
+        bft_value = 6
+    elif wind_speed >= 8.0:
+        bft_value = 5
+    elif wind_speed >= 5.5:
+        bft_value = 4
+    elif wind_speed >= 3.4:
+        bft_value = 3
+    elif wind_speed >= 1.6:
+        bft_value = 2
+    elif wind_speed >= 0.3:
+        bft_value = 1
+    else:
+        bft_value = 0
+    return bft_value, translations["beaufort"][str(bft_value)]
+
+
+def legacy_dewpoint_level(translations, dewpoint, is_metric):
+    if is_metric:
+        dewpoint = (dewpoint * 9 / 5) + 32
+    levels = (
+        (80, "severely-high"),
+        (75, "miserable"),
+        (70, "oppressive"),
+        (65, "uncomfortable"),
+        (60, "ok-for-most"),
+        (55, "comfortable"),
+        (50, "very-comfortable"),
+        (30, "somewhat-dry"),
+        (0.5, "dry"),
+        (0, "very-dry"),
+    )
+    for threshold, level in levels:
+        if dewpoint >= threshold:
+            return translations["dewpoint"][level]
+    return translations["dewpoint"]["undefined"]
+
+
+def legacy_temperature_level(translations, temperature_c):
+    temperature = (temperature_c * 9 / 5) + 32
+    levels = (
+        (104, "inferno"),
+        (95, "very-hot"),
+        (86, "hot"),
+        (77, "warm"),
+        (68, "nice"),
+        (59, "cool"),
+        (41, "chilly"),
+        (32, "cold"),
+        (20, "freezing"),
+    )
+    for threshold, level in levels:
+        if temperature >= threshold:
+            return translations["temperature"][level]
+    if temperature <= 20:
+        return translations["temperature"]["fridged"]
+    return translations["temperature"]["undefined"]
+
+
+def legacy_uv_level(translations, uvi):
+    if uvi >= 10.5:
+        return translations["uv"]["extreme"]
+    if uvi >= 7.5:
+        return translations["uv"]["very-high"]
+    if uvi >= 5.5:
+        return translations["uv"]["high"]
+    if uvi >= 2.5:
+        return translations["uv"]["moderate"]
+    if uvi > 0:
+        return translations["uv"]["low"]
+    return translations["uv"]["none"]
+
+
+ZAMBRETTI_NORTH = {
+    "N": 6, "NNE": 5, "NE": 5, "ENE": 2, "E": -0.5, "ESE": -2, "SE": -5, "SSE": -8.5,
+    "S": -12, "SSW": -10, "SW": -6, "WSW": -4.5, "W": -3, "WNW": -0.5, "NW": 1.5, "NNW": 3,
+}
+ZAMBRETTI_SOUTH = {
+    "S": 6, "SSW": 5, "SW": 5, "WSW": 2, "W": -0.5, "WNW": -2, "NW": -5, "NNW": -8.5,
+    "N": -12, "NNE": -10, "NE": -6, "ENE": -4.5, "E": -3, "ESE": -0.5, "SE": 1.5, "SSE": 3,
+}
+
+
+def legacy_zambretti_adjustment(translations, month, latitude, wind_dir, trend, z_range):
+    """Return the pressure adjustments the chains made, in the order they made them."""
+    z_where = 1 if latitude >= 0 else 2
+    z_season = month >= 4 and month <= 9
+    z_wind = legacy_direction(translations, wind_dir)
+    adjustments = []
+    # The chains added `factor / 100 * z_range` for the direction they matched
+    wind = ZAMBRETTI_NORTH if z_where == 1 else ZAMBRETTI_SOUTH
+    if z_wind in wind:
+        adjustments.append(wind[z_wind] / 100 * z_range)
+    if z_season == (z_where == 1):
+        if float(trend) > 0:
+            adjustments.append(7 / 100 * z_range)
+        elif float(trend) < 0:
+            adjustments.append(-(7 / 100 * z_range))
+    return adjustments
+
+
+def legacy_zambretti_value(translations, month, latitude, wind_dir, p_hi, p_lo, trend, press):
+    z_range = p_hi - p_lo
+    z_hpa = press
+    if float(trend) < 0:
+        z_trend = 2
+    elif float(trend) > 0:
+        z_trend = 1
+    else:
+        z_trend = 0
+    z_constant = z_range / 22
+    rise_options = [25,25,25,24,24,19,16,12,11,9,8,6,5,2,1,1,0,0,0,0,0,0]
+    steady_options = [25,25,25,25,25,25,23,23,22,18,15,13,10,4,1,1,0,0,0,0,0,0]
+    fall_options = [25,25,25,25,25,25,25,25,23,23,21,20,17,14,7,3,1,1,1,0,0,0]
+
+    for adjustment in legacy_zambretti_adjustment(
+        translations, month, latitude, wind_dir, trend, z_range
+    ):
+        z_hpa += adjustment
+
+    if z_hpa == p_hi:
+        z_hpa = p_hi - 1
+    z_option = min(max(math.floor((z_hpa - p_lo) / z_constant), 0), 21)
+    if z_trend == 1:
+        return rise_options[z_option]
+    if z_trend == 2:
+        return fall_options[z_option]
+    return steady_options[z_option]
+
+
+def test_direction(cnv):
+    values = list(range(360)) + edges(*(i * 22.5 - 11.25 for i in range(1, 17)))
+    for value in values:
+        if value == value:
+            assert cnv.direction(value) == legacy_direction(cnv.translations, value), value
+
+
+def test_rain_intensity(cnv):
+    values = edges(0, 0.25, 1, 4, 16, 50) + grid(0, 60, 0.01)
+    for value in values:
+        assert cnv.rain_intensity(value) == legacy_rain_intensity(cnv.translations, value), value
+
+
+def test_battery_mode(cnv):
+    values = edges(2.355, 2.375, 2.39, 2.41, 2.415, 2.455, step=0.001) + grid(2.3, 2.5, 0.001)
+    for voltage in values:
+        for solar_radiation in (0, 100, math.nextafter(100, math.inf), 101, 900):
+            assert cnv.battery_mode(voltage, solar_radiation) == legacy_battery_mode(
+                voltage, solar_radiation
+            ), (voltage, solar_radiation)
+
+
+def test_beaufort(cnv):
+    thresholds = (0.3, 1.6, 3.4, 5.5, 8.0, 10.8, 13.9, 17.2, 20.8, 24.5, 28.5, 32.7)
+    for value in edges(*thresholds) + grid(0, 40, 0.01):
+        assert cnv.beaufort(value) == legacy_beaufort(cnv.translations, value), value
+    assert cnv.beaufort(None) == legacy_beaufort(cnv.translations, 0)
+
+
+def test_dewpoint_level(cnv):
+    thresholds_f = (0, 0.5, 30, 50, 55, 60, 65, 70, 75, 80)
+    # The thresholds in Celsius, as converted back from Fahrenheit
+    thresholds_c = [(value - 32) * 5 / 9 for value in thresholds_f]
+    values = edges(*thresholds_f) + edges(*thresholds_c) + grid(-30, 40, 0.1) + grid(-20, 100, 0.1)
+    for value in values:
+        for is_metric in (None, True, False):
+            expected = legacy_dewpoint_level(
+                cnv.translations, value, not cnv.is_imperial if is_metric is None else is_metric
+            )
+            assert cnv.dewpoint_level(value, is_metric) == expected, (value, is_metric)
+
+
+def test_temperature_level(cnv):
+    thresholds_c = [(value - 32) * 5 / 9 for value in (20, 32, 41, 59, 68, 77, 86, 95, 104)]
+    for value in edges(*thresholds_c) + grid(-40, 50, 0.1):
+        assert cnv.temperature_level(value) == legacy_temperature_level(
+            cnv.translations, value
+        ), value
+
+
+def test_uv_level(cnv):
+    for value in edges(0, 2.5, 5.5, 7.5, 10.5) + grid(0, 15, 0.01):
+        assert cnv.uv_level(value) == legacy_uv_level(cnv.translations, value), value
+
+
+def test_none_values(cnv):
+    assert cnv.direction(None) == "N"
+    assert cnv.battery_mode(None, 0) is None
+    assert cnv.dewpoint_level(None) == "no-data"
+    assert cnv.temperature_level(None) == "no-data"
+    assert cnv.uv_level(None) == "no-data"
+    assert cnv.zambretti_value(None, 0, 1050, 950, 0, 1000) is None
+    assert cnv.zambretti_forecast(None) is None
+
+
+@pytest.mark.parametrize("language", SUPPORTED_LANGUAGES)
+@pytest.mark.parametrize("p_hi,p_lo", [(1050, 950), (1043.7, 961.2)])
+def test_zambretti(monkeypatch, language, p_hi, p_lo):
+    # The forecast doesn't depend on the unit system
+    cnv = ConversionFunctions(UNITS_METRIC, language)
+    translations = cnv.translations
+    # The wind direction is bucketed, so both sides of each bucket are used
+    directions = [0, 359] + [
+        value
+        for value in edges(*(i * 22.5 - 11.25 for i in range(1, 17)), step=1)
+        if 0 <= value < 360
+    ]
+    z_range = p_hi - p_lo
+    # The pressure options, and the top of the range which is moved down
+    dial = [p_lo + i * z_range / 22 for i in range(-1, 24)] + [p_hi]
+
+    # The season changes between March and April, and September and October
+    for month in (3, 4, 9, 10):
+        now = dt.datetime(2024, month, 15, 12)
+        monkeypatch.setattr(
+            helpers, "dt", SimpleNamespace(datetime=SimpleNamespace(now=lambda: now))
+        )
+        for latitude in (55.6, 0, -33.9):
+            for trend in (-0.5, 0, 0.5):
+                for wind_dir in directions:
+                    # Pressures that are adjusted onto each edge of the dial
+                    adjustment = sum(
+                        legacy_zambretti_adjustment(
+                            translations, month, latitude, wind_dir, trend, z_range
+                        )
+                    )
+                    for edge in dial:
+                        press = edge - adjustment
+                        for value in (
+                            math.nextafter(press, -math.inf),
+                            press,
+                            math.nextafter(press, math.inf),
+                        ):
+                            expected = legacy_zambretti_value(
+                                translations, month, latitude, wind_dir, p_hi, p_lo, trend, value
+                            )
+                            assert cnv.zambretti_value(
+                                latitude, wind_dir, p_hi, p_lo, trend, value
+                            ) == expected, (month, latitude, trend, wind_dir, value)
+
+
+def test_zambretti_forecast(cnv):
+    for z_num in range(26):
+        assert cnv.zambretti_forecast(z_num) == cnv.translations["zambretti"][chr(ord("A") + z_num)]
+
+
+def observations() -> list[dict]:
+    """Return an observation from each kind of device."""
+    now = int(time.time())
+    return [
+        {
+            "serial_number": "ST-00000512",
+            "type": "obs_st",
+            "obs": [[now, 0.18, 0.22, 0.27, 144, 6, 1017.57, 22.37, 50.26, 328, 0.03, 3, 0.1, 1, 12, 1, 2.41, 1]],
+        },
+        {
+            "serial_number": "AR-00004049",
+            "type": "obs_air",
+            "obs": [[now, 835.0, 10.0, 45, 0, 0, 3.46, 1]],
+        },
+        {
+            "serial_number": "SK-00008453",
+            "type": "obs_sky",
+            "obs": [[now, 9000, 10, 0.5, 2.6, 4.6, 7.4, 187, 3.12, 1, 130, None, 0, 3]],
+        },
+    ]
+
+
+def unit_pairs() -> list[tuple[Quantity, str]]:
+    """Return a quantity of each unit converted by `convert_quantity` and its target unit."""
+    pairs = {}
+    for message in observations():
+        serial_number = message["serial_number"]
+        device = determine_device(serial_number)(serial_number, message)
+        device.parse_message(message)
+        for sensor in DEVICE_SENSORS:
+            if (
+                not isinstance(sensor, SensorDescription)
+                or sensor.custom_fn is not None
+                or not hasattr(device, sensor.device_attr)
+            ):
+                continue
+            value = getattr(device, sensor.device_attr)
+            if callable(value):
+                value = value(**({"altitude": 30 * UNIT_METERS} if "altitude" in sensor.inputs else {}))
+            if not isinstance(value, Quantity):
+                continue
+            for unit in (sensor.metric_unit, sensor.imperial_unit):
+                if unit is not None:
+                    pairs[(value.units, unit)] = value
+    return [(quantity, unit) for (_, unit), quantity in pairs.items()]
+
+
+UNIT_PAIRS = unit_pairs()
+
+
+def test_unit_pairs():
+    """The sensors convert temperatures, pressures and speeds."""
+    pairs = {(str(quantity.units), unit) for quantity, unit in UNIT_PAIRS}
+    assert {("°C", "°F"), ("mbar", "inHg"), ("m/s", "mph"), ("mm/h", "in/h"), ("°C", "°C")} <= pairs
+
+
+@pytest.mark.parametrize(
+    "quantity, unit", UNIT_PAIRS, ids=[f"{quantity.units:~}-{unit}" for quantity, unit in UNIT_PAIRS]
+)
+def test_convert_quantity(quantity, unit):
+    """Conversions are the same as pint's, up to the last bits."""
+    for value in [quantity.m, 0.0, -0.0, 1.0, -40.0, 1e-3, 1e5] + grid(-60, 160, 0.37):
+        source = quantity.__class__(value, quantity.units)
+        expected = source.to(unit).m
+        assert convert_quantity(source, unit) == pytest.approx(expected, rel=1e-12, abs=1e-9), value
+    assert math.isnan(convert_quantity(quantity.__class__(math.nan, quantity.units), unit))
+
+
+def test_convert_quantity_rounding():
+    """Temperatures round like pint's, except right on a rounding boundary."""
+    celsius = next(quantity for quantity, unit in UNIT_PAIRS if unit == "°F")
+    differences = 0
+    for value in grid(-60, 160, 0.01):
+        source = celsius.__class__(value, celsius.units)
+        expected = source.to("°F").m
+        result = convert_quantity(source, "°F")
+        if round(result, 1) != round(expected, 1):
+            differences += 1
+            assert abs(round(result, 1) - round(expected, 1)) == pytest.approx(0.1)
+            # The exact value is on the boundary between the two
+            assert abs(math.fmod(abs(value * 9 / 5 + 32), 0.1) - 0.05) < 1e-9, value
+    assert differences < 100
+
+
+# The stepping solver the Newton solver replaced. It returned one step past
+# the guess it accepted, so the accepted guess and the last step are returned too.
+
+
+def legacy_wetbulb(temp, humidity, pressure):
+    edifference = 1
+    twguess = 0
+    previoussign = 1
+    incr = 10
+    es = 6.112 * math.exp(17.67 * temp / (temp + 243.5))
+    e2 = es * (humidity / 100)
+    while abs(edifference) > 0.005:
+        accepted = twguess
+        ewguess = 6.112 * math.exp((17.67 * twguess) / (twguess + 243.5))
+        eguess = ewguess - pressure * (temp - twguess) * 0.00066 * (1 + (0.00115 * twguess))
+        edifference = e2 - eguess
+        if edifference == 0:
+            break
+        if edifference < 0:
+            cursign = -1
+            if cursign != previoussign:
+                previoussign = cursign
+                incr = incr / 10
+        else:
+            cursign = 1
+            if cursign != previoussign:
+                previoussign = cursign
+                incr = incr / 10
+        twguess = twguess + incr * previoussign
+    return twguess, accepted, incr
+
+
+def psychrometric_residual(temp, humidity, pressure, wetbulb):
+    """Return how far the wet bulb temperature is from a root, in MB."""
+    e2 = 6.112 * math.exp(17.67 * temp / (temp + 243.5)) * humidity / 100
+    ew = 6.112 * math.exp(17.67 * wetbulb / (wetbulb + 243.5))
+    return ew - pressure * 0.00066 * (temp - wetbulb) * (1 + 0.00115 * wetbulb) - e2
+
+
+def psychrometric_dewpoint(temp, humidity):
+    """Return the dewpoint with the vapor pressure formula of the solver."""
+    ratio = math.log(6.112 * math.exp(17.67 * temp / (temp + 243.5)) * humidity / 100 / 6.112)
+    return 243.5 * ratio / (17.67 - ratio)
+
+
+WETBULB_CASES = [
+    (temp, float(humidity), pressure)
+    for temp in grid(-40, 50, 0.5)
+    for humidity in (1, 2, 5, 10, 20, 35, 50, 65, 80, 95, 99, 100)
+    for pressure in (500.0, 700.0, 1013.25, 1050.0)
+]
+
+
+def test_wetbulb_legacy():
+    """The root is within 0.02 C of the guess the stepping solver accepted.
+
+    That solver stopped within 0.005 MB of the root, which is less than
+    0.015 C, but returned the guess after it, up to its last step further.
+    """
+    for temp, humidity, pressure in WETBULB_CASES:
+        wetbulb = helpers.wetbulb_newton(temp, humidity, pressure)
+        returned, accepted, step = legacy_wetbulb(temp, humidity, pressure)
+        case = (temp, humidity, pressure)
+        assert wetbulb == pytest.approx(accepted, abs=0.02), case
+        assert wetbulb == pytest.approx(returned, abs=step + 0.02), case
+
+
+def test_wetbulb_residual():
+    """The result solves the psychrometric equation."""
+    for temp, humidity, pressure in WETBULB_CASES:
+        wetbulb = helpers.wetbulb_newton(temp, humidity, pressure)
+        residual = psychrometric_residual(temp, humidity, pressure, wetbulb)
+        assert abs(residual) < 1e-6, (temp, humidity, pressure)
+
+
+def test_wetbulb_stull():
+    """The approximation is within the error its docstring states."""
+    errors = []
+    for temp in grid(-20, 50, 0.5):
+        for humidity in range(5, 100):
+            error = helpers.wetbulb_stull(temp, humidity) - helpers.wetbulb_newton(
+                temp, float(humidity), 1013.25
+            )
+            errors.append(abs(error))
+            # Cold and dry air is the exception
+            if temp > 0 or humidity >= 40:
+                assert -1.5 <= error <= 1, (temp, humidity)
+    assert sum(errors) / len(errors) < 0.45
+
+
+@pytest.mark.parametrize("pressure", [500.0, 1013.25])
+def test_wetbulb_saturated(pressure):
+    """Saturated air is as cold as its wet bulb."""
+    for temp in grid(-40, 50, 0.5):
+        assert helpers.wetbulb_newton(temp, 100.0, pressure) == pytest.approx(temp, abs=1e-6)
+
+
+@pytest.mark.parametrize("humidity", [0.5, 1.0, 3.0, 5.0])
+def test_wetbulb_dry_air(humidity):
+    """Very dry air converges to a wet bulb between the dewpoint and the temperature."""
+    for temp in grid(-40, 50, 0.5):
+        for pressure in (500.0, 1013.25):
+            wetbulb = helpers.wetbulb_newton(temp, humidity, pressure)
+            assert abs(psychrometric_residual(temp, humidity, pressure, wetbulb)) < 1e-6
+            assert psychrometric_dewpoint(temp, humidity) < wetbulb < temp
+
+
+def test_wetbulb_below_freezing():
+    """The solver converges below freezing, where the first guess is the poorest."""
+    for temp in grid(-40, -0.5, 0.5):
+        for humidity in range(1, 101):
+            wetbulb = helpers.wetbulb_newton(temp, float(humidity), 1013.25)
+            assert abs(psychrometric_residual(temp, humidity, 1013.25, wetbulb)) < 1e-6
+            dewpoint = psychrometric_dewpoint(temp, humidity)
+            assert dewpoint - 1e-6 <= wetbulb <= temp + 1e-6, (temp, humidity)
+
+
+@pytest.mark.parametrize("method", [WETBULB_METHOD_NEWTON, WETBULB_METHOD_STULL])
+def test_wetbulb_method(method):
+    cnv = ConversionFunctions(UNITS_METRIC, "en", method)
+    solver = {
+        WETBULB_METHOD_NEWTON: helpers.wetbulb_newton,
+        WETBULB_METHOD_STULL: lambda temp, humidity, _: helpers.wetbulb_stull(temp, humidity),
+    }[method]
+    assert cnv.wetbulb(21.5, 64, 1004.2, True) == solver(21.5, 64.0, 1004.2)
+    assert cnv.wetbulb(None, 64, 1004.2) is None
+    assert cnv.wetbulb(21.5, None, 1004.2) is None
+    assert cnv.wetbulb(21.5, 64, None) is None
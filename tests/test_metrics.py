@@ -0,0 +1,49 @@
+"""Tests for the runtime metrics."""
+from __future__ import annotations
+
+import pytest
+
+from weatherflow2mqtt.metrics import LatencyHistogram
+
+
+def test_empty_histogram():
+    """Nothing recorded has no mean or percentiles."""
+    histogram = LatencyHistogram()
+    assert histogram.mean is None
+    assert histogram.percentile(95) is None
+    assert histogram.as_dict()["count"] == 0
+
+
+@pytest.mark.parametrize(
+    "pct, expected",
+    [(0, 1), (10, 1), (50, 1), (60, 5), (80, 5), (90, 100), (95, 250), (100, 250)],
+)
+def test_percentile_is_the_upper_bucket_bound(pct, expected):
+    """A percentile is the upper bound of the bucket that holds it."""
+    histogram = LatencyHistogram(buckets=(1, 5, 10, 100, 250))
+    # 5 values of 1 ms or less, 3 up to 5, 1 up to 100 and 1 up to 250
+    for value in (0.2, 0.5, 1, 1, 1, 2, 4.9, 5, 99, 200):
+        histogram.add(value)
+    assert histogram.percentile(pct) == expected
+    assert histogram.mean == 31.5
+    assert histogram.max == 200
+
+
+def test_percentile_above_the_buckets():
+    """Values above the last bucket report the maximum."""
+    histogram = LatencyHistogram(buckets=(1, 10))
+    for value in (0.5, 20, 31.25):
+        histogram.add(value)
+    assert histogram.percentile(30) == 1
+    assert histogram.percentile(95) == 31.2
+    assert histogram.as_dict()["buckets"] == {"<=1": 1, "<=10": 0, ">10": 2}
+
+
+def test_reset():
+    """Resetting clears everything that was recorded."""
+    histogram = LatencyHistogram()
+    histogram.add(12)
+    histogram.reset()
+    assert histogram.count == 0
+    assert histogram.max == 0
+    assert sum(histogram.counts) == 0
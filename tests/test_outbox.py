@@ -0,0 +1,172 @@
+"""Tests for the disk backed MQTT outbox."""
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from weatherflow2mqtt.const import TABLE_OUTBOX
+from weatherflow2mqtt.outbox import MqttOutbox
+
+
+@pytest.fixture
+def db_file(tmp_path) -> str:
+    """Return the path of a new outbox database."""
+    return str(tmp_path / "outbox.db")
+
+
+@pytest.fixture
+def outbox(db_file):
+    """Return an open outbox."""
+    outbox = MqttOutbox(db_file, max_messages=10)
+    outbox.open()
+    yield outbox
+    outbox.close()
+
+
+def on_disk(db_file: str) -> list[tuple[str, str]]:
+    """Return the committed messages, as another process would see them."""
+    connection = sqlite3.connect(db_file)
+    try:
+        return connection.execute("SELECT topic, payload FROM outbox ORDER BY seq;").fetchall()
+    finally:
+        connection.close()
+
+
+def topics(outbox: MqttOutbox) -> list[tuple[str, str]]:
+    """Return the spooled messages in replay order."""
+    return [(topic, payload) for _, topic, payload, _, _ in outbox.read()]
+
+
+def test_read_in_spool_order(outbox):
+    """Messages are replayed in the order they were spooled."""
+    outbox.spool("a/state", "1", qos=1, retain=True)
+    outbox.spool("b/state", "2")
+    outbox.spool("c/state", "3", qos=1)
+    assert outbox.pending == 3
+    assert outbox.read() == [
+        (1, "a/state", "1", 1, True),
+        (2, "b/state", "2", 0, False),
+        (3, "c/state", "3", 1, False),
+    ]
+    assert [message[1] for message in outbox.read(limit=2)] == ["a/state", "b/state"]
+
+
+def test_retained_messages_are_coalesced(outbox):
+    """Only the newest retained message for a topic is kept, at the end."""
+    outbox.spool("a/state", "old", retain=True)
+    outbox.spool("b/state", "1", retain=True)
+    outbox.spool("a/state", "new", retain=True)
+    assert outbox.pending == 2
+    assert topics(outbox) == [("b/state", "1"), ("a/state", "new")]
+    assert outbox.has_retained("a/state")
+
+
+def test_events_are_appended(outbox):
+    """Every message that isn't retained is kept, even for the same topic."""
+    outbox.spool("hub/lightning", "strike 1")
+    outbox.spool("hub/state", "old", retain=True)
+    outbox.spool("hub/lightning", "strike 2")
+    outbox.spool("hub/state", "new", retain=True)
+    assert topics(outbox) == [
+        ("hub/lightning", "strike 1"),
+        ("hub/lightning", "strike 2"),
+        ("hub/state", "new"),
+    ]
+    assert not outbox.has_retained("hub/lightning")
+    # A newer state doesn't replace the events
+    assert outbox.discard("hub/lightning") == 0
+    assert outbox.discard("hub/state") == 1
+    assert outbox.pending == 2
+
+
+def test_remove(outbox):
+    """A message is removed once, and not after it was replaced."""
+    outbox.spool("a/state", "old", retain=True)
+    outbox.spool("b/events", "1")
+    (seq_a, *_), (seq_b, *_) = outbox.read()
+    outbox.spool("a/state", "new", retain=True)
+    assert not outbox.remove(seq_a, "a/state", True)
+    assert outbox.remove(seq_b, "b/events", False)
+    assert not outbox.remove(seq_b, "b/events", False)
+    assert outbox.pending == 1
+    (seq_new, *_), = outbox.read()
+    assert outbox.remove(seq_new, "a/state", True)
+    assert outbox.pending == 0
+    assert not outbox.has_retained("a/state")
+    assert outbox.read() == []
+
+
+def test_overflow_drops_the_oldest(db_file):
+    """A full outbox drops its oldest messages."""
+    outbox = MqttOutbox(db_file, max_messages=3)
+    outbox.open()
+    outbox.spool("a/state", "1", retain=True)
+    for number in range(4):
+        outbox.spool("hub/events", str(number))
+    assert outbox.pending == 3
+    assert topics(outbox) == [("hub/events", "1"), ("hub/events", "2"), ("hub/events", "3")]
+    assert not outbox.has_retained("a/state")
+    outbox.close()
+
+
+def test_changes_are_committed_in_batches(outbox, db_file):
+    """Spooled messages are written to disk when they are committed."""
+    for number in range(5):
+        outbox.spool(f"{number}/state", str(number), retain=True)
+    assert outbox.uncommitted
+    assert on_disk(db_file) == []
+    outbox.commit()
+    assert not outbox.uncommitted
+    assert len(on_disk(db_file)) == 5
+
+    (seq, topic, _, _, retain), *_ = outbox.read()
+    outbox.remove(seq, topic, retain)
+    assert len(on_disk(db_file)) == 5
+    outbox.commit()
+    assert len(on_disk(db_file)) == 4
+
+
+def test_close_commits_and_open_loads(db_file):
+    """The spooled messages survive closing and opening the outbox."""
+    outbox = MqttOutbox(db_file)
+    outbox.open()
+    outbox.spool("a/state", "1", retain=True)
+    outbox.spool("hub/events", "2")
+    outbox.close()
+
+    outbox = MqttOutbox(db_file)
+    outbox.open()
+    assert outbox.pending == 2
+    assert outbox.has_retained("a/state")
+    outbox.spool("a/state", "3", retain=True)
+    assert topics(outbox) == [("hub/events", "2"), ("a/state", "3")]
+    outbox.close()
+
+
+def test_upgrade_from_one_message_per_topic(db_file):
+    """An outbox with a unique topic column is upgraded when it is opened."""
+    connection = sqlite3.connect(db_file)
+    connection.execute(TABLE_OUTBOX.replace("topic TEXT NOT NULL,", "topic TEXT NOT NULL UNIQUE,"))
+    connection.executemany(
+        "INSERT INTO outbox(topic, payload, qos, retain, created) VALUES(?, ?, ?, ?, 0);",
+        [("a/state", "1", 1, 1), ("hub/events", "2", 0, 0)],
+    )
+    connection.commit()
+    connection.close()
+
+    outbox = MqttOutbox(db_file)
+    outbox.open()
+    assert outbox.pending == 2
+    outbox.spool("hub/events", "3")
+    assert topics(outbox) == [("a/state", "1"), ("hub/events", "2"), ("hub/events", "3")]
+    outbox.close()
+
+
+def test_unopened_outbox_is_empty(db_file):
+    """An outbox that isn't open ignores messages."""
+    outbox = MqttOutbox(db_file)
+    outbox.spool("a/state", "1")
+    assert outbox.pending == 0
+    assert outbox.read() == []
+    assert outbox.discard("a/state") == 0
@@ -0,0 +1,244 @@
+"""Tests for the scheduler, on an event loop with a fake clock.
+
+The clock of the loop only moves when every task is waiting, and then jumps
+to the next timer, so the jobs run at exact times without waiting for them.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from weatherflow2mqtt import scheduler as scheduler_module
+from weatherflow2mqtt.const import SCHEDULER_MAX_SLEEP
+from weatherflow2mqtt.scheduler import Scheduler, every, next_local_midnight
+
+# The time of the fake clock when the loop starts
+START = 1_700_000_000.0
+
+
+class FakeClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock jumps to the next timer when nothing is ready to run."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.now = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+    def _run_once(self) -> None:
+        if not self._ready:
+            due = [timer.when() for timer in self._scheduled if not timer.cancelled()]
+            if due:
+                self.now = max(self.now, min(due))
+        super()._run_once()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Return a function running a coroutine on the fake clock.
+
+    The scheduler reads the time from the same clock.
+    """
+    loop = FakeClockLoop()
+    monkeypatch.setattr(
+        scheduler_module,
+        "time",
+        SimpleNamespace(time=lambda: START + loop.now, perf_counter=time.perf_counter),
+    )
+
+    def run(coro):
+        return loop.run_until_complete(coro)
+
+    run.now = lambda: START + loop.now
+    yield run
+    loop.close()
+
+
+def recorder(runs: list, name: str, clock, duration: float = 0):
+    """Return a job that records its name and the time it started."""
+
+    async def job():
+        runs.append((name, clock.now() - START))
+        await asyncio.sleep(duration)
+
+    return job
+
+
+async def run_until(scheduler: Scheduler, clock, seconds: float) -> None:
+    """Run the scheduler until the clock reaches `seconds` after the start."""
+    scheduler.start()
+    await asyncio.sleep(START + seconds - clock.now())
+    await scheduler.stop()
+
+
+def test_order(clock):
+    """Jobs run when they are due, in the order they were queued when due together."""
+    runs = []
+
+    async def test():
+        scheduler = Scheduler()
+        scheduler.add_job("a", recorder(runs, "a", clock), every(10))
+        scheduler.add_job("b", recorder(runs, "b", clock), every(15))
+        scheduler.add_job("c", recorder(runs, "c", clock), every(25))
+        await run_until(scheduler, clock, 60.5)
+        return scheduler
+
+    scheduler = clock(test())
+    assert runs == [
+        ("a", 10), ("b", 15), ("a", 20), ("c", 25), ("b", 30), ("a", 30),
+        ("a", 40), ("b", 45), ("c", 50), ("a", 50), ("b", 60), ("a", 60),
+    ]
+    assert scheduler.jobs["a"].runs == 6
+    assert scheduler.jobs["a"].lateness == 0
+    assert scheduler.diagnostics()["c"]["next_run"] == round(75 - 60.5)
+
+
+def test_job_added_while_sleeping(clock):
+    """A job that is due before the one the scheduler waits for runs on time."""
+    runs = []
+
+    async def test():
+        scheduler = Scheduler()
+        scheduler.add_job("daily", recorder(runs, "daily", clock), every(86400))
+        scheduler.start()
+        await asyncio.sleep(5)
+        scheduler.add_job("soon", recorder(runs, "soon", clock), every(3600), first_run=clock.now() + 7)
+        await asyncio.sleep(10)
+        await scheduler.stop()
+
+    clock(test())
+    assert runs == [("soon", 12)]
+
+
+def test_no_wake_ups(clock, monkeypatch):
+    """An idle scheduler only wakes up to notice a change of the clock."""
+    waits = []
+    wait_for = asyncio.wait_for
+
+    async def counting_wait_for(awaitable, timeout):
+        waits.append(timeout)
+        return await wait_for(awaitable, timeout)
+
+    monkeypatch.setattr(scheduler_module.asyncio, "wait_for", counting_wait_for)
+
+    async def test():
+        scheduler = Scheduler()
+        scheduler.add_job("daily", lambda: None, every(86400))
+        await run_until(scheduler, clock, 86400 + 1)
+
+    clock(test())
+    assert len(waits) == -(-86400 // SCHEDULER_MAX_SLEEP) + 1
+
+
+def test_overrun(clock):
+    """A job that overruns its interval runs again right away, once, and is late."""
+    runs = []
+
+    async def test():
+        scheduler = Scheduler()
+        scheduler.add_job("slow", recorder(runs, "slow", clock, duration=25), every(10))
+        scheduler.add_job("fast", recorder(runs, "fast", clock), every(10), first_run=START + 15)
+        await run_until(scheduler, clock, 90)
+        return scheduler
+
+    scheduler = clock(test())
+    # The next run is due 10 seconds after the last one started
+    assert [start for name, start in runs if name == "slow"] == [10, 35, 60, 85]
+    assert scheduler.jobs["slow"].lateness == 15
+    # The other job waits for the slow one, and doesn't catch up on the runs it missed
+    assert runs[:4] == [("slow", 10), ("fast", 35), ("slow", 35), ("fast", 60)]
+    assert [start for name, start in runs if name == "fast"] == [35, 60, 85]
+    assert scheduler.jobs["fast"].lateness == 15
+    assert scheduler.jobs["slow"].failures == 0
+
+
+def test_failing_job(clock):
+    """A job that raises is counted as failed and runs again."""
+    runs = []
+
+    def job():
+        runs.append(clock.now() - START)
+        raise ValueError("no data")
+
+    async def test():
+        scheduler = Scheduler()
+        scheduler.add_job("failing", job, every(10))
+        await run_until(scheduler, clock, 35)
+        return scheduler
+
+    scheduler = clock(test())
+    assert runs == [10, 20, 30]
+    assert scheduler.diagnostics()["failing"]["failures"] == 3
+    assert scheduler.diagnostics()["failing"]["runs"] == 3
+
+
+@pytest.mark.parametrize("running", [False, True], ids=["waiting", "running"])
+def test_stop(clock, running):
+    """Stopping cancels the scheduler, also while a job runs, and ends `wait`."""
+    runs = []
+    cancelled = []
+
+    async def job():
+        runs.append(clock.now() - START)
+        try:
+            await asyncio.sleep(100)
+        except asyncio.CancelledError:
+            cancelled.append(clock.now() - START)
+            raise
+
+    async def test():
+        scheduler = Scheduler()
+        scheduler.add_job("job", job, every(10))
+        waiter = asyncio.ensure_future(scheduler.wait())
+        scheduler.start()
+        await asyncio.sleep(15 if running else 5)
+        assert not waiter.done()
+        await scheduler.stop()
+        await asyncio.wait_for(waiter, 1)
+        # Nothing runs after stopping
+        await asyncio.sleep(100)
+        return scheduler
+
+    scheduler = clock(test())
+    assert runs == ([10] if running else [])
+    assert cancelled == ([15] if running else [])
+    assert scheduler.jobs["job"].failures == 0
+    assert scheduler._task is None
+
+
+def test_wait_before_start(clock):
+    """`wait` ends when a scheduler that never started is stopped."""
+
+    async def test():
+        scheduler = Scheduler()
+        waiter = asyncio.ensure_future(scheduler.wait())
+        await asyncio.sleep(1)
+        assert not waiter.done()
+        await scheduler.stop()
+        await asyncio.wait_for(waiter, 1)
+        # Waiting on a stopped scheduler returns right away
+        await asyncio.wait_for(scheduler.wait(), 1)
+
+    clock(test())
+
+
+@pytest.mark.parametrize(
+    "day, hours", [((2023, 3, 26), 23), ((2023, 10, 29), 25), ((2023, 6, 1), 24)]
+)
+def test_next_local_midnight(monkeypatch, day, hours):
+    """Local midnight follows the clock on days with a DST change."""
+    monkeypatch.setenv("TZ", "Europe/Copenhagen")
+    time.tzset()
+    try:
+        midnight = datetime(*day).timestamp()
+        assert next_local_midnight(midnight - 1) == midnight
+        assert next_local_midnight(midnight) == midnight + hours * 3600
+        assert next_local_midnight(midnight + 12 * 3600) == midnight + hours * 3600
+    finally:
+        monkeypatch.undo()
+        time.tzset()
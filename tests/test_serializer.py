@@ -0,0 +1,86 @@
+"""Tests for the JSON serializers of the MQTT payloads."""
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+
+import pytest
+
+from weatherflow2mqtt import serializer
+from weatherflow2mqtt.serializer import (
+    SERIALIZER_JSON,
+    SERIALIZER_ORJSON,
+    JsonSerializer,
+    OrjsonSerializer,
+    get_serializer,
+)
+
+PAYLOADS = [
+    # Observation state
+    {
+        "air_temperature": 22.4,
+        "relative_humidity": 50,
+        "wind_speed": 0.8,
+        "wind_direction": 144,
+        "wind_direction_cardinal": "SE",
+        "precipitation_type": "Keine",
+        "battery": 2.41,
+        "lightning_strike_count": 0,
+        "uv_description": "Niedrig",
+        "pressure_trend": "Steady",
+        "last_lightning_strike": None,
+        "is_raining": False,
+    },
+    # High and low values
+    {"air_temperature": {"max_day": 24.1, "max_day_time": "2022-06-04T14:21:00+00:00"}},
+    # Discovery config, with characters that are escaped by the json module
+    OrderedDict(
+        name="Température ressentie",
+        unique_id="ST-00000512-feelslike",
+        unit_of_measurement="°C",
+        value_template="{{ value_json.feelslike }}",
+        json_attributes_template='{"attribution": "Powered by WeatherFlow2MQTT"}',
+        device={"identifiers": ["ST-00000512"], "name": "Tempest 0512"},
+    ),
+    # Forecast
+    [{"datetime": "2022-06-04", "temperature": 24.0, "condition": "sunny"}] * 10,
+    # Numbers that are easy to get wrong
+    {"tiny": 1e-7, "large": 1.5e300, "negative": -0.0, "int": 2**63 - 1, "digits": 0.1 + 0.2},
+    # Integers larger than 64 bit fall back to the json module
+    {"big": 2**70},
+    {},
+    [],
+    "text",
+    None,
+]
+
+
+@pytest.mark.skipif(serializer.orjson is None, reason="orjson is not installed")
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_payloads_decode_the_same(payload):
+    """orjson and the json module write payloads that decode to the same data."""
+    written = OrjsonSerializer().dumps(payload)
+    assert isinstance(written, str)
+    assert json.loads(written) == json.loads(JsonSerializer().dumps(payload))
+
+
+@pytest.mark.skipif(serializer.orjson is None, reason="orjson is not installed")
+def test_orjson_keeps_the_key_order():
+    """Keys are written in the order of the data, like the json module."""
+    payload = PAYLOADS[2]
+    assert list(json.loads(OrjsonSerializer().dumps(payload))) == list(payload)
+
+
+def test_json_serializer_is_unchanged():
+    """The json module writes the payloads the way older versions did."""
+    for payload in PAYLOADS:
+        assert JsonSerializer().dumps(payload) == json.dumps(payload)
+
+
+def test_get_serializer(monkeypatch):
+    """The named serializer is used if it is available."""
+    assert get_serializer(SERIALIZER_JSON).name == SERIALIZER_JSON
+    assert get_serializer("yaml").name == SERIALIZER_JSON
+    monkeypatch.setattr(serializer, "orjson", None)
+    assert get_serializer().name == SERIALIZER_JSON
+    assert get_serializer(SERIALIZER_ORJSON).name == SERIALIZER_JSON
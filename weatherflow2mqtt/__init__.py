@@ -1 +1,5 @@
 """A Program to receive UDP data from Weatherflow and Publish to MQTT."""
+import time
+
+# Used to report the time from import until listening for UDP data
+STARTUP_TIME = time.perf_counter()
@@ -1,11 +1,14 @@
 """Main module."""
 import asyncio
+import os
 
 from weatherflow2mqtt import weatherflow_mqtt
+from weatherflow2mqtt.event_loop import set_event_loop
 
 
 def main():
     """Start Main Program."""
+    set_event_loop(os.getenv("EVENT_LOOP"))
     try:
         asyncio.run(weatherflow_mqtt.main())
     except KeyboardInterrupt:
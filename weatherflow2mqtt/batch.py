@@ -0,0 +1,190 @@
+"""Conversions over whole columns of observations.
+
+Used when recomputing history. Columns are `array.array("d")` (or any
+sequence of floats, like a list or a NumPy array) with NaN for missing
+values. The results are `array.array("d")`, which NumPy can wrap without
+copying with `numpy.frombuffer`, and every value is the same as the scalar
+function returns for the row, with NaN for `None`.
+
+The formulas are the functions in `helpers` that `ConversionFunctions` uses
+itself. NumPy is not used to compute: its `exp`, `log` and `round` are not
+guaranteed to round like the `math` module and `round`, so the results
+could differ in the last digit.
+"""
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Iterable, Sequence
+
+from .const import WETBULB_METHOD_STULL
+from .helpers import (
+    ConversionFunctions,
+    absolute_humidity_gm3,
+    dewpoint_celsius,
+    feels_like_celsius,
+    visibility_km,
+    wbgt_celsius,
+    wetbulb_newton,
+    wetbulb_stull,
+)
+
+NAN = math.nan
+
+Column = Sequence[float]
+
+
+def column(values: Iterable[float | None]) -> array:
+    """Return the values as a column, with NaN for missing values."""
+    return array("d", (NAN if value is None else value for value in values))
+
+
+def _floats(values: Column) -> Iterable[float]:
+    """Return the values of a column as Python floats."""
+    # NumPy arrays are much faster to read as a list
+    return values.tolist() if hasattr(values, "tolist") else values
+
+
+class BatchConversionFunctions:
+    """Class to convert columns of values from different units."""
+
+    def __init__(self, conversions: ConversionFunctions) -> None:
+        """Initialize Batch Conversion Functions."""
+        self.cnv = conversions
+
+    def temperature(self, values: Column) -> array:
+        """Convert Temperature Values."""
+        return array("d", map(self.cnv.temperature, _floats(values)))
+
+    def pressure(self, values: Column) -> array:
+        """Convert Pressure Values."""
+        return array("d", map(self.cnv.pressure, _floats(values)))
+
+    def speed(self, values: Column, kmh: bool = False) -> array:
+        """Convert Wind Speeds."""
+        speed = self.cnv.speed
+        return array("d", [speed(value, kmh) for value in _floats(values)])
+
+    def distance(self, values: Column) -> array:
+        """Convert distances."""
+        return array("d", map(self.cnv.distance, _floats(values)))
+
+    def rain(self, values: Column) -> array:
+        """Convert rain."""
+        return array("d", map(self.cnv.rain, _floats(values)))
+
+    def dewpoint(
+        self, temperatures: Column, humidities: Column, no_conversion: bool = False
+    ) -> array:
+        """Return Dewpoints."""
+        result = array(
+            "d",
+            [
+                round(dewpoint_celsius(temperature, humidity), 1)
+                for temperature, humidity in zip(_floats(temperatures), _floats(humidities))
+            ],
+        )
+        if no_conversion:
+            return result
+        return self.temperature(result)
+
+    def absolute_humidity(self, temperatures: Column, humidities: Column) -> array:
+        """Return Absolute Humidities in g/m^3."""
+        return array(
+            "d",
+            [
+                round(absolute_humidity_gm3(temperature, humidity), 2)
+                for temperature, humidity in zip(_floats(temperatures), _floats(humidities))
+            ],
+        )
+
+    def feels_like(
+        self, temperatures: Column, humidities: Column, wind_speeds: Column
+    ) -> array:
+        """Return Feels Like Temperatures.
+
+        Like the scalar function, 0 is returned if a value is missing.
+        """
+        temperature = self.cnv.temperature
+        return array(
+            "d",
+            [
+                0 if value != value else temperature(value)
+                for value in map(
+                    feels_like_celsius,
+                    _floats(temperatures),
+                    _floats(humidities),
+                    _floats(wind_speeds),
+                )
+            ],
+        )
+
+    def visibility(
+        self, elevation: float, temperatures: Column, humidities: Column
+    ) -> array:
+        """Return the visibilities."""
+        distance = self.cnv._visibility_distance
+        dewpoints = self.dewpoint(temperatures, humidities, True)
+        return array(
+            "d",
+            [
+                distance(visibility_km(elevation, temperature, dewpoint))
+                for temperature, dewpoint in zip(_floats(temperatures), dewpoints)
+            ],
+        )
+
+    def wetbulb(
+        self,
+        temperatures: Column,
+        humidities: Column,
+        pressures: Column,
+        no_conversion: bool = False,
+    ) -> array:
+        """Return Wet Bulb Temperatures."""
+        if self.cnv.wetbulb_method == WETBULB_METHOD_STULL:
+            result = array(
+                "d",
+                [
+                    NAN if pressure != pressure else wetbulb_stull(temperature, humidity)
+                    for temperature, humidity, pressure in zip(
+                        _floats(temperatures), _floats(humidities), _floats(pressures)
+                    )
+                ],
+            )
+        else:
+            result = array(
+                "d",
+                [
+                    NAN
+                    if temperature != temperature or humidity != humidity or pressure != pressure
+                    else wetbulb_newton(temperature, humidity, pressure)
+                    for temperature, humidity, pressure in zip(
+                        _floats(temperatures), _floats(humidities), _floats(pressures)
+                    )
+                ],
+            )
+        if no_conversion:
+            return result
+        return self.temperature(result)
+
+    def wbgt(
+        self,
+        temperatures: Column,
+        humidities: Column,
+        pressures: Column,
+        solar_radiations: Column,
+    ) -> array:
+        """Return Wet Bulb Globe Temperatures."""
+        wetbulbs = self.wetbulb(temperatures, humidities, pressures, True)
+        return self.temperature(
+            array(
+                "d",
+                map(
+                    wbgt_celsius,
+                    wetbulbs,
+                    _floats(temperatures),
+                    _floats(humidities),
+                    _floats(solar_radiations),
+                ),
+            )
+        )
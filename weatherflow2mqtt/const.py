@@ -22,7 +22,21 @@ EXTERNAL_DIRECTORY = os.environ.get("EXTERNAL_DIRECTORY", "/data")
 INTERNAL_DIRECTORY = "/app"
 STORAGE_FILE = f"{EXTERNAL_DIRECTORY}/.storage.json"
 DATABASE = f"{EXTERNAL_DIRECTORY}/weatherflow2mqtt.db"
-DATABASE_VERSION = 2
+DATABASE_VERSION = 3
+FORECAST_CACHE_FILE = f"{EXTERNAL_DIRECTORY}/.forecast_{{}}.json"
+OUTBOX_DATABASE = f"{EXTERNAL_DIRECTORY}/weatherflow2mqtt_outbox.db"
+OUTBOX_DATABASE_BROKER = f"{EXTERNAL_DIRECTORY}/weatherflow2mqtt_outbox_{{}}.db"
+OUTBOX_MAX_MESSAGES = 1000
+OUTBOX_VERSION = 2
+# Seconds that changes to the outbox are collected before they are committed
+OUTBOX_COMMIT_DELAY = 1
+MQTT_QUEUE_SIZE = 10000
+EVENT_SINK_QUEUE_SIZE = 1000
+EVENT_SINK_BATCH_SIZE = 100
+# A record file is rotated when it would grow past this size, keeping this many old files
+EVENT_SINK_FILE_MAX_BYTES = 10 * 1024 * 1024
+EVENT_SINK_FILE_BACKUPS = 3
+MQTT_RATE_LIMIT = 100
 STORAGE_ID = 1
 
 TABLE_STORAGE = """ CREATE TABLE IF NOT EXISTS storage (
@@ -97,6 +111,22 @@ TABLE_DAY_DATA = """ CREATE TABLE IF NOT EXISTS day_data (
                     solar_radiation REAL
                 );"""
 
+TABLE_MIGRATIONS = """ CREATE TABLE IF NOT EXISTS migrations (
+                    name TEXT PRIMARY KEY,
+                    timestamp REAL
+                );"""
+
+TABLE_OUTBOX = """ CREATE TABLE IF NOT EXISTS outbox (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    topic TEXT NOT NULL,
+                    payload BLOB,
+                    qos INTEGER,
+                    retain INTEGER,
+                    created REAL
+                );"""
+
+INDEX_OUTBOX_TOPIC = """ CREATE INDEX IF NOT EXISTS outbox_topic ON outbox (topic);"""
+
 COL_TEMPERATURE = "air_temperature"
 COL_HUMIDITY = "relative_humidity"
 COL_DEWPOINT = "dewpoint"
@@ -137,20 +167,35 @@ DEVICE_CLASS_VOLTAGE = "voltage"
 DEVICE_CLASS_WIND_SPEED="wind_speed"
 
 
+ENTITY_CATEGORY_DIAGNOSTIC = "diagnostic"
+
 STATE_CLASS_MEASUREMENT = "measurement"
 STATE_CLASS_INCREASING = "total_increasing"
 
+EVENT_DIAGNOSTICS = "diagnostics"
 EVENT_FORECAST = "weather"
 EVENT_HIGH_LOW = "high_low"
 
 FORECAST_TYPE_DAILY = "daily"
 FORECAST_TYPE_HOURLY = "hourly"
 FORECAST_ENTITY = "weather"
+FORECAST_HOURLY_ENTITY = "weather_hourly"
 FORECAST_HOURLY_HOURS = 36
+FORECAST_DNS_CACHE_TTL = 5 * 60
+FORECAST_KEEPALIVE_TIMEOUT = 60
+FORECAST_MAX_CONCURRENT = 4
+FORECAST_JITTER = 2 * 60
+FORECAST_STARTUP_JITTER = 30
+FORECAST_BACKOFF_BASE = 30
+FORECAST_BACKOFF_MAX = 10 * 60
+FORECAST_CIRCUIT_FAILURES = 5
+FORECAST_CIRCUIT_TIMEOUT = 30 * 60
 
 STRIKE_COUNT_TIMER = 3 * 60 * 60
 PRESSURE_TREND_TIMER = 3 * 60 * 60
 HIGH_LOW_TIMER = 10 * 60
+DIAGNOSTICS_TIMER = 60
+SCHEDULER_MAX_SLEEP = 60 * 60
 
 LANGUAGE_ENGLISH = "en"
 LANGUAGE_DANISH = "da"
@@ -174,6 +219,9 @@ UNITS_METRIC = "metric"
 
 UTC = datetime.timezone.utc
 
+WETBULB_METHOD_NEWTON = "newton"
+WETBULB_METHOD_STULL = "stull"
+
 ZAMBRETTI_MIN_PRESSURE = 960
 ZAMBRETTI_MAX_PRESSURE = 1060
 
@@ -0,0 +1,352 @@
+"""Fan out the records of the handlers to the outputs.
+
+The handlers emit each observation, wind, strike, rain start and status
+update once, as a `Record` with the values already converted. Every sink
+subscribed to the bus gets the record. Sinks that write to files or other
+servers have their own bounded queue, so a slow sink drops its oldest
+records instead of holding up the handlers or the other sinks.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping
+from urllib.parse import urlsplit
+
+from .const import (
+    DEFAULT_TIMEOUT,
+    EVENT_SINK_BATCH_SIZE,
+    EVENT_SINK_FILE_BACKUPS,
+    EVENT_SINK_FILE_MAX_BYTES,
+    EVENT_SINK_QUEUE_SIZE,
+)
+from .serializer import JsonSerializer, get_serializer
+
+if TYPE_CHECKING:
+    # aiohttp is only imported when a webhook is used
+    from aiohttp import ClientSession
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORD_OBSERVATION = "observation"
+RECORD_RAIN_START = "rain_start"
+RECORD_RAPID_WIND = "rapid_wind"
+RECORD_STATUS = "status"
+RECORD_STRIKE = "strike"
+RECORD_KINDS = (
+    RECORD_OBSERVATION,
+    RECORD_RAIN_START,
+    RECORD_RAPID_WIND,
+    RECORD_STATUS,
+    RECORD_STRIKE,
+)
+
+
+def freeze(value: Any) -> Any:
+    """Return a read-only copy of the mappings and lists in a value."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class Record:
+    """A record emitted by a handler.
+
+    For observations, `data` holds the values of each event, by event name.
+    Every sink gets the same record, so `data` and `attributes` are frozen
+    copies that no sink can change for the others. The serializers write
+    them like dicts.
+    """
+
+    kind: str
+    serial_number: str
+    data: Mapping[str, Any]
+    attributes: Mapping[str, Any] | None = None
+    timestamp: float = field(default_factory=time.time)
+
+    def __post_init__(self) -> None:
+        """Freeze the values."""
+        object.__setattr__(self, "data", freeze(self.data))
+        if self.attributes is not None:
+            object.__setattr__(self, "attributes", freeze(self.attributes))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the record as a dict that can be serialized."""
+        return {
+            "kind": self.kind,
+            "serial_number": self.serial_number,
+            "timestamp": self.timestamp,
+            "data": self.data,
+            **({} if self.attributes is None else {"attributes": self.attributes}),
+        }
+
+
+class Sink(ABC):
+    """Base class of the outputs subscribed to the event bus."""
+
+    def __init__(self, name: str, kinds: Iterable[str] | None = None) -> None:
+        """Initialize a Sink.
+
+        If `kinds` is given, only records of those kinds are sent to the sink.
+        """
+        self.name = name
+        self.kinds = None if kinds is None else frozenset(kinds)
+
+    def accepts(self, record: Record) -> bool:
+        """Return `True` if the sink wants the record."""
+        return self.kinds is None or record.kind in self.kinds
+
+    @abstractmethod
+    def put(self, record: Record) -> None:
+        """Handle a record, without blocking."""
+
+    async def start(self) -> None:
+        """Start the sink."""
+
+    async def stop(self) -> None:
+        """Stop the sink."""
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the health metrics of the sink."""
+        return {}
+
+
+class CallbackSink(Sink):
+    """Sink that hands every record to a function right away.
+
+    Used for outputs that already queue on their own, like the MQTT outputs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        callback: Callable[[Record], None],
+        kinds: Iterable[str] | None = None,
+    ) -> None:
+        """Initialize a Callback Sink."""
+        super().__init__(name, kinds)
+        self._callback = callback
+
+    def put(self, record: Record) -> None:
+        """Handle a record, without blocking."""
+        self._callback(record)
+
+
+class QueuedSink(Sink):
+    """Sink that writes the records in batches from its own queue.
+
+    When the queue is full, the oldest record is dropped to make room.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kinds: Iterable[str] | None = None,
+        queue_size: int = EVENT_SINK_QUEUE_SIZE,
+        serializer: JsonSerializer | None = None,
+    ) -> None:
+        """Initialize a Queued Sink."""
+        super().__init__(name, kinds)
+        self.serializer = serializer if serializer is not None else get_serializer()
+        self._queue: asyncio.Queue[Record] = asyncio.Queue(maxsize=queue_size)
+        self._task: asyncio.Future | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def put(self, record: Record) -> None:
+        """Queue a record, dropping the oldest one if the queue is full."""
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(record)
+
+    async def start(self) -> None:
+        """Start writing the queued records."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._writer())
+
+    async def stop(self) -> None:
+        """Stop writing the queued records."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the health metrics of the sink."""
+        return {
+            "queue_size": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    @abstractmethod
+    async def write(self, records: list[Record]) -> None:
+        """Write a batch of records."""
+
+    async def _writer(self) -> None:
+        """Write the records as they are queued."""
+        while True:
+            records = [await self._queue.get()]
+            while len(records) < EVENT_SINK_BATCH_SIZE and not self._queue.empty():
+                records.append(self._queue.get_nowait())
+            try:
+                await self.write(records)
+                self.written += len(records)
+            except Exception as e:
+                self.failed += len(records)
+                _LOGGER.error(
+                    "Could not write %s records to %s. Error is: %s",
+                    len(records),
+                    self.name,
+                    e,
+                )
+
+
+class JsonLinesSink(QueuedSink):
+    """Sink that appends the records to a file, one JSON object per line.
+
+    When the file would grow past `max_bytes`, it is renamed to `path.1`,
+    the older files move up a number and the oldest of `backups` is removed.
+    A `max_bytes` of 0 keeps a single file that grows without limit.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = EVENT_SINK_FILE_MAX_BYTES,
+        backups: int = EVENT_SINK_FILE_BACKUPS,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize a JSON Lines Sink."""
+        super().__init__(f"file://{path}", **kwargs)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotations = 0
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the health metrics of the sink."""
+        return {**super().diagnostics(), "rotations": self.rotations}
+
+    async def write(self, records: list[Record]) -> None:
+        """Write a batch of records."""
+        lines = "".join(
+            f"{self.serializer.dumps(record.as_dict())}\n" for record in records
+        )
+        await asyncio.to_thread(self._append, lines.encode("utf-8"))
+
+    def _append(self, lines: bytes) -> None:
+        """Append the lines to the file, rotating it first if they don't fit."""
+        if self.max_bytes:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size and size + len(lines) > self.max_bytes:
+                self._rotate()
+        with open(self.path, "ab") as archive:
+            archive.write(lines)
+
+    def _rotate(self) -> None:
+        """Move the file to `path.1`, and the older files up a number."""
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(older := f"{self.path}.{number}"):
+                os.replace(older, f"{self.path}.{number + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+
+
+class WebhookSink(QueuedSink):
+    """Sink that posts each batch of records to a URL, as a JSON array."""
+
+    def __init__(self, url: str, **kwargs: Any) -> None:
+        """Initialize a Webhook Sink."""
+        # The name is in the diagnostics, so it leaves out credentials and the query
+        parts = urlsplit(url)
+        super().__init__(
+            f"{parts.scheme}://{parts.netloc.rpartition('@')[2]}{parts.path}", **kwargs
+        )
+        self.url = url
+        self._session: ClientSession | None = None
+
+    async def stop(self) -> None:
+        """Stop posting and close the session."""
+        await super().stop()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def write(self, records: list[Record]) -> None:
+        """Write a batch of records."""
+        if self._session is None:
+            from aiohttp import ClientSession, ClientTimeout
+
+            self._session = ClientSession(timeout=ClientTimeout(total=DEFAULT_TIMEOUT))
+        async with self._session.post(
+            self.url,
+            data=self.serializer.dumps([record.as_dict() for record in records]),
+            headers={"Content-Type": "application/json"},
+        ) as resp:
+            resp.raise_for_status()
+
+
+class EventBus:
+    """Event bus sending the records of the handlers to the sinks."""
+
+    def __init__(self) -> None:
+        """Initialize the Event Bus."""
+        self.sinks: list[Sink] = []
+
+    def subscribe(self, sink: Sink) -> None:
+        """Send the records to a sink."""
+        self.sinks.append(sink)
+
+    def emit(self, record: Record) -> None:
+        """Send a record to every sink that wants it.
+
+        A sink that fails to take the record doesn't keep it from the others.
+        """
+        for sink in self.sinks:
+            if sink.accepts(record):
+                try:
+                    sink.put(record)
+                except Exception as e:
+                    _LOGGER.error(
+                        "Could not send the %s record to %s. Error is: %s",
+                        record.kind,
+                        sink.name,
+                        e,
+                    )
+
+    async def start(self) -> None:
+        """Start the sinks."""
+        for sink in self.sinks:
+            await sink.start()
+
+    async def stop(self) -> None:
+        """Stop the sinks."""
+        for sink in self.sinks:
+            await sink.stop()
+
+    def diagnostics(self) -> dict[str, dict[str, Any]]:
+        """Return the health metrics of the sinks that have any."""
+        return {
+            sink.name: data for sink in self.sinks if (data := sink.diagnostics())
+        }
@@ -0,0 +1,34 @@
+"""Select the asyncio event loop.
+
+`uvloop` is used if it is selected and installed, otherwise the default
+asyncio event loop is used.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+EVENT_LOOP_ASYNCIO = "asyncio"
+EVENT_LOOP_UVLOOP = "uvloop"
+
+
+def set_event_loop(name: str | None = None) -> str:
+    """Make `asyncio.run` use the event loop with the given name.
+
+    Returns the name of the event loop that will be used.
+    """
+    if name == EVENT_LOOP_UVLOOP:
+        # uvloop is only imported when it is selected
+        try:
+            import uvloop
+        except ImportError:
+            _LOGGER.warning("uvloop is not installed. Using the asyncio event loop instead")
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            return EVENT_LOOP_UVLOOP
+    elif name and name != EVENT_LOOP_ASYNCIO:
+        _LOGGER.warning("Unknown event loop %s. Using the asyncio event loop", name)
+    asyncio.set_event_loop_policy(None)
+    return EVENT_LOOP_ASYNCIO
@@ -2,13 +2,15 @@
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
+import math
+import os
+import random
+import time
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, OrderedDict
-
-from aiohttp import ClientSession, ClientTimeout
-from aiohttp.client_exceptions import ClientError
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, OrderedDict
 
 from .const import (
     ATTR_ATTRIBUTION,
@@ -26,7 +28,17 @@ from .const import (
     BASE_URL,
     CONDITION_CLASSES,
     DEFAULT_TIMEOUT,
+    FORECAST_BACKOFF_BASE,
+    FORECAST_BACKOFF_MAX,
+    FORECAST_CIRCUIT_FAILURES,
+    FORECAST_CIRCUIT_TIMEOUT,
+    FORECAST_ENTITY,
+    FORECAST_DNS_CACHE_TTL,
+    FORECAST_HOURLY_ENTITY,
     FORECAST_HOURLY_HOURS,
+    FORECAST_JITTER,
+    FORECAST_KEEPALIVE_TIMEOUT,
+    FORECAST_STARTUP_JITTER,
     FORECAST_TYPE_DAILY,
     FORECAST_TYPE_HOURLY,
     LANGUAGE_ENGLISH,
@@ -34,8 +46,19 @@ from .const import (
 )
 from .helpers import ConversionFunctions
 
+if TYPE_CHECKING:
+    # aiohttp is only imported when forecasts are requested
+    from aiohttp import ClientSession, TraceConfig
+
 _LOGGER = logging.getLogger(__name__)
 
+# Home Assistant condition of each forecast icon. An icon listed under several
+# conditions gets the first one
+CONDITION_BY_ICON: dict[str, str] = {}
+for _condition, _icons in CONDITION_CLASSES.items():
+    for _icon in _icons:
+        CONDITION_BY_ICON.setdefault(_icon, _condition)
+
 
 @dataclass
 class ForecastConfig:
@@ -44,6 +67,9 @@ class ForecastConfig:
     station_id: str
     token: str
     interval: int = 30
+    base_url: str = BASE_URL
+    # Appended to the entity ids, to tell the forecasts of several stations apart
+    entity_suffix: str = ""
 
 
 class Forecast:
@@ -54,26 +80,50 @@ class Forecast:
         station_id: str,
         token: str,
         interval: int = 30,
-        conversions: ConversionFunctions = ConversionFunctions(
-            unit_system=UNITS_METRIC, language=LANGUAGE_ENGLISH
-        ),
+        conversions: ConversionFunctions | None = None,
         session: ClientSession | None = None,
+        base_url: str = BASE_URL,
+        cache_file: str | None = None,
+        entity_suffix: str = "",
     ):
-        """Initialize a Forecast object."""
+        """Initialize a Forecast object.
+
+        If no session is given, the forecast opens its own pooled session on
+        the first request, and `close` must be called when done.
+
+        If a cache file is given, the last good forecast response is kept in
+        it, to publish at startup and for conditional requests.
+        """
         self.station_id = station_id
         self.token = token
         self.interval = interval
-        self.conversions = conversions
+        self.conversions = (
+            conversions
+            if conversions is not None
+            else ConversionFunctions(unit_system=UNITS_METRIC, language=LANGUAGE_ENGLISH)
+        )
+        self._daily_item, self._hourly_item = self._row_transformers()
+        self.base_url = base_url
+        self.entity_suffix = entity_suffix
+        self.entity_id = f"{FORECAST_ENTITY}{entity_suffix}"
+        self.hourly_entity_id = f"{FORECAST_HOURLY_ENTITY}{entity_suffix}"
         self._session: ClientSession = session
+        self._owns_session = False
+        self._session_source: Forecast | None = None
+        # Duration in ms of each phase of the last request
+        self.request_timings: dict[str, float | None] = {}
+        self.cache_file = cache_file
+        self._cache: dict[str, Any] | None = None
+        # The last response, which is only cached once it has been formatted
+        self._pending_cache: dict[str, Any] | None = None
 
     @classmethod
     def from_config(
         cls,
         config: ForecastConfig,
-        conversions: ConversionFunctions = ConversionFunctions(
-            unit_system=UNITS_METRIC, language=LANGUAGE_ENGLISH
-        ),
+        conversions: ConversionFunctions | None = None,
         session: ClientSession | None = None,
+        cache_file: str | None = None,
     ) -> Forecast:
         """Create a Forecast from a Forecast Config."""
         return cls(
@@ -82,137 +132,311 @@ class Forecast:
             interval=config.interval,
             conversions=conversions,
             session=session,
+            base_url=config.base_url,
+            cache_file=cache_file,
+            entity_suffix=config.entity_suffix,
         )
 
+    def share_session(self, forecast: Forecast) -> None:
+        """Send the requests over the session of another forecast.
+
+        The other forecast owns the session, so it must be closed last.
+        """
+        self._session_source = forecast
+
+    async def close(self) -> None:
+        """Close the session, if it was opened by the forecast."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def load_cache(self) -> float | None:
+        """Load the cached forecast response and return when it was fetched.
+
+        Returns `None` if there is no cached response.
+        """
+        if self._cache is None and self.cache_file is not None:
+            try:
+                with open(self.cache_file, "r") as cache_file:
+                    cache = json.load(cache_file)
+                if not isinstance(cache, dict) or not {"fetched", "data"} <= cache.keys():
+                    raise ValueError("The cached response is incomplete")
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                _LOGGER.warning("Could not read the forecast cache. Error message: %s", e)
+                return None
+            self._cache = cache
+        return None if self._cache is None else self._cache["fetched"]
+
+    @property
+    def cached_data(self) -> dict[str, Any] | None:
+        """Return the cached forecast response."""
+        return None if self._cache is None else self._cache["data"]
+
+    def cached_forecast(self) -> tuple[OrderedDict, OrderedDict, OrderedDict] | None:
+        """Return the formatted cached forecast.
+
+        Returns `None` if there is no cached response. A cached response that
+        can't be formatted is discarded, so it is treated as missing.
+        """
+        if self.load_cache() is None:
+            return None
+        try:
+            return self.format_forecast(self.cached_data)
+        except Exception:
+            _LOGGER.exception("The cached forecast is invalid. Discarding it")
+            self._discard_cache()
+            return None
+
+    def _store_cache(self) -> None:
+        """Keep the last response, with the validators for the next request."""
+        if self._pending_cache is not None:
+            self._cache, self._pending_cache = self._pending_cache, None
+            self._write_cache()
+
+    def _discard_cache(self) -> None:
+        """Forget the cached response and remove it from disk."""
+        self._cache = None
+        if self.cache_file is not None:
+            try:
+                os.remove(self.cache_file)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                _LOGGER.warning("Could not remove the forecast cache. Error message: %s", e)
+
+    def _write_cache(self) -> None:
+        """Write the cached forecast response to disk."""
+        if self.cache_file is None:
+            return
+        try:
+            with open(self.cache_file, "w") as cache_file:
+                json.dump(self._cache, cache_file)
+        except Exception as e:
+            _LOGGER.warning("Could not write the forecast cache. Error message: %s", e)
+
     async def update_forecast(self):
         """Return the formatted forecast data."""
         json_data = await self.async_request(
             method="get",
             endpoint=f"better_forecast?station_id={self.station_id}&token={self.token}",
+            use_cache=True,
         )
-        items = []
 
         if json_data is not None:
-            # We need a few Items from the Current Conditions section
-            current_cond = json_data.get("current_conditions")
-            current_icon = current_cond["icon"]
-            today = datetime.date(datetime.now())
+            try:
+                data = self.format_forecast(json_data)
+            except Exception:
+                # Don't keep a response that can't be formatted
+                self._pending_cache = None
+                if json_data is self.cached_data:
+                    self._discard_cache()
+                raise
+            self._store_cache()
+            return data
 
-            # Prepare for MQTT
-            condition_data = OrderedDict()
-            condition_state = self.ha_condition_value(current_icon)
-            condition_data["weather"] = condition_state
+        # Return None if we could not retrieve data
+        _LOGGER.warning("Forecast Server was unresponsive. Skipping forecast update")
+        return None, None, None
 
-            forecast_data = json_data.get("forecast")
+    def format_forecast(
+        self, json_data: dict[str, Any]
+    ) -> tuple[OrderedDict, OrderedDict, OrderedDict]:
+        """Return the formatted forecast data from a forecast response.
 
-            # We also need Day hign and low Temp from Today
-            temp_high_today = self.conversions.temperature(
-                forecast_data[FORECAST_TYPE_DAILY][0]["air_temp_high"]
+        That is the state, the daily forecast attributes and the hourly
+        forecast attributes.
+        """
+        # We need a few Items from the Current Conditions section
+        current_cond = json_data.get("current_conditions")
+        current_icon = current_cond["icon"]
+        today = datetime.date(datetime.now())
+
+        # Prepare for MQTT
+        condition_data = OrderedDict()
+        condition_state = self.ha_condition_value(current_icon)
+        condition_data[self.entity_id] = condition_state
+
+        forecast_data = json_data.get("forecast")
+
+        # We also need Day hign and low Temp from Today
+        temp_high_today = self.conversions.temperature(
+            forecast_data[FORECAST_TYPE_DAILY][0]["air_temp_high"]
+        )
+        temp_low_today = self.conversions.temperature(
+            forecast_data[FORECAST_TYPE_DAILY][0]["air_temp_low"]
+        )
+
+        # Process Daily Forecast
+        fcst_data = OrderedDict()
+        fcst_data[ATTR_ATTRIBUTION] = ATTRIBUTION
+        fcst_data["temp_high_today"] = temp_high_today
+        fcst_data["temp_low_today"] = temp_low_today
+
+        # Calculate data from hourly that's not summed up in the daily.
+        hourly_by_day = self.aggregate_hourly(forecast_data[FORECAST_TYPE_HOURLY])
+
+        daily_item = self._daily_item
+        items = []
+        for row in forecast_data[FORECAST_TYPE_DAILY]:
+            # Skip over past forecasts - seems the API sometimes returns old forecasts
+            forecast_time = datetime.date(
+                datetime.fromtimestamp(row["day_start_local"])
             )
-            temp_low_today = self.conversions.temperature(
-                forecast_data[FORECAST_TYPE_DAILY][0]["air_temp_low"]
+            if today > forecast_time:
+                continue
+            items.append(
+                daily_item(row, *hourly_by_day.get(row["day_num"], (0, None, None)))
             )
+        fcst_data["daily_forecast"] = items
 
-            # Process Daily Forecast
-            fcst_data = OrderedDict()
-            fcst_data[ATTR_ATTRIBUTION] = ATTRIBUTION
-            fcst_data["temp_high_today"] = temp_high_today
-            fcst_data["temp_low_today"] = temp_low_today
+        hourly_item = self._hourly_item
+        items = []
+        now = datetime.now().timestamp()
+        for row in forecast_data[FORECAST_TYPE_HOURLY]:
+            # Skip over past forecasts - seems the API sometimes returns old forecasts
+            if now > row["time"]:
+                continue
+            items.append(hourly_item(row))
+            # Limit number of Hours
+            if len(items) >= FORECAST_HOURLY_HOURS:
+                break
+        # The hourly forecast changes more often, so it has its own sensor
+        hourly_data = OrderedDict()
+        hourly_data[ATTR_ATTRIBUTION] = ATTRIBUTION
+        hourly_data["hourly_forecast"] = items
+        condition_data[self.hourly_entity_id] = (
+            items[0][ATTR_FORECAST_CONDITION] if items else None
+        )
 
-            for row in forecast_data[FORECAST_TYPE_DAILY]:
-                # Skip over past forecasts - seems the API sometimes returns old forecasts
-                forecast_time = datetime.date(
-                    datetime.fromtimestamp(row["day_start_local"])
-                )
-                if today > forecast_time:
-                    continue
-
-                # Calculate data from hourly that's not summed up in the daily.
-                precip = 0
-                wind_avg = []
-                wind_bearing = []
-                for hourly in forecast_data["hourly"]:
-                    if hourly["local_day"] == row["day_num"]:
-                        precip += hourly["precip"]
-                        wind_avg.append(hourly["wind_avg"])
-                        wind_bearing.append(hourly["wind_direction"])
-                sum_wind_avg = sum(wind_avg) / len(wind_avg)
-                sum_wind_bearing = sum(wind_bearing) / len(wind_bearing) % 360
-
-                item = {
-                    ATTR_FORECAST_TIME: self.conversions.utc_from_timestamp(
-                        row["day_start_local"]
-                    ),
-                    ATTR_FORECAST_CONDITION: "cloudy" if row.get("icon") is None else self.ha_condition_value(row["icon"]),
-                    ATTR_FORECAST_TEMP: self.conversions.temperature(
-                        row["air_temp_high"]
-                    ),
-                    ATTR_FORECAST_TEMP_LOW: self.conversions.temperature(
-                        row["air_temp_low"]
-                    ),
-                    ATTR_FORECAST_PRECIPITATION: self.conversions.rain(precip),
-                    ATTR_FORECAST_PRECIPITATION_PROBABILITY: row["precip_probability"],
-                    ATTR_FORECAST_WIND_SPEED: self.conversions.speed(
-                        sum_wind_avg, True
-                    ),
-                    ATTR_FORECAST_WIND_BEARING: int(sum_wind_bearing),
-                }
-                items.append(item)
-            fcst_data["daily_forecast"] = items
-
-            cnt = 0
-            items = []
-            for row in forecast_data[FORECAST_TYPE_HOURLY]:
-                # Skip over past forecasts - seems the API sometimes returns old forecasts
-                forecast_time = datetime.fromtimestamp(row["time"])
-                if datetime.now() > forecast_time:
-                    continue
-
-                item = {
-                    ATTR_FORECAST_TIME: self.conversions.utc_from_timestamp(
-                        row["time"]
-                    ),
-                    ATTR_FORECAST_CONDITION: self.ha_condition_value(row.get("icon")),
-                    ATTR_FORECAST_TEMP: self.conversions.temperature(
-                        row["air_temperature"]
-                    ),
-                    ATTR_FORECAST_PRESSURE: self.conversions.pressure(
-                        row.get("sea_level_pressure", 0)
-                    ),
-                    ATTR_FORECAST_HUMIDITY: row["relative_humidity"],
-                    ATTR_FORECAST_PRECIPITATION: self.conversions.rain(row["precip"]),
-                    ATTR_FORECAST_PRECIPITATION_PROBABILITY: row["precip_probability"],
-                    ATTR_FORECAST_WIND_SPEED: self.conversions.speed(
-                        row["wind_avg"], True
-                    ),
-                    ATTR_FORECAST_WIND_BEARING: row["wind_direction"],
-                }
-                items.append(item)
-                # Limit number of Hours
-                cnt += 1
-                if cnt >= FORECAST_HOURLY_HOURS:
-                    break
-            fcst_data["hourly_forecast"] = items
-
-            return condition_data, fcst_data
+        return condition_data, fcst_data, hourly_data
 
-        # Return None if we could not retrieve data
-        _LOGGER.warning("Forecast Server was unresponsive. Skipping forecast update")
-        return None, None
+    def _row_transformers(
+        self,
+    ) -> tuple[Callable[..., dict[str, Any]], Callable[[dict[str, Any]], dict[str, Any]]]:
+        """Return the functions that turn daily and hourly rows into forecast items.
 
-    async def async_request(self, method: str, endpoint: str) -> dict[str, Any]:
-        """Request data from the WeatherFlow API."""
-        use_running_session = self._session and not self._session.closed
+        The conversion functions are looked up once here, instead of for every
+        row of every refresh.
+        """
+        utc_from_timestamp = self.conversions.utc_from_timestamp
+        temperature = self.conversions.temperature
+        pressure = self.conversions.pressure
+        rain = self.conversions.rain
+        speed = self.conversions.speed
+        condition = CONDITION_BY_ICON.get
 
-        if use_running_session:
-            session = self._session
-        else:
-            session = ClientSession(timeout=ClientTimeout(total=DEFAULT_TIMEOUT))
+        def daily_item(
+            row: dict[str, Any],
+            precip: float,
+            wind_avg: float | None,
+            wind_bearing: int | None,
+        ) -> dict[str, Any]:
+            return {
+                ATTR_FORECAST_TIME: utc_from_timestamp(row["day_start_local"]),
+                ATTR_FORECAST_CONDITION: "cloudy"
+                if (icon := row.get("icon")) is None
+                else condition(icon),
+                ATTR_FORECAST_TEMP: temperature(row["air_temp_high"]),
+                ATTR_FORECAST_TEMP_LOW: temperature(row["air_temp_low"]),
+                ATTR_FORECAST_PRECIPITATION: rain(precip),
+                ATTR_FORECAST_PRECIPITATION_PROBABILITY: row["precip_probability"],
+                ATTR_FORECAST_WIND_SPEED: None
+                if wind_avg is None
+                else speed(wind_avg, True),
+                ATTR_FORECAST_WIND_BEARING: wind_bearing,
+            }
+
+        def hourly_item(row: dict[str, Any]) -> dict[str, Any]:
+            return {
+                ATTR_FORECAST_TIME: utc_from_timestamp(row["time"]),
+                ATTR_FORECAST_CONDITION: condition(row.get("icon")),
+                ATTR_FORECAST_TEMP: temperature(row["air_temperature"]),
+                ATTR_FORECAST_PRESSURE: pressure(row.get("sea_level_pressure", 0)),
+                ATTR_FORECAST_HUMIDITY: row["relative_humidity"],
+                ATTR_FORECAST_PRECIPITATION: rain(row["precip"]),
+                ATTR_FORECAST_PRECIPITATION_PROBABILITY: row["precip_probability"],
+                ATTR_FORECAST_WIND_SPEED: speed(row["wind_avg"], True),
+                ATTR_FORECAST_WIND_BEARING: row["wind_direction"],
+            }
+
+        return daily_item, hourly_item
+
+    @staticmethod
+    def aggregate_hourly(
+        hourly: list[dict[str, Any]]
+    ) -> dict[int, tuple[float, float, int]]:
+        """Return the precipitation, wind speed and wind bearing of each day.
+
+        The hourly rows are summed up per day in a single pass. Precipitation
+        is the total, wind speed the mean and wind bearing the mean direction
+        of the hourly wind vectors, so that e.g. 350° and 10° average to 0°.
+        """
+        days: dict[int, list[float]] = {}
+        for row in hourly:
+            if (day := days.get(row["local_day"])) is None:
+                # precipitation, wind speed, north and east parts of the bearing, hours
+                day = days[row["local_day"]] = [0, 0, 0, 0, 0]
+            bearing = math.radians(row["wind_direction"])
+            day[0] += row["precip"]
+            day[1] += row["wind_avg"]
+            day[2] += math.cos(bearing)
+            day[3] += math.sin(bearing)
+            day[4] += 1
+
+        return {
+            day_num: (
+                precip,
+                wind_avg / hours,
+                round(math.degrees(math.atan2(east, north))) % 360,
+            )
+            for day_num, (precip, wind_avg, north, east, hours) in days.items()
+        }
+
+    async def async_request(
+        self, method: str, endpoint: str, use_cache: bool = False
+    ) -> dict[str, Any]:
+        """Request data from the WeatherFlow API.
 
+        With `use_cache`, the request is conditional on the cached response,
+        which is returned if it hasn't changed on the server. The response is
+        only cached by `update_forecast`, once it has been formatted.
+        """
+        from aiohttp.client_exceptions import ClientError
+
+        headers = {}
+        if use_cache and self.load_cache() is not None:
+            if etag := self._cache.get("etag"):
+                headers["If-None-Match"] = etag
+            if last_modified := self._cache.get("last_modified"):
+                headers["If-Modified-Since"] = last_modified
+
+        # Time at which each phase of the request ended, recorded by the trace config
+        marks: dict[str, float] = {}
+        start = time.perf_counter()
         try:
-            async with session.request(method, f"{BASE_URL}/{endpoint}") as resp:
+            async with self._get_session().request(
+                method,
+                f"{self.base_url}/{endpoint}",
+                headers=headers,
+                trace_request_ctx=marks,
+            ) as resp:
+                if resp.status == 304 and use_cache and self._cache is not None:
+                    _LOGGER.debug("The forecast has not changed")
+                    marks["body_end"] = time.perf_counter()
+                    self._pending_cache = {**self._cache, "fetched": time.time()}
+                    return self._cache["data"]
                 resp.raise_for_status()
                 data = await resp.json()
+                marks["body_end"] = time.perf_counter()
+                if use_cache:
+                    self._pending_cache = {
+                        "fetched": time.time(),
+                        "etag": resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified"),
+                        "data": data,
+                    }
                 return data
         except asyncio.TimeoutError:
             _LOGGER.debug("Request to endpoint timed out: %s", endpoint)
@@ -227,18 +451,242 @@ class Forecast:
             _LOGGER.debug("Error requesting data from %s Error: %s", endpoint, exc)
 
         finally:
-            if not use_running_session:
-                await session.close()
+            self.request_timings = request_timings(
+                start, time.perf_counter(), marks
+            )
+            _LOGGER.debug("Forecast request timings: %s", self.request_timings)
+
+    def _get_session(self) -> ClientSession:
+        """Return the session, opening a pooled one if needed."""
+        if self._session_source is not None:
+            return self._session_source._get_session()
+        if self._session is None or self._session.closed:
+            from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+            # Connections and DNS lookups are kept for the next refresh
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    ttl_dns_cache=FORECAST_DNS_CACHE_TTL,
+                    keepalive_timeout=FORECAST_KEEPALIVE_TIMEOUT,
+                ),
+                timeout=ClientTimeout(total=DEFAULT_TIMEOUT),
+                trace_configs=[request_trace_config()],
+            )
+            self._owns_session = True
+        return self._session
 
     def ha_condition_value(self, value: str) -> str | None:
         """Return Home Assistant Condition."""
+        return CONDITION_BY_ICON.get(value)
+
+class ForecastScheduler:
+    """Refresh a forecast on its own schedule.
+
+    Failed requests are retried with exponential backoff and jitter. After
+    `FORECAST_CIRCUIT_FAILURES` failures in a row the circuit opens, and only
+    one trial request is made every `FORECAST_CIRCUIT_TIMEOUT` seconds until
+    the server answers again.
+    """
+
+    def __init__(
+        self,
+        forecast: Forecast,
+        publish: Callable[[Forecast, tuple[OrderedDict, OrderedDict, OrderedDict]], None],
+        semaphore: asyncio.Semaphore | None = None,
+    ) -> None:
+        """Initialize a Forecast Scheduler.
+
+        `publish` is called with the forecast and its formatted data after
+        every successful update, and `semaphore` limits how many forecasts
+        are requested at the same time.
+        """
+        self.forecast = forecast
+        self._publish = publish
+        self._semaphore = semaphore if semaphore is not None else asyncio.Semaphore()
+        self._task: asyncio.Future | None = None
+        self.next_run: float = 0
+        self.last_success: float | None = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+
+    @property
+    def circuit_open(self) -> bool:
+        """Return `True` if requests are held back after repeated failures."""
+        return self.consecutive_failures >= FORECAST_CIRCUIT_FAILURES
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the health metrics of the forecast updates."""
+        now = time.time()
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "circuit_open": self.circuit_open,
+            "latency": self.forecast.request_timings.get("total"),
+            "staleness": None
+            if self.last_success is None
+            else round(now - self.last_success),
+            "next_run": round(max(self.next_run - now, 0)),
+        }
+
+    def start(self) -> None:
+        """Start refreshing the forecast in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop refreshing the forecast."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Publish the cached forecast, then update it whenever it is due."""
+        fetched = None
         try:
-            return next(
-                (k for k, v in CONDITION_CLASSES.items() if value in v),
-                None,
+            if (data := self.forecast.cached_forecast()) is not None:
+                _LOGGER.debug(
+                    "Sending cached forecast data for %s to MQTT",
+                    self.forecast.station_id,
+                )
+                self._publish(self.forecast, data)
+                fetched = self.forecast.load_cache()
+        except Exception:
+            _LOGGER.exception(
+                "Could not publish the cached forecast for %s", self.forecast.station_id
             )
-        except Exception as exc:
-            _LOGGER.debug(
-                "Could not find icon with value: %s. Error message: %s", value, exc
+            fetched = None
+        if fetched is not None:
+            self.last_success = fetched
+            self.next_run = fetched + self.forecast.interval * 60
+        else:
+            # Keep restarted installations from requesting all at the same time
+            self.next_run = time.time() + random.uniform(0, FORECAST_STARTUP_JITTER)
+
+        while True:
+            if (delay := self.next_run - time.time()) > 0:
+                _LOGGER.debug(
+                    "Forecast update for %s will run in ~%s minutes",
+                    self.forecast.station_id,
+                    math.ceil(delay / 60),
+                )
+                await asyncio.sleep(delay)
+            await self.update()
+
+    async def update(self) -> bool:
+        """Update the forecast now and schedule the next update.
+
+        Returns `True` if the forecast was updated.
+        """
+        try:
+            async with self._semaphore:
+                data = await self.forecast.update_forecast()
+            if updated := any(data):
+                _LOGGER.debug(
+                    "Sending updated forecast data for %s to MQTT",
+                    self.forecast.station_id,
+                )
+                self._publish(self.forecast, data)
+        except Exception:
+            # Like an unresponsive server, a bad response is retried with backoff
+            _LOGGER.exception(
+                "Could not update the forecast for %s", self.forecast.station_id
+            )
+            updated = False
+        now = time.time()
+
+        if updated:
+            if self.circuit_open:
+                _LOGGER.info(
+                    "Forecast server is responding again for %s", self.forecast.station_id
+                )
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.last_success = now
+            self.next_run = (
+                now + self.forecast.interval * 60 + random.uniform(0, FORECAST_JITTER)
             )
+            return True
+
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.circuit_open:
+            delay = max(FORECAST_CIRCUIT_TIMEOUT, self.forecast.interval * 60)
+            if self.consecutive_failures == FORECAST_CIRCUIT_FAILURES:
+                _LOGGER.warning(
+                    "Forecast for %s failed %s times in a row. Retrying every %s minutes",
+                    self.forecast.station_id,
+                    self.consecutive_failures,
+                    delay // 60,
+                )
+        else:
+            delay = min(
+                FORECAST_BACKOFF_MAX,
+                FORECAST_BACKOFF_BASE * 2 ** (self.consecutive_failures - 1),
+            )
+        # Wait at least half the delay, so retries are spread but not hurried
+        self.next_run = now + random.uniform(delay / 2, delay)
+        return False
+
+
+def request_trace_config() -> TraceConfig:
+    """Return a trace config that records when each phase of a request ends.
+
+    The times are stored in the `trace_request_ctx` dict of the request.
+    """
+    from aiohttp import TraceConfig
+
+    trace_config = TraceConfig()
+
+    def mark(name: str) -> Callable[..., Awaitable[None]]:
+        async def _mark(session: ClientSession, context: Any, params: Any) -> None:
+            if (marks := context.trace_request_ctx) is not None:
+                marks[name] = time.perf_counter()
+
+        return _mark
+
+    for signal, name in (
+        (trace_config.on_request_start, "start"),
+        (trace_config.on_dns_resolvehost_start, "dns_start"),
+        (trace_config.on_dns_resolvehost_end, "dns_end"),
+        (trace_config.on_connection_create_start, "connect_start"),
+        (trace_config.on_connection_create_end, "connect_end"),
+        (trace_config.on_request_headers_sent, "headers_sent"),
+        (trace_config.on_request_end, "headers_received"),
+    ):
+        signal.append(mark(name))
+    return trace_config
+
+
+def request_timings(
+    start: float, end: float, marks: dict[str, float]
+) -> dict[str, float | None]:
+    """Return the duration in ms of each phase of a request.
+
+    Connect includes the TLS handshake, which aiohttp doesn't trace
+    separately. Phases that didn't happen, like connecting on a reused
+    connection, are 0, and phases that didn't finish are None.
+    """
+
+    def duration(first: str, last: str) -> float | None:
+        if first not in marks:
+            return 0
+        if last not in marks:
             return None
+        return round((marks[last] - marks[first]) * 1000, 1)
+
+    dns = duration("dns_start", "dns_end")
+    connect = duration("connect_start", "connect_end")
+    return {
+        "dns": dns,
+        # DNS is resolved while the connection is created
+        "connect": None if connect is None else round(connect - (dns or 0), 1),
+        "ttfb": duration("headers_sent", "headers_received"),
+        "body": duration("headers_received", "body_end"),
+        "total": round((end - start) * 1000, 1),
+    }
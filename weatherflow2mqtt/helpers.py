@@ -7,15 +7,18 @@ import time
 import json
 import logging
 import math
-from typing import Any
-
-import yaml
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Callable
 
 from .const import (
     BATTERY_MODE_DESCRIPTION,
     EXTERNAL_DIRECTORY,
+    LANGUAGE_ENGLISH,
     SUPPORTED_LANGUAGES,
     UNITS_IMPERIAL,
+    WETBULB_METHOD_NEWTON,
+    WETBULB_METHOD_STULL,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -23,6 +26,72 @@ _LOGGER = logging.getLogger(__name__)
 UTC = dt.timezone.utc
 NO_CONVERSION = object()
 
+DIRECTIONS = (
+    "N",
+    "NNE",
+    "NE",
+    "ENE",
+    "E",
+    "ESE",
+    "SE",
+    "SSE",
+    "S",
+    "SSW",
+    "SW",
+    "WSW",
+    "W",
+    "WNW",
+    "NW",
+    "NNW",
+    "N",
+)
+
+# Zambretti forecaster, based off Beteljuice's Zambretti work;
+# http://www.beteljuice.co.uk/zambretti/forecast.html
+# Pressure adjustment for the wind direction in the northern hemisphere, as a
+# fraction of the pressure range. The southern hemisphere uses the opposite
+# direction.
+_ZAMBRETTI_NORTH_WIND = (
+    6 / 100,
+    5 / 100,
+    5 / 100,
+    2 / 100,
+    -0.5 / 100,
+    -2 / 100,
+    -5 / 100,
+    -8.5 / 100,
+    -12 / 100,
+    -10 / 100,
+    -6 / 100,
+    -4.5 / 100,
+    -3 / 100,
+    -0.5 / 100,
+    1.5 / 100,
+    3 / 100,
+)
+# Wind adjustments by hemisphere (0 = Northern, 1 = Southern) and direction
+ZAMBRETTI_WIND = tuple(
+    {
+        direction: _ZAMBRETTI_NORTH_WIND[(index + shift) % 16]
+        for index, direction in enumerate(DIRECTIONS[:16])
+    }
+    for shift in (0, 8)
+)
+# Pressure adjustment for the trend (steady, rising, falling) in summer in the
+# northern hemisphere or in winter in the southern hemisphere
+ZAMBRETTI_TREND = (0, 7 / 100, -7 / 100)
+# Equivalents of Zambretti 'dial window' letters A - Z: 0=A, by trend
+ZAMBRETTI_OPTIONS = (
+    (25, 25, 25, 25, 25, 25, 23, 23, 22, 18, 15, 13, 10, 4, 1, 1, 0, 0, 0, 0, 0, 0),
+    (25, 25, 25, 24, 24, 19, 16, 12, 11, 9, 8, 6, 5, 2, 1, 1, 0, 0, 0, 0, 0, 0),
+    (25, 25, 25, 25, 25, 25, 25, 25, 23, 23, 21, 20, 17, 14, 7, 3, 1, 1, 1, 0, 0, 0),
+)
+ZAMBRETTI_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Scale and offset to convert between two units, by source unit and target unit
+_UNIT_FACTORS: dict[tuple[Any, str], tuple[float, float] | None] = {}
+_NO_FACTORS = (1.0, 0.0)
+
 
 def no_conversion_to_none(val: Any) -> Any | None:
     return None if val is NO_CONVERSION else val
@@ -36,11 +105,56 @@ def truebool(val: Any | None) -> bool:
     return val is not None and str(val).lower() in ("true", "t", "yes", "y", "on", "1")
 
 
+def convert_quantity(quantity: Any, unit: str) -> float:
+    """ Return the magnitude of a pint Quantity converted to a unit.
+
+    The conversion is reduced to a scale and offset the first time it is
+    used, so pint is only needed again for units that are not affine.
+    The result can differ from pint's in the last bits (less than 1e-12 for
+    Celsius to Fahrenheit), as pint converts through the base unit. Values
+    on a rounding boundary can then round the other way: 75 of 22,000
+    temperatures from -60 to 160 C round to a different 0.1 F. Neither is
+    closer to the exact value, pint is right for about half of them.
+    """
+    key = (quantity.units, unit)
+    try:
+        factors = _UNIT_FACTORS[key]
+    except KeyError:
+        factors = _UNIT_FACTORS[key] = _unit_factors(quantity, unit)
+
+    if factors is _NO_FACTORS:
+        return quantity.m
+    if factors is None:
+        return quantity.to(unit).m
+    scale, offset = factors
+    return quantity.m * scale + offset
+
+
+def _unit_factors(quantity: Any, unit: str) -> tuple[float, float] | None:
+    """ Return the scale and offset converting a Quantity to a unit.
+
+    `None` is returned if the conversion is not affine.
+    """
+    offset = quantity.__class__(0.0, quantity.units).to(unit).m
+    scale = quantity.__class__(1.0, quantity.units).to(unit).m - offset
+    if scale == 1 and offset == 0:
+        return _NO_FACTORS
+    for value in (-40.0, 1000.0):
+        expected = quantity.__class__(value, quantity.units).to(unit).m
+        if not math.isclose(value * scale + offset, expected, rel_tol=1e-9, abs_tol=1e-9):
+            _LOGGER.debug("Conversion from %s to %s is not affine", quantity.units, unit)
+            return None
+    return scale, offset
+
+
 def read_config() -> list[str] | None:
     """ Read the config file to look for sensors."""
     try:
         filepath = f"{EXTERNAL_DIRECTORY}/config.yaml"
         with open(filepath, "r") as file:
+            # yaml is only needed if there is a config file
+            import yaml
+
             data = yaml.load(file, Loader=yaml.FullLoader)
             sensors = data.get("sensors")
 
@@ -53,87 +167,431 @@ def read_config() -> list[str] | None:
         return None
 
 
-class ConversionFunctions:
-    """ Class to help with converting from different units."""
+def get_translations(language: str) -> dict[str, dict[str, str]] | None:
+    """ Return the translations for a language, English if it isn't supported.
 
-    def __init__(self, unit_system: str, language: str) -> None:
-        """Initialize Conversion Function."""
-        self.unit_system = unit_system
-        self.translations = self.get_language_file(language)
+    Translations are read once per language and shared, so they must not be
+    modified.
+    """
+    return _read_translations(
+        language if language in SUPPORTED_LANGUAGES else LANGUAGE_ENGLISH
+    )
 
-    def get_language_file(self, language: str) -> dict[str, dict[str, str]] | None:
-        """ Return the language file json array."""
-        filename = (
-            f"translations/{language if language in SUPPORTED_LANGUAGES else 'en'}.json"
-        )
 
-        try:
-            with (importlib.resources.files(__package__) / filename).open('r') as json_file:
-                return json.load(json_file)
-        except FileNotFoundError as e:
-            _LOGGER.error("Could not read language file. Error message: %s", e)
-            return None
-        except Exception as e:
-            _LOGGER.error("Could not read language file. Error message: %s", e)
-            return None
+@lru_cache(maxsize=None)
+def _read_translations(language: str) -> dict[str, dict[str, str]] | None:
+    """ Read the language file json array."""
+    filename = f"translations/{language}.json"
 
-    def temperature(self, value) -> float:
-        """ Convert Temperature Value."""
-        if value is not None:
-            if self.unit_system == UNITS_IMPERIAL:
-                return round((value * 9 / 5) + 32, 1)
-            return round(value, 1)
+    try:
+        with (importlib.resources.files(__package__) / filename).open('r') as json_file:
+            return json.load(json_file)
+    except FileNotFoundError as e:
+        _LOGGER.error("Could not read language file. Error message: %s", e)
+        return None
+    except Exception as e:
+        _LOGGER.error("Could not read language file. Error message: %s", e)
+        return None
 
-        _LOGGER.error(
-            "FUNC: temperature ERROR: Temperature value was reported as NoneType. Check the sensor"
-        )
 
-    def pressure(self, value) -> float:
-        """ Convert Pressure Value."""
-        if value is not None:
-            if self.unit_system == UNITS_IMPERIAL:
-                return round(value * 0.02953, 3)
-            return round(value, 2)
+def solar_elevation_at(latitude, longitude, yday, hour, minute, gmtoff) -> int:
+    """ Return Sun Elevation in Degrees for a local time.
+    See `ConversionFunctions.solar_elevation` for a description.
+    """
+    cos = math.cos
+    sin = math.sin
+    asin = math.asin
+    radians = math.radians
+    degrees = math.degrees
+    jd = yday
+    hr = hour
+    min = minute
+    lt = hr + min/60
+    tz = gmtoff/3600
+    jd = jd + lt/24
+    beta = (360/365) * (jd - 81)
+    lstm = 15 * tz
+    eot = (9.87*(sin(radians(beta*2)))) - (7.53*(cos(radians(beta)))) - (1.5*(sin(radians(beta))))
+    tc = (4 * (longitude - lstm)) + eot
+    lst = lt + tc/60
+    h = 15 * (lst - 12)
+    dec = cos(radians(((jd) + 10) * (360/365))) * (-23.44)
+    se = degrees(asin(sin(radians(latitude)) * sin(radians(dec)) + cos(radians(latitude)) * cos(radians(dec)) * cos(radians(h))))
+    se = round(se)
+
+    return se
+
+
+def solar_insolation_at(solar_elevation, elevation) -> int:
+    """ Return Estimation of Solar Radiation for a Sun Elevation.
+    See `ConversionFunctions.solar_insolation` for a description.
+    """
+    cos = math.cos
+    sin = math.sin
+    radians = math.radians
+    se = solar_elevation
+    sz = 90 - se
+    ah_a = 0.14
+    ah_h = elevation / 1000
+    ah = ah_a * ah_h
+    if se >= 0:
+        am = 1/(cos(radians(sz)) + 0.50572*pow((96.07995 - sz),(-1.6364)))
+        si = (1353 * ((1-ah)*pow(.7, pow(am, 0.678))+ah))*(sin(radians(se)))
+    else:
+        am = 1
+        si = 0
+    si = round(si)
+
+    return si
+
+
+def dewpoint_celsius(temperature: float, humidity: float) -> float:
+    """ Return the Dewpoint in Celcius, unrounded.
+    See `ConversionFunctions.dewpoint` for a description.
+    """
+    log_humidity = math.log(humidity / 100)
+    temperature_part = (17.625 * temperature) / (243.04 + temperature)
+    return (
+        243.04
+        * (log_humidity + temperature_part)
+        / (17.625 - log_humidity - temperature_part)
+    )
+
+
+def absolute_humidity_gm3(temp: float, humidity: float) -> float:
+    """ Return the Absolute Humidity in g/m^3, unrounded.
+    See `ConversionFunctions.absolute_humidity` for a description.
+    """
+    # Convert Celcius to Kelvin for temperature
+    TK = temp + 273.16
+    # Format Relative Humidity
+    RH = humidity / 100
+    # Absolute Humidity Estimation is fairly acurate between (5C - 20C) (41F - 122F)
+    return (1320.65 / TK) * RH * (10 ** ((7.4475 * (TK - 273.14)) / (TK - 39.44)))
 
-        _LOGGER.error(
-            "FUNC: pressure ERROR: Pressure value was reported as NoneType. Check the sensor"
-        )
 
-    def speed(self, value, kmh=False) -> float:
-        """ Convert Wind Speed."""
-        if value is not None:
-            if self.unit_system == UNITS_IMPERIAL:
-                return round(value * 2.2369362920544, 2)
-            if kmh:
-                return round((value * 18 / 5), 1)
-            return round(value, 1)
+def feels_like_celsius(temperature: float, humidity: float, windspeed: float) -> float:
+    """ Return the Feels Like Temperature in Celcius, unrounded.
+    See `ConversionFunctions.feels_like` for a description.
+    """
+    e_value = (
+        humidity * 0.06105 * math.exp((17.27 * temperature) / (237.7 + temperature))
+    )
+    return temperature + 0.348 * e_value - 0.7 * windspeed - 4.25
 
-        _LOGGER.error(
-            "FUNC: speed ERROR: Wind value was reported as NoneType. Check the sensor"
+
+def visibility_km(elevation: float, temp: float, dewpoint_c: float) -> float:
+    """ Return the Visibility in km, unrounded.
+    See `ConversionFunctions.visibility` for a description.
+    """
+    # Set minimum elevation for cases of stations below sea level
+    if elevation > 2:
+        elv_min = float(elevation)
+    else:
+        elv_min = float(2)
+
+    # Max possible visibility to horizon (units km)
+    mv = float(3.56972 * math.sqrt(elv_min))
+
+    # Percent reduction based on quatity of water in air (no units)
+    # 76 percent of visibility variation can be accounted for by humidity accourding to US-NOAA.
+    pr_a = float((1.13 * abs(temp - dewpoint_c) - 1.15) / 10)
+    if pr_a > 1:
+        # Prevent visibility exceeding maximum distance
+        pr = float(1)
+    elif pr_a < 0.025:
+        # Prevent visibility below minimum distance
+        pr = float(0.025)
+    else:
+        pr = pr_a
+
+    # Visibility in km to horizon
+    return float(mv * pr)
+
+
+def wbgt_celsius(wetbulb: float, temp: float, humidity: float, solar_radiation: float) -> float:
+    """ Return the Wet Bulb Globe Temperature in Celcius, rounded to 0.1.
+    See `ConversionFunctions.wbgt` for a description.
+    """
+    return round(
+        0.7 * wetbulb + 0.002996 * solar_radiation + 0.3368 * temp - 0.01578 * humidity - 0.5478,
+        1,
+    )
+
+
+def wetbulb_stull(temp: float, humidity: float) -> float:
+    """ Return the Stull (2011) approximation of the Wet Bulb Temperature.
+    Input:
+        Temperature in Celcius
+        Humdity in Percent
+    The approximation is made for sea level pressure. For humidities between
+    5% and 99% and temperatures between -20 and 50 C it is within -1.5 to
+    +1 C of the psychrometric value (mean absolute error about 0.4 C), except
+    for cold and dry air (below freezing and under 40%), where it can be off
+    by more than 3 C. The error also grows with altitude.
+    """
+    atan = math.atan
+    return (
+        temp * atan(0.151977 * math.sqrt(humidity + 8.313659))
+        + atan(temp + humidity)
+        - atan(humidity - 1.676331)
+        + 0.00391838 * pow(humidity, 1.5) * atan(0.023101 * humidity)
+        - 4.686035
+    )
+
+
+@lru_cache(maxsize=64)
+def wetbulb_newton(temp: float, humidity: float, pressure: float) -> float:
+    """ Return Wet Bulb Temperature solving the psychrometric equation.
+    Input:
+        Temperature in Celcius
+        Humdity in Percent
+        Station Pressure in MB
+    Where:
+        es is the saturation vapor pressure at the air temperature
+        e2 is the vapor pressure of the air
+        ew is the saturation vapor pressure at the wet bulb temperature
+        twguess is refined until it changes less than 0.0001 C
+    The results are cached, as the same observation is used by several sensors.
+    """
+    exp = math.exp
+    es = 6.112 * exp(17.67 * temp / (temp + 243.5))
+    e2 = es * (humidity / 100)
+
+    twguess = wetbulb_stull(temp, max(humidity, 5.0))
+    if not -100 < twguess < temp + 1:
+        twguess = temp
+    for _ in range(20):
+        ew = 6.112 * exp((17.67 * twguess) / (twguess + 243.5))
+        psychro = pressure * 0.00066
+        difference = (
+            ew - psychro * (temp - twguess) * (1 + (0.00115 * twguess)) - e2
+        )
+        derivative = (
+            ew * 17.67 * 243.5 / (twguess + 243.5) ** 2
+            + psychro * (1 + (0.00115 * twguess))
+            - psychro * (temp - twguess) * 0.00115
         )
+        step = difference / derivative
+        twguess -= step
+        if abs(step) < 0.0001:
+            return twguess
 
-    def distance(self, value) -> float:
-        """ Convert distance."""
-        if value is not None:
-            if self.unit_system == UNITS_IMPERIAL:
-                return round(value / 1.609344, 2)
-            return value
+    _LOGGER.debug(
+        "Wet Bulb Temperature did not converge for %s C, %s %%, %s MB",
+        temp,
+        humidity,
+        pressure,
+    )
+    return twguess
 
-        _LOGGER.error(
-            "FUNC: distance ERROR: Lightning Distance value was reported as NoneType. Check the sensor"
+
+def above(threshold: float) -> float:
+    """ Return the smallest float larger than the threshold.
+    Used to turn a `> threshold` test into `>= above(threshold)`.
+    """
+    return math.nextafter(threshold, math.inf)
+
+
+def threshold_table(
+    thresholds: tuple[float, ...], values: list[Any], nan: Any = None
+) -> Callable[[float], Any]:
+    """ Return a function looking up the value for the range a number falls in.
+
+    `values[0]` is used below the first threshold, and `values[i]` from
+    `thresholds[i - 1]` (inclusive) up to the next threshold. NaN, which no
+    threshold matches, returns `nan` (defaults to `values[0]`).
+    """
+    assert len(values) == len(thresholds) + 1
+    if nan is None:
+        nan = values[0]
+
+    def lookup(value: float) -> Any:
+        if value != value:
+            return nan
+        return values[bisect_right(thresholds, value)]
+
+    return lookup
+
+
+class SolarEphemeris:
+    """ Class holding the Sun position for every minute of the local day.
+
+    The table is built the first time the day (or the UTC offset, when
+    daylight saving time starts or ends) changes. As the Sun Elevation is
+    rounded to whole degrees, the insolation is kept per degree.
+    """
+
+    def __init__(self, latitude: float, longitude: float) -> None:
+        """Initialize the Solar Ephemeris."""
+        self.latitude = latitude
+        self.longitude = longitude
+        self._day: tuple[int, int] | None = None
+        self._elevations: list[int] = []
+        self._insolations: dict[float, list[int]] = {}
+
+    def elevation(self, now: time.struct_time) -> int:
+        """ Return Sun Elevation in Degrees at a local time."""
+        if (now.tm_yday, now.tm_gmtoff) != self._day:
+            self._day = (now.tm_yday, now.tm_gmtoff)
+            self._elevations = [
+                solar_elevation_at(
+                    self.latitude, self.longitude, now.tm_yday, minute // 60, minute % 60, now.tm_gmtoff
+                )
+                for minute in range(24 * 60)
+            ]
+        return self._elevations[now.tm_hour * 60 + now.tm_min]
+
+    def insolation(self, now: time.struct_time, elevation: float) -> int:
+        """ Return Estimation of Solar Radiation at a local time."""
+        if (insolations := self._insolations.get(elevation)) is None:
+            insolations = self._insolations[elevation] = [
+                solar_insolation_at(se, elevation) for se in range(-90, 91)
+            ]
+        return insolations[self.elevation(now) + 90]
+
+
+class ConversionFunctions:
+    """ Class to help with converting from different units.
+
+    Constructing it returns a `MetricConversionFunctions` or an
+    `ImperialConversionFunctions`, so the unit system is only checked once.
+    """
+
+    is_imperial = False
+
+    def __new__(cls, unit_system: str, *args, **kwargs):
+        """ Return the conversion functions for the unit system."""
+        if cls is ConversionFunctions:
+            cls = (
+                ImperialConversionFunctions
+                if unit_system == UNITS_IMPERIAL
+                else MetricConversionFunctions
+            )
+        return super().__new__(cls)
+
+    def __init__(
+        self,
+        unit_system: str,
+        language: str,
+        wetbulb_method: str = WETBULB_METHOD_NEWTON,
+    ) -> None:
+        """Initialize Conversion Function."""
+        self.unit_system = unit_system
+        self.wetbulb_method = wetbulb_method
+        self.translations = self.get_language_file(language)
+        self._solar_ephemerides: dict[tuple[float, float], SolarEphemeris] = {}
+        self._zambretti_offsets: dict[tuple[float, float], tuple] = {}
+        self._setup_tables()
+
+    def _setup_tables(self) -> None:
+        """ Compile the level and description lookups for the language."""
+        # Battery modes don't need translations
+        battery_modes = [(mode, BATTERY_MODE_DESCRIPTION[mode]) for mode in range(4)]
+        self._battery_mode_charging = threshold_table(
+            (above(2.375), 2.41, 2.455), battery_modes[::-1]
+        )
+        self._battery_mode_discharging = threshold_table(
+            (above(2.355), above(2.39), above(2.415)), battery_modes[::-1]
         )
 
-    def rain(self, value) -> float:
-        """ Convert rain."""
-        if value is not None:
-            if self.unit_system == UNITS_IMPERIAL:
-                return round(value * 0.0393700787, 2)
-            return round(value, 2)
+        if (translations := self.translations) is None:
+            return
 
-        _LOGGER.error(
-            "FUNC: rain ERROR: Rain value was reported as NoneType. Check the sensor"
+        self._directions = [translations["wind_dir"][direction] for direction in DIRECTIONS]
+        self._direction_table = [
+            self._directions[int((degrees + 11.25) / 22.5)] for degrees in range(360)
+        ]
+        # Like the directions themselves, the Zambretti wind adjustments are
+        # looked up by the translated direction, so directions that aren't
+        # spelled like the English ones are not adjusted
+        self._zambretti_wind = [
+            [wind.get(direction, 0) for direction in self._directions]
+            for wind in ZAMBRETTI_WIND
+        ]
+        self._zambretti_text = [
+            translations["zambretti"][letter] for letter in ZAMBRETTI_LETTERS
+        ]
+        # Rain rate in mm/hour
+        rain_intensity = translations["rain_intensity"]
+        self._rain_intensity = threshold_table(
+            (0, above(0), 0.25, 1, 4, 16, 50),
+            [
+                rain_intensity[intensity]
+                for intensity in (
+                    "VERYLIGHT",
+                    "NONE",
+                    "VERYLIGHT",
+                    "LIGHT",
+                    "MODERATE",
+                    "HEAVY",
+                    "VERYHEAVY",
+                    "EXTREME",
+                )
+            ],
+            nan=rain_intensity["EXTREME"],
+        )
+        # Wind Speed in m/s
+        self._beaufort = threshold_table(
+            (0.3, 1.6, 3.4, 5.5, 8.0, 10.8, 13.9, 17.2, 20.8, 24.5, 28.5, above(32.7)),
+            [(value, translations["beaufort"][str(value)]) for value in range(13)],
+        )
+        # Dewpoint in Fahrenheit
+        dewpoint = translations["dewpoint"]
+        self._dewpoint_level = threshold_table(
+            (0, 0.5, 30, 50, 55, 60, 65, 70, 75, 80),
+            [
+                dewpoint[level]
+                for level in (
+                    "undefined",
+                    "very-dry",
+                    "dry",
+                    "somewhat-dry",
+                    "very-comfortable",
+                    "comfortable",
+                    "ok-for-most",
+                    "uncomfortable",
+                    "oppressive",
+                    "miserable",
+                    "severely-high",
+                )
+            ],
+        )
+        # Air Temperature in Fahrenheit
+        temperature = translations["temperature"]
+        self._temperature_level = threshold_table(
+            (20, 32, 41, 59, 68, 77, 86, 95, 104),
+            [
+                temperature[level]
+                for level in (
+                    "fridged",
+                    "freezing",
+                    "cold",
+                    "chilly",
+                    "cool",
+                    "nice",
+                    "warm",
+                    "hot",
+                    "very-hot",
+                    "inferno",
+                )
+            ],
+            nan=temperature["undefined"],
+        )
+        # UV Index
+        uv = translations["uv"]
+        self._uv_level = threshold_table(
+            (above(0), 2.5, 5.5, 7.5, 10.5),
+            [
+                uv[level]
+                for level in ("none", "low", "moderate", "high", "very-high", "extreme")
+            ],
         )
 
+    def get_language_file(self, language: str) -> dict[str, dict[str, str]] | None:
+        """ Return the language file json array."""
+        return get_translations(language)
+
     def rain_type(self, value) -> str:
         """ Convert rain type."""
         type_array = ["none", "rain", "hail", "heavy-rain"]
@@ -149,44 +607,14 @@ class ConversionFunctions:
         if value is None:
             return "N"
 
-        direction_array = [
-            "N",
-            "NNE",
-            "NE",
-            "ENE",
-            "E",
-            "ESE",
-            "SE",
-            "SSE",
-            "S",
-            "SSW",
-            "SW",
-            "WSW",
-            "W",
-            "WNW",
-            "NW",
-            "NNW",
-            "N",
-        ]
-        direction_str = direction_array[int((value + 11.25) / 22.5)]
-        return self.translations["wind_dir"][direction_str]
+        if type(value) is int and 0 <= value < 360:
+            return self._direction_table[value]
+        return self._directions[int((value + 11.25) / 22.5)]
 
     def dewpoint(self, temperature, humidity, no_conversion=False):
         """ Return Dewpoint."""
         if temperature is not None and humidity is not None:
-            dewpoint_c = round(
-                243.04
-                * (
-                    math.log(humidity / 100)
-                    + ((17.625 * temperature) / (243.04 + temperature))
-                )
-                / (
-                    17.625
-                    - math.log(humidity / 100)
-                    - ((17.625 * temperature) / (243.04 + temperature))
-                ),
-                1,
-            )
+            dewpoint_c = round(dewpoint_celsius(temperature, humidity), 1)
             if no_conversion:
                 return dewpoint_c
             return self.temperature(dewpoint_c)
@@ -210,12 +638,7 @@ class ConversionFunctions:
         if temp is None or humidity is None:
             return None
 
-        # Convert Celcius to Kelvin for temperature
-        TK = temp + 273.16
-        # Format Relative Humidity
-        RH = humidity / 100
-        # Absolute Humidity Estimation is fairly acurate between (5C - 20C) (41F - 122F)
-        AH = (1320.65 / TK) * RH * (10 ** ((7.4475 * (TK - 273.14)) / (TK - 39.44)))
+        AH = absolute_humidity_gm3(temp, humidity)
 
         """
         # lf/ft^3 is too small a value for that unit, will pass metric units
@@ -239,33 +662,14 @@ class ConversionFunctions:
             VERY HEAVY: ≥ 16.0, < 50 mm/hour
             EXTREME: > 50.0 mm/hour
         """
-        if rain_rate == 0:
-            intensity = "NONE"
-        elif rain_rate < 0.25:
-            intensity = "VERYLIGHT"
-        elif rain_rate < 1:
-            intensity = "LIGHT"
-        elif rain_rate < 4:
-            intensity = "MODERATE"
-        elif rain_rate < 16:
-            intensity = "HEAVY"
-        elif rain_rate < 50:
-            intensity = "VERYHEAVY"
-        else:
-            intensity = "EXTREME"
-
-        return self.translations["rain_intensity"][intensity]
+        return self._rain_intensity(rain_rate)
 
     def feels_like(self, temperature, humidity, windspeed):
         """ Calculate feel like temperature."""
         if temperature is None or humidity is None or windspeed is None:
             return 0
 
-        e_value = (
-            humidity * 0.06105 * math.exp((17.27 * temperature) / (237.7 + temperature))
-        )
-        feelslike_c = temperature + 0.348 * e_value - 0.7 * windspeed - 4.25
-        return self.temperature(feelslike_c)
+        return self.temperature(feels_like_celsius(temperature, humidity, windspeed))
 
     def visibility(self, elevation, temp, humidity):
         """ Return the visibility.
@@ -284,95 +688,27 @@ class ConversionFunctions:
             return None
 
         dewpoint_c = self.dewpoint(temp, humidity, True)
-        # Set minimum elevation for cases of stations below sea level
-        if elevation > 2:
-            elv_min = float(elevation)
-        else:
-            elv_min = float(2)
-
-        # Max possible visibility to horizon (units km)
-        mv = float(3.56972 * math.sqrt(elv_min))
-
-        # Percent reduction based on quatity of water in air (no units)
-        # 76 percent of visibility variation can be accounted for by humidity accourding to US-NOAA.
-        pr_a = float((1.13 * abs(temp - dewpoint_c) - 1.15) / 10)
-        if pr_a > 1:
-            # Prevent visibility exceeding maximum distance
-            pr = float(1)
-        elif pr_a < 0.025:
-            # Prevent visibility below minimum distance
-            pr = float(0.025)
-        else:
-            pr = pr_a
-
-        # Visibility in km to horizon
-        vis = float(mv * pr)
-
-        if self.unit_system == UNITS_IMPERIAL:
-            # Originally was in nautical miles;
-            # HA displays miles as imperial, therfore converted to miles
-            return round(vis / 1.609344, 1)
-        return round(vis, 1)
+        return self._visibility_distance(visibility_km(elevation, temp, dewpoint_c))
 
     def wetbulb(self, temp, humidity, pressure, no_conversion=False):
         """ Return Wet Bulb Temperature.
-        Converted from a JS formula made by Gary W Funk
         Input:
             Temperature in Celcius
             Humdity in Percent
             Station Pressure in MB
         Where:
-            t is air temperature
-            rh is relative humidity
-            p is staion pressure
-            edifference is 
-            twguess is
-            eguess is
-            eguess is
-            previoussign is 
-            cursign is 
-            incr is 
-            es is
-            e2 is
+            The wet bulb temperature is the root of the psychrometric equation,
+            found with Newton's method starting from the Stull approximation.
+            With the `stull` method only the approximation is used, see
+            `wetbulb_stull` for its accuracy.
         """
         if temp is None or humidity is None or pressure is None:
             return None
 
-        t = float(temp)
-        rh = float(humidity)
-        p = float(pressure)
-
-        # Variables
-        edifference = 1
-        twguess = 0
-        previoussign = 1
-        incr = 10
-        es = 6.112 * math.exp(17.67 * t / (t + 243.5))
-        e2 = es * (rh / 100)
-
-        while abs(edifference) > 0.005:
-            ewguess = 6.112 * math.exp((17.67 * twguess) / (twguess + 243.5))
-            eguess = ewguess - p * (t - twguess) * 0.00066 * (1 + (0.00115 * twguess))
-            edifference = e2 - eguess
-            if edifference == 0:
-                break
-
-            if edifference < 0:
-                cursign = -1
-                if cursign != previoussign:
-                    previoussign = cursign
-                    incr = incr / 10
-                else:
-                    incr = incr
-            else:
-                cursign = 1
-                if cursign != previoussign:
-                    previoussign = cursign
-                    incr = incr / 10
-                else:
-                    incr = incr
-
-            twguess = twguess + incr * previoussign
+        if self.wetbulb_method == WETBULB_METHOD_STULL:
+            twguess = wetbulb_stull(float(temp), float(humidity))
+        else:
+            twguess = wetbulb_newton(float(temp), float(humidity), float(pressure))
 
         if no_conversion:
             return twguess
@@ -408,17 +744,10 @@ class ConversionFunctions:
         ):
             return None
 
-        ta = float(temp)
         twb = self.wetbulb(temp, humidity, pressure, True)
-        rh = float(humidity)
-        # p = float(pressure)
-        sr = float(solar_radiation)
+        wbgt = wbgt_celsius(twb, float(temp), float(humidity), float(solar_radiation))
 
-        wbgt = round(0.7 * twb + 0.002996 * sr + 0.3368 * ta - 0.01578 * rh - 0.5478, 1)
-
-        if self.unit_system == UNITS_IMPERIAL:
-            return self.temperature(wbgt)
-        return wbgt
+        return self.temperature(wbgt)
 
     def battery_level(self, battery, is_tempest):
         """ Return battery percentage.
@@ -485,40 +814,11 @@ class ConversionFunctions:
         if voltage is None or solar_radiation is None:
             return None
 
-        if voltage >= 2.455:
-            # Mode 0 (independent of charging or discharging at this voltage)
-            batt_mode = int(0)
-        elif voltage <= 2.355:
-            # Mode 3 (independent of charging or discharging at this voltage)
-            batt_mode = int(3)
-        elif solar_radiation > 100:
+        if solar_radiation > 100:
             # Assume charging and voltage is raising
-            if voltage >= 2.41:
-                # Mode 1
-                batt_mode = int(1)
-            elif voltage > 2.375:
-                # Mode 2
-                batt_mode = int(2)
-            else:
-                # Mode 3
-                batt_mode = int(3)
-        else:
-            # Assume discharging and voltage is lowering
-            if voltage > 2.415:
-                # Mode 0
-                batt_mode = int(0)
-            elif voltage > 2.39:
-                # Mode 1
-                batt_mode = int(1)
-            elif voltage > 2.355:
-                # Mode 2
-                batt_mode = int(2)
-            else:
-                # Mode 3
-                batt_mode = int(3)
-
-        mode_description = BATTERY_MODE_DESCRIPTION[batt_mode]
-        return batt_mode, mode_description
+            return self._battery_mode_charging(voltage)
+        # Assume discharging and voltage is lowering
+        return self._battery_mode_discharging(voltage)
 
     def beaufort(self, wind_speed):
         """ Return Beaufort Scale value based on Wind Speed.
@@ -528,38 +828,9 @@ class ConversionFunctions:
             bft_value is the numerical rating on the Beaufort Scale
         """
         if wind_speed is None:
-            return 0, self.translations["beaufort"][str(0)]
-
-        if wind_speed > 32.7:
-            bft_value = 12
-        elif wind_speed >= 28.5:
-            bft_value = 11
-        elif wind_speed >= 24.5:
-            bft_value = 10
-        elif wind_speed >= 20.8:
-            bft_value = 9
-        elif wind_speed >= 17.2:
-            bft_value = 8
-        elif wind_speed >= 13.9:
-            bft_value = 7
-        elif wind_speed >= 10.8:
-            bft_value = 6
-        elif wind_speed >= 8.0:
-            bft_value = 5
-        elif wind_speed >= 5.5:
-            bft_value = 4
-        elif wind_speed >= 3.4:
-            bft_value = 3
-        elif wind_speed >= 1.6:
-            bft_value = 2
-        elif wind_speed >= 0.3:
-            bft_value = 1
-        else:
-            bft_value = 0
+            wind_speed = 0
 
-        bft_text = self.translations["beaufort"][str(bft_value)]
-
-        return bft_value, bft_text
+        return self._beaufort(wind_speed)
 
     def dewpoint_level(self, dewpoint: float, is_metric: bool = None) -> str:
         """ Return text based comfort level.
@@ -571,33 +842,12 @@ class ConversionFunctions:
         if dewpoint is None:
             return "no-data"
         if is_metric is None:
-            is_metric = self.unit_system != UNITS_IMPERIAL
+            is_metric = not self.is_imperial
 
         if is_metric:
             dewpoint = (dewpoint * 9 / 5) + 32
 
-        if dewpoint >= 80:
-            return self.translations["dewpoint"]["severely-high"]
-        if dewpoint >= 75:
-            return self.translations["dewpoint"]["miserable"]
-        if dewpoint >= 70:
-            return self.translations["dewpoint"]["oppressive"]
-        if dewpoint >= 65:
-            return self.translations["dewpoint"]["uncomfortable"]
-        if dewpoint >= 60:
-            return self.translations["dewpoint"]["ok-for-most"]
-        if dewpoint >= 55:
-            return self.translations["dewpoint"]["comfortable"]
-        if dewpoint >= 50:
-            return self.translations["dewpoint"]["very-comfortable"]
-        if dewpoint >= 30:
-            return self.translations["dewpoint"]["somewhat-dry"]
-        if dewpoint >= 0.5:
-            return self.translations["dewpoint"]["dry"]
-        if dewpoint >= 0:
-            return self.translations["dewpoint"]["very-dry"]
-
-        return self.translations["dewpoint"]["undefined"]
+        return self._dewpoint_level(dewpoint)
 
     def temperature_level(self, temperature_c):
         """ Return text based comfort level, based on Air Temperature value.
@@ -610,48 +860,14 @@ class ConversionFunctions:
         if temperature_c is None:
             return "no-data"
 
-        temperature = (temperature_c * 9 / 5) + 32
-
-        if temperature >= 104:
-            return self.translations["temperature"]["inferno"]
-        if temperature >= 95:
-            return self.translations["temperature"]["very-hot"]
-        if temperature >= 86:
-            return self.translations["temperature"]["hot"]
-        if temperature >= 77:
-            return self.translations["temperature"]["warm"]
-        if temperature >= 68:
-            return self.translations["temperature"]["nice"]
-        if temperature >= 59:
-            return self.translations["temperature"]["cool"]
-        if temperature >= 41:
-            return self.translations["temperature"]["chilly"]
-        if temperature >= 32:
-            return self.translations["temperature"]["cold"]
-        if temperature >= 20:
-            return self.translations["temperature"]["freezing"]
-        if temperature <= 20:
-            return self.translations["temperature"]["fridged"]
-
-        return self.translations["temperature"]["undefined"]
+        return self._temperature_level((temperature_c * 9 / 5) + 32)
 
     def uv_level(self, uvi):
         """ Return text based UV Description."""
         if uvi is None:
             return "no-data"
 
-        if uvi >= 10.5:
-            return self.translations["uv"]["extreme"]
-        if uvi >= 7.5:
-            return self.translations["uv"]["very-high"]
-        if uvi >= 5.5:
-            return self.translations["uv"]["high"]
-        if uvi >= 2.5:
-            return self.translations["uv"]["moderate"]
-        if uvi > 0:
-            return self.translations["uv"]["low"]
-
-        return self.translations["uv"]["none"]
+        return self._uv_level(uvi)
 
     def utc_from_timestamp(self, timestamp: int) -> str:
         """ Return a UTC time from a timestamp."""
@@ -659,6 +875,9 @@ class ConversionFunctions:
             return None
 
         # Convert to String as MQTT does not like data objects
+        if isinstance(timestamp, int):
+            # Whole seconds, like the forecast times, don't need a datetime
+            return time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(timestamp))
         dt_obj = dt.datetime.utcfromtimestamp(timestamp).replace(tzinfo=UTC)
         utc_offset = dt_obj.strftime("%z")
         utc_string = f"{utc_offset[:3]}:{utc_offset[3:]}"
@@ -673,13 +892,12 @@ class ConversionFunctions:
         midnight_dt = self.utc_from_timestamp(midnight_ts)
         return midnight_dt
 
-    def solar_elevation(self, latitude, longitude):
+    def solar_elevation(self, latitude, longitude, now: time.struct_time | None = None):
         """ Return Sun Elevation in Degrees with respect to the Horizon.
         Input:
             Latitude in Degrees and fractional degrees
             Longitude in Degrees and fractional degrees
-            Local Time
-            UTC Time
+            Local Time (defaults to the current time)
         Where:
             jd is Julian Date (Day of Year only), then Julian Date + Fractional True
             lt is Local Time (####) 24 hour time, no colon
@@ -694,39 +912,23 @@ class ConversionFunctions:
             se is Solar Elevation
             ** All Trigonometry Fuctions need Degrees converted to Radians **
             ** The assumption is made that correct local time is established **
+        The elevation only changes once a minute, so it is looked up in a
+        table holding every minute of the day.
         """
         if latitude is None or longitude is None:
             return None
 
-        cos = math.cos
-        sin = math.sin
-        asin = math.asin
-        radians = math.radians
-        degrees = math.degrees
-        jd = time.localtime(time.time()).tm_yday
-        hr = time.localtime(time.time()).tm_hour
-        min = time.localtime(time.time()).tm_min
-        lt = hr + min/60
-        tz = time.localtime(time.time()).tm_gmtoff/3600
-        jd = jd + lt/24
-        beta = (360/365) * (jd - 81)
-        lstm = 15 * tz
-        eot = (9.87*(sin(radians(beta*2)))) - (7.53*(cos(radians(beta)))) - (1.5*(sin(radians(beta))))
-        tc = (4 * (longitude - lstm)) + eot
-        lst = lt + tc/60
-        h = 15 * (lst - 12)
-        dec = cos(radians(((jd) + 10) * (360/365))) * (-23.44)
-        se = degrees(asin(sin(radians(latitude)) * sin(radians(dec)) + cos(radians(latitude)) * cos(radians(dec)) * cos(radians(h))))
-        se = round(se)
-
-        return se
-
-    def solar_insolation(self, elevation, latitude, longitude):
+        return self.solar_ephemeris(latitude, longitude).elevation(
+            now or time.localtime()
+        )
+
+    def solar_insolation(self, elevation, latitude, longitude, now: time.struct_time | None = None):
         """ Return Estimation of Solar Radiation at current sun elevation angle.
         Input:
             Elevation in Meters
             Latitude
             Longitude
+            Local Time (defaults to the current time)
         Where:
             solar_elevation is the Sun Elevation in Degrees with respect to the Horizon
             sz is Solar Zenith in Degrees
@@ -738,28 +940,17 @@ class ConversionFunctions:
         if elevation is None or latitude is None or longitude is None:
             return None
 
-        # Calculate Solar Elevation
-        solar_elevation = self.solar_elevation(latitude, longitude)
-
-        cos = math.cos
-        sin = math.sin
-        asin = math.asin
-        radians = math.radians
-        degrees = math.degrees
-        se = solar_elevation
-        sz = 90 - se
-        ah_a = 0.14
-        ah_h = elevation / 1000
-        ah = ah_a * ah_h
-        if se >= 0:
-            am = 1/(cos(radians(sz)) + 0.50572*pow((96.07995 - sz),(-1.6364)))
-            si = (1353 * ((1-ah)*pow(.7, pow(am, 0.678))+ah))*(sin(radians(se)))
-        else:
-            am = 1
-            si = 0
-        si = round(si)
+        return self.solar_ephemeris(latitude, longitude).insolation(
+            now or time.localtime(), elevation
+        )
 
-        return si
+    def solar_ephemeris(self, latitude, longitude) -> SolarEphemeris:
+        """ Return the Solar Ephemeris for a location."""
+        if (ephemeris := self._solar_ephemerides.get((latitude, longitude))) is None:
+            ephemeris = self._solar_ephemerides[(latitude, longitude)] = SolarEphemeris(
+                latitude, longitude
+            )
+        return ephemeris
 
     def zambretti_value(self, latitude, wind_dir, p_hi, p_lo, trend, press):
         """ Return local forecast number based on Zambretti Forecaster.
@@ -772,18 +963,13 @@ class ConversionFunctions:
             Wind Direction in Degrees - Converted to Cardinal further down)
         Where:
             z_where is a designation of Northern or Southern Hemisphere
-            z_baro_top is the highest barometric pressure for location
-            z_baro_bottom is the lowest barometric pressure for location
-            z_range is the difference between highest and lowest pressures
             z_hpa is sea level pressure
             z_month is month of the year
             z_season is summer or winter
             z_wind is the cardinal wind direction
             z_trend is the pressure trend (idealy over a 3 hour period but current trend is used here)
             z_constant is pressure per zambretti value increment
-            rise_options is array of outputs available for rising pressure conditions
-            steady_options is array of outputs available for steady pressure conditions
-            fall_options is array of outputs available for falling pressure conditions
+            z_option is the 'dial window' for the adjusted pressure
         """
         if (
             latitude is None
@@ -795,134 +981,32 @@ class ConversionFunctions:
         ):
             return None
 
-        # Based off Beteljuice's Zambretti work; http://www.beteljuice.co.uk/zambretti/forecast.html
-        # Northern = 1 or Southern = 2 hemisphere
-        if latitude >= 0:
-            z_where = 1
-        else:
-            z_where = 2
-        # upper limits of your local 'weather window' Pulled from All Time Max
-        # var z_baro_top = 1050; # upper limits of your local 'weather window' (1050.0 hPa for UK)
-        z_baro_top = p_hi
-        # lower limits of your local 'weather window' Pulled from All Time Min
-        # var z_baro_bottom = 950;	// lower limits of your local 'weather window' (950.0 hPa for UK)
-        z_baro_bottom = p_lo
-        # range of pressure
-        z_range = z_baro_top - z_baro_bottom
-        # z_hpa is Sea Level Adjusted (Relative) barometer in hPa or mB
-        z_hpa = press
-        # z_month is current month as a number between 1 to 12
-        z_month = dt.datetime.now()
-        z_month = int(z_month.strftime("%m"))
-        # True (1) for summer, False (0) for Winter (Northern Hemishere)
+        # Northern = 0 or Southern = 1 hemisphere
+        z_where = 0 if latitude >= 0 else 1
+        # True for summer, False for Winter (Northern Hemishere)
+        z_month = dt.datetime.now().month
         z_season = (z_month >= 4 and  z_month <= 9)
-        # z_wind is English windrose cardinal eg. N, NNW, NW etc.
-        # NB. if calm a 'nonsense' value should be sent as z_wind (direction) eg. 1 or calm !
-        z_wind = self.direction(wind_dir)
         # z_trend is barometer trend: 0 = no change, 1 = rise, 2 = fall
-        # z_trend_threshold = 0.047248 if self.unit_system == UNITS_IMPERIAL else 1.6
         if float(trend) < 0:
             z_trend = 2
         elif float(trend) > 0:
             z_trend = 1
         else:
             z_trend = 0
-        # A constant for the current location, will vary since range will adjust as the min and max pressure will update overtime
-        z_constant = (z_range / 22)
-        # Equivalents of Zambretti 'dial window' letters A - Z: 0=A
-        rise_options  = [25,25,25,24,24,19,16,12,11,9,8,6,5,2,1,1,0,0,0,0,0,0]
-        steady_options  = [25,25,25,25,25,25,23,23,22,18,15,13,10,4,1,1,0,0,0,0,0,0]
-        fall_options =  [25,25,25,25,25,25,25,25,23,23,21,20,17,14,7,3,1,1,1,0,0,0]
-
-        if z_where == 1:
-            # North hemisphere
-            if z_wind == "N":
-                z_hpa += 6 / 100 * z_range
-            elif z_wind == "NNE":
-                z_hpa += 5 / 100 * z_range
-            elif z_wind == "NE":
-                z_hpa += 5 / 100 * z_range
-            elif z_wind == "ENE":
-                z_hpa += 2 / 100 * z_range
-            elif z_wind == "E":
-                z_hpa -= 0.5 / 100 * z_range
-            elif z_wind == "ESE":
-                z_hpa -= 2 / 100 * z_range
-            elif z_wind == "SE":
-                z_hpa -= 5 / 100 * z_range
-            elif z_wind == "SSE":
-                z_hpa -= 8.5 / 100 * z_range
-            elif z_wind == "S":
-                z_hpa -= 12 / 100 * z_range
-            elif z_wind == "SSW":
-                z_hpa -= 10 / 100 * z_range
-            elif z_wind == "SW":
-                z_hpa -= 6 / 100 * z_range
-            elif z_wind == "WSW":
-                z_hpa -= 4.5 / 100 * z_range
-            elif z_wind == "W":
-                z_hpa -= 3 / 100 * z_range
-            elif z_wind == "WNW":
-                z_hpa -= 0.5 / 100 * z_range
-            elif z_wind == "NW":
-                z_hpa += 1.5 / 100 * z_range
-            elif z_wind == "NNW":
-                z_hpa += 3 / 100 * z_range
-            if z_season == 1:
-                # if Summer
-                if z_trend == 1:
-                    # rising
-                    z_hpa += 7 / 100 * z_range
-                elif z_trend == 2:
-                    # falling
-                    z_hpa -= 7 / 100 * z_range
-        else:
-            # South hemisphere
-            if z_wind == "S":
-                z_hpa += 6 / 100 * z_range
-            elif z_wind == "SSW":
-                z_hpa += 5 / 100 * z_range
-            elif z_wind == "SW":
-                z_hpa += 5 / 100 * z_range
-            elif z_wind == "WSW":
-                z_hpa += 2 / 100 * z_range
-            elif z_wind == "W":
-                z_hpa -= 0.5 / 100 * z_range
-            elif z_wind == "WNW":
-                z_hpa -= 2 / 100 * z_range
-            elif z_wind == "NW":
-                z_hpa -= 5 / 100 * z_range
-            elif z_wind == "NNW":
-                z_hpa -= 8.5 / 100 * z_range
-            elif z_wind == "N":
-                z_hpa -= 12 / 100 * z_range
-            elif z_wind == "NNE":
-                z_hpa -= 10 / 100 * z_range
-            elif z_wind == "NE":
-                z_hpa -= 6 / 100 * z_range
-            elif z_wind == "ENE":
-                z_hpa -= 4.5 / 100 * z_range
-            elif z_wind == "E":
-                z_hpa -= 3 / 100 * z_range
-            elif z_wind == "ESE":
-                z_hpa -= 0.5 / 100 * z_range
-            elif z_wind == "SE":
-                z_hpa += 1.5 / 100 * z_range
-            elif z_wind == "SSE":
-                z_hpa += 3 / 100 * z_range
-            if z_season == 0:
-                # Winter
-                if z_trend == 1:
-                    # rising
-                    z_hpa += 7 / 100 * z_range
-                elif z_trend == 2:
-                    # falling
-                    z_hpa -= 7 / 100 * z_range
-            # END North / South
-
-        if z_hpa == z_baro_top:
-            z_hpa = z_baro_top - 1
-        z_option = math.floor((z_hpa - z_baro_bottom) / z_constant)
+
+        z_constant, wind_offsets, trend_offsets = self._zambretti_range(p_hi, p_lo)
+
+        # z_wind is the index of the cardinal wind direction
+        z_wind = int((wind_dir + 11.25) / 22.5)
+        # z_hpa is Sea Level Adjusted (Relative) barometer in hPa or mB
+        z_hpa = press + wind_offsets[z_where][z_wind]
+        if z_season == (z_where == 0):
+            # Summer in the north or winter in the south
+            z_hpa += trend_offsets[z_trend]
+
+        if z_hpa == p_hi:
+            z_hpa = p_hi - 1
+        z_option = math.floor((z_hpa - p_lo) / z_constant)
 
         if z_option < 0:
             z_option = 0
@@ -930,17 +1014,30 @@ class ConversionFunctions:
         if z_option > 21:
             z_option = 21
 
-        if z_trend == 1:
-            # rising
-            z_number = rise_options[z_option]
-        elif z_trend == 2:
-            # falling
-            z_number = fall_options[z_option]
-        else:
-            # must be 'steady'
-            z_number = steady_options[z_option]
+        return ZAMBRETTI_OPTIONS[z_trend][z_option]
 
-        return z_number
+    def _zambretti_range(self, p_hi, p_lo) -> tuple:
+        """ Return the Zambretti pressure increment and adjustments for a pressure range.
+        Input:
+            All Time Sea Level Pressure High in mB
+            All Time Sea Level Pressure Low in mB
+        Where:
+            z_range is the difference between highest and lowest pressures
+            wind_offsets are the adjustments by hemisphere and wind direction
+            trend_offsets are the adjustments by pressure trend
+        """
+        if (offsets := self._zambretti_offsets.get((p_hi, p_lo))) is None:
+            z_range = p_hi - p_lo
+            offsets = self._zambretti_offsets[(p_hi, p_lo)] = (
+                # A constant for the current location
+                z_range / 22,
+                [
+                    [factor * z_range for factor in wind]
+                    for wind in self._zambretti_wind
+                ],
+                [factor * z_range for factor in ZAMBRETTI_TREND],
+            )
+        return offsets
 
     def zambretti_forecast(self, z_num: int):
         """ Return local forecast text based on Zambretti Number from the zambretti_num function.
@@ -952,12 +1049,7 @@ class ConversionFunctions:
             return None
 
         # Zambretti Text Equivalents of Zambretti 'dial window' letters A - Z
-        # Simplified array for Language Translations
-        z_forecast = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L", "M", "N", "O", "P", "Q", "R", "S", "T", "U", "V", "W", "X", "Y", "Z"]
-        z_text = ""
-        z_text += z_forecast[int(z_num)]
-
-        return self.translations["zambretti"][z_text]
+        return self._zambretti_text[int(z_num)]
 
     def fog_probability(self, solar_elevation, wind_speed, humidity, dew_point, air_temperature):
         """ Return probability of fog in percent.
@@ -1063,7 +1155,7 @@ class ConversionFunctions:
         ):
             return None
 
-        is_metric = False if self.unit_system != UNITS_IMPERIAL else True
+        is_metric = False if not self.is_imperial else True
 
 
         if not is_metric:
@@ -1221,3 +1313,115 @@ class ConversionFunctions:
         # return the human readable weather conditions
         return current
 '''
+
+
+class MetricConversionFunctions(ConversionFunctions):
+    """ Conversion functions for the metric unit system."""
+
+    def temperature(self, value) -> float:
+        """ Convert Temperature Value."""
+        if value is not None:
+            return round(value, 1)
+
+        _LOGGER.error(
+            "FUNC: temperature ERROR: Temperature value was reported as NoneType. Check the sensor"
+        )
+
+    def pressure(self, value) -> float:
+        """ Convert Pressure Value."""
+        if value is not None:
+            return round(value, 2)
+
+        _LOGGER.error(
+            "FUNC: pressure ERROR: Pressure value was reported as NoneType. Check the sensor"
+        )
+
+    def speed(self, value, kmh=False) -> float:
+        """ Convert Wind Speed."""
+        if value is not None:
+            if kmh:
+                return round((value * 18 / 5), 1)
+            return round(value, 1)
+
+        _LOGGER.error(
+            "FUNC: speed ERROR: Wind value was reported as NoneType. Check the sensor"
+        )
+
+    def distance(self, value) -> float:
+        """ Convert distance."""
+        if value is not None:
+            return value
+
+        _LOGGER.error(
+            "FUNC: distance ERROR: Lightning Distance value was reported as NoneType. Check the sensor"
+        )
+
+    def rain(self, value) -> float:
+        """ Convert rain."""
+        if value is not None:
+            return round(value, 2)
+
+        _LOGGER.error(
+            "FUNC: rain ERROR: Rain value was reported as NoneType. Check the sensor"
+        )
+
+    def _visibility_distance(self, vis: float) -> float:
+        """ Return the visibility in km."""
+        return round(vis, 1)
+
+
+class ImperialConversionFunctions(ConversionFunctions):
+    """ Conversion functions for the imperial unit system."""
+
+    is_imperial = True
+
+    def temperature(self, value) -> float:
+        """ Convert Temperature Value."""
+        if value is not None:
+            return round((value * 9 / 5) + 32, 1)
+
+        _LOGGER.error(
+            "FUNC: temperature ERROR: Temperature value was reported as NoneType. Check the sensor"
+        )
+
+    def pressure(self, value) -> float:
+        """ Convert Pressure Value."""
+        if value is not None:
+            return round(value * 0.02953, 3)
+
+        _LOGGER.error(
+            "FUNC: pressure ERROR: Pressure value was reported as NoneType. Check the sensor"
+        )
+
+    def speed(self, value, kmh=False) -> float:
+        """ Convert Wind Speed."""
+        if value is not None:
+            return round(value * 2.2369362920544, 2)
+
+        _LOGGER.error(
+            "FUNC: speed ERROR: Wind value was reported as NoneType. Check the sensor"
+        )
+
+    def distance(self, value) -> float:
+        """ Convert distance."""
+        if value is not None:
+            return round(value / 1.609344, 2)
+
+        _LOGGER.error(
+            "FUNC: distance ERROR: Lightning Distance value was reported as NoneType. Check the sensor"
+        )
+
+    def rain(self, value) -> float:
+        """ Convert rain."""
+        if value is not None:
+            return round(value * 0.0393700787, 2)
+
+        _LOGGER.error(
+            "FUNC: rain ERROR: Rain value was reported as NoneType. Check the sensor"
+        )
+
+    def _visibility_distance(self, vis: float) -> float:
+        """ Return the visibility in miles."""
+        # Originally was in nautical miles;
+        # HA displays miles as imperial, therfore converted to miles
+        return round(vis / 1.609344, 1)
@@ -0,0 +1,61 @@
+"""Helpers to collect runtime metrics."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any
+
+LATENCY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Histogram of latencies in milliseconds."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialize the histogram."""
+        self.buckets = buckets
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all recorded values."""
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        """Record a latency in milliseconds."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean latency, or `None` if nothing was recorded."""
+        return round(self.total / self.count, 1) if self.count else None
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the upper bucket bound holding the given percentile."""
+        if not self.count:
+            return None
+        rank = self.count * pct / 100
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return round(self.max, 1)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as a dictionary."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p95": self.percentile(95),
+            "max": round(self.max, 1),
+            "buckets": {
+                **{f"<={bound}": count for bound, count in zip(self.buckets, self.counts)},
+                f">{self.buckets[-1]}": self.counts[-1],
+            },
+        }
@@ -0,0 +1,387 @@
+"""Publish messages to a MQTT broker."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable
+
+from paho.mqtt.client import MQTT_ERR_NO_CONN, MQTT_ERR_SUCCESS
+from paho.mqtt.client import Client as MqttClient
+
+from .const import MQTT_QUEUE_SIZE, OUTBOX_COMMIT_DELAY
+from .metrics import LatencyHistogram
+from .outbox import MqttOutbox
+
+if TYPE_CHECKING:
+    from .weatherflow_mqtt import MqttConfig
+
+_LOGGER = logging.getLogger(__name__)
+
+# Topic, payload, QoS, retain, time sent and the callback for the PUBACK
+InflightMessage = tuple[str, str | None, int, bool, float, Callable[[], None] | None]
+
+
+class MqttOutput:
+    """Class to handle the queue and connection for a single MQTT broker."""
+
+    def __init__(
+        self,
+        config: MqttConfig,
+        outbox_file: str | None = None,
+        queue_size: int = MQTT_QUEUE_SIZE,
+    ) -> None:
+        """Initialize a MQTT output."""
+        self.config = config
+        self.client: MqttClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._queue_size = queue_size
+        self._queue_task: asyncio.Task | None = None
+        # Set once the broker has been connected to
+        self._connected: asyncio.Event | None = None
+        self._delay = 1 / config.rate_limit if config.rate_limit > 0 else 0
+
+        # Undelivered messages are spooled to disk while the broker is unavailable
+        self.outbox = (
+            MqttOutbox(outbox_file, config.outbox_size)
+            if outbox_file is not None and config.outbox_size > 0
+            else None
+        )
+        self._outbox_task: asyncio.Task | None = None
+        self._outbox_commit: asyncio.TimerHandle | None = None
+        # Messages handed to the client and waiting for a PUBACK, by message
+        # id. The client resends them after a reconnect, they are only
+        # spooled to the outbox when the output is closed.
+        self._inflight: dict[int, InflightMessage] = {}
+
+        self.published = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        # Latencies per topic class (state, attributes, config)
+        self.queue_latency: dict[str, LatencyHistogram] = {}
+        self.ack_latency: dict[str, LatencyHistogram] = {}
+
+    @property
+    def name(self) -> str:
+        """Return the name of the output."""
+        return f"{self.config.host}:{self.config.port}"
+
+    @property
+    def is_connected(self) -> bool:
+        """Return `True` if the client is connected to the broker."""
+        return self.client is not None and self.client.is_connected()
+
+    @property
+    def health(self) -> dict[str, Any]:
+        """Return the health metrics for the output."""
+        return {
+            "connected": self.is_connected,
+            "queue_size": 0 if self._queue is None else self._queue.qsize(),
+            "published": self.published,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "inflight": len(self._inflight),
+            "outbox": 0 if self.outbox is None else self.outbox.pending,
+        }
+
+    def diagnostics(self, reset: bool = True) -> dict[str, Any]:
+        """Return the health metrics and latencies since the last call."""
+        queue_latency = LatencyHistogram()
+        ack_latency = LatencyHistogram()
+        data = {
+            **self.health,
+            "queue_latency": {},
+            "ack_latency": {},
+        }
+        for key, histograms, total in (
+            ("queue_latency", self.queue_latency, queue_latency),
+            ("ack_latency", self.ack_latency, ack_latency),
+        ):
+            for topic_class, histogram in histograms.items():
+                data[key][topic_class] = histogram.as_dict()
+                total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+                total.count += histogram.count
+                total.total += histogram.total
+                total.max = max(total.max, histogram.max)
+                if reset:
+                    histogram.reset()
+        data["queue_latency_mean"] = queue_latency.mean
+        data["queue_latency_p95"] = queue_latency.percentile(95)
+        data["ack_latency_mean"] = ack_latency.mean
+        data["ack_latency_p95"] = ack_latency.percentile(95)
+        return data
+
+    def connect(self, wait: bool = True) -> None:
+        """Connect to the broker.
+
+        If `wait` is `False`, the connection is made in the background and
+        retried until the broker can be reached.
+        """
+        if self.client is None:
+            self._setup_mqtt_client()
+        self.attach_client(self.client)
+
+        if wait:
+            self.client.connect(self.config.host, port=self.config.port, keepalive=300)
+        else:
+            self.client.connect_async(
+                self.config.host, port=self.config.port, keepalive=300
+            )
+        self.client.loop_start()
+
+    def attach_client(self, client: MqttClient) -> None:
+        """Start the queue and the outbox for a client, without connecting it.
+
+        Messages are held until the client reports that it is connected. This
+        lets tests and benchmarks publish to a client that needs no broker.
+        """
+        self.client = client
+        client.on_connect = self._on_mqtt_connect
+        client.on_disconnect = self._on_mqtt_disconnect
+        client.on_publish = self._on_mqtt_publish
+
+        self._loop = asyncio.get_running_loop()
+        self._connected = asyncio.Event()
+        if self.outbox is not None:
+            self.outbox.open()
+
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._queue_task = asyncio.ensure_future(self._mqtt_queue_processor())
+
+    def close(self) -> None:
+        """Stop the client and write the outbox to disk."""
+        if self._outbox_commit is not None:
+            self._outbox_commit.cancel()
+            self._outbox_commit = None
+        if self.client is not None:
+            self.client.loop_stop()
+        if self.outbox is not None:
+            self._spool_inflight()
+            self.outbox.close()
+
+    async def wait_connected(self, timeout: float | None = None) -> bool:
+        """Wait until the broker has been connected to.
+
+        Returns `False` if it isn't connected within `timeout` seconds.
+        """
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def add_to_queue(
+        self,
+        topic: str,
+        payload: str | None = None,
+        qos: int = 0,
+        retain: bool = False,
+        on_acknowledged: Callable[[], None] | None = None,
+    ) -> None:
+        """Add an item to the queue.
+
+        `on_acknowledged` is called once the broker has acknowledged a message
+        with a QoS above 0. It isn't called if the message had to be spooled.
+        """
+        try:
+            self._queue.put_nowait(
+                (topic, payload, qos, retain, time.monotonic(), on_acknowledged)
+            )
+        except asyncio.QueueFull:
+            # The broker can't keep up, spool the message instead
+            self.dropped += 1
+            self._spool_message(topic, payload, qos, retain)
+
+    async def join(self) -> None:
+        """Wait until the queue has been processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def _setup_mqtt_client(self) -> None:
+        """Initialize MQTT client."""
+        if (
+            anonymous := not self.config.username or not self.config.password
+        ) and self.config.debug:
+            _LOGGER.debug("MQTT Credentials not needed")
+
+        self.client = client = MqttClient()
+
+        if not anonymous:
+            client.username_pw_set(
+                username=self.config.username, password=self.config.password
+            )
+        if self.config.debug:
+            client.enable_logger()
+            _LOGGER.debug(
+                "MQTT Credentials: %s - %s",
+                self.config.username,
+                self.config.password,
+            )
+
+    async def _mqtt_queue_processor(self) -> None:
+        """MQTT queue processor."""
+        # Messages queued before the first connection are held, not spooled
+        await self._connected.wait()
+        while True:
+            topic, payload, qos, retain, enqueued, on_acknowledged = await self._queue.get()
+            await self._publish_mqtt(topic, payload, qos, retain, enqueued, on_acknowledged)
+            self._queue.task_done()
+
+    async def _publish_mqtt(
+        self,
+        topic: str,
+        payload: str | None = None,
+        qos: int = 0,
+        retain: bool = False,
+        enqueued: float | None = None,
+        on_acknowledged: Callable[[], None] | None = None,
+    ) -> None:
+        """Publish a MQTT topic with payload."""
+        if not self.client.is_connected():
+            self._spool_message(topic, payload, qos, retain)
+            return
+
+        try:
+            info = self.client.publish(
+                topic
+                if self.config.topic_prefix is None
+                else f"{self.config.topic_prefix}/{topic}",
+                payload,
+                qos=qos,
+                retain=retain,
+            )
+            if info.rc == MQTT_ERR_NO_CONN and qos > 0:
+                # The client keeps the message and sends it after reconnecting
+                self._track_inflight(
+                    info.mid,
+                    (topic, payload, qos, retain, time.monotonic(), on_acknowledged),
+                )
+            elif info.rc != MQTT_ERR_SUCCESS:
+                self.failed += 1
+                self._spool_message(topic, payload, qos, retain)
+            else:
+                sent = time.monotonic()
+                self.published += 1
+                if enqueued is not None:
+                    self._record_latency(self.queue_latency, topic, sent - enqueued)
+                if qos > 0:
+                    self._track_inflight(
+                        info.mid, (topic, payload, qos, retain, sent, on_acknowledged)
+                    )
+                if retain and self.outbox is not None:
+                    # A newer state supersedes whatever is spooled for the topic
+                    if self.outbox.discard(topic):
+                        self._commit_outbox_later()
+        except Exception as e:
+            _LOGGER.error("Could not publish to MQTT Server %s. Error is: %s", self.name, e)
+            self.failed += 1
+            self._spool_message(topic, payload, qos, retain)
+        await asyncio.sleep(self._delay)
+
+    def _record_latency(
+        self, histograms: dict[str, LatencyHistogram], topic: str, seconds: float
+    ) -> None:
+        """Record a latency for the class (last part) of the topic."""
+        topic_class = topic.rsplit("/", 1)[-1]
+        if (histogram := histograms.get(topic_class)) is None:
+            histogram = histograms[topic_class] = LatencyHistogram()
+        histogram.add(seconds * 1000)
+
+    def _track_inflight(self, mid: int, message: InflightMessage) -> None:
+        """Remember a message until it is acknowledged."""
+        self._inflight[mid] = message
+        if len(self._inflight) > self._queue_size:
+            # Never acknowledged, give up on the oldest message
+            del self._inflight[next(iter(self._inflight))]
+            self.failed += 1
+
+    def _spool_message(
+        self, topic: str, payload: str | None = None, qos: int = 0, retain: bool = False
+    ) -> None:
+        """Store a message in the outbox, to be sent when the broker is back."""
+        if self.outbox is None:
+            _LOGGER.debug("MQTT Server %s unavailable. Dropping message for %s", self.name, topic)
+            return
+        self.outbox.spool(topic, payload, qos, retain)
+        self._commit_outbox_later()
+
+    def _commit_outbox_later(self) -> None:
+        """Commit the outbox soon, so a burst of changes is written at once."""
+        if self._outbox_commit is None and self._loop is not None:
+            self._outbox_commit = self._loop.call_later(
+                OUTBOX_COMMIT_DELAY, self._commit_outbox
+            )
+
+    def _commit_outbox(self) -> None:
+        """Write the changes to the outbox to disk."""
+        self._outbox_commit = None
+        self.outbox.commit()
+
+    def _on_mqtt_connect(self, client: MqttClient, userdata: Any, flags: dict, rc: int) -> None:
+        """Handle the MQTT client (re)connecting. Called from the MQTT thread."""
+        if rc == 0 and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._mqtt_connected)
+
+    def _on_mqtt_disconnect(self, client: MqttClient, userdata: Any, rc: int) -> None:
+        """Handle the MQTT client disconnecting. Called from the MQTT thread."""
+        if rc != 0:
+            _LOGGER.warning(
+                "Lost connection to the MQTT Server %s. Messages will be kept until it is back",
+                self.name,
+            )
+
+    def _on_mqtt_publish(self, client: MqttClient, userdata: Any, mid: int) -> None:
+        """Handle a publish being acknowledged. Called from the MQTT thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._message_acknowledged, mid)
+
+    def _message_acknowledged(self, mid: int) -> None:
+        """Forget an acknowledged message."""
+        if (message := self._inflight.pop(mid, None)) is not None:
+            topic, _, _, _, sent, on_acknowledged = message
+            self._record_latency(self.ack_latency, topic, time.monotonic() - sent)
+            if on_acknowledged is not None:
+                on_acknowledged()
+
+    def _spool_inflight(self) -> None:
+        """Spool all unacknowledged messages, so they survive a restart."""
+        for topic, payload, qos, retain, *_ in self._inflight.values():
+            if not (retain and self.outbox.has_retained(topic)):
+                self.outbox.spool(topic, payload, qos, retain)
+        self._inflight.clear()
+
+    def _mqtt_connected(self) -> None:
+        """Handle the MQTT client (re)connecting."""
+        self._connected.set()
+        self._start_outbox_replay()
+
+    def _start_outbox_replay(self) -> None:
+        """Start replaying the outbox, if there is anything in it."""
+        if self.outbox is None or not self.outbox.pending:
+            return
+        if self._outbox_task is None or self._outbox_task.done():
+            self._outbox_task = asyncio.ensure_future(self._outbox_processor())
+
+    async def _outbox_processor(self) -> None:
+        """Replay the spooled messages in order."""
+        remaining = self.outbox.pending
+        _LOGGER.info(
+            "Sending %s messages from the MQTT outbox to %s", remaining, self.name
+        )
+        while remaining > 0 and (messages := self.outbox.read()):
+            for seq, topic, payload, qos, retain in messages:
+                if not self.client.is_connected():
+                    return
+                remaining -= 1
+                # A live publish may have sent or spooled a newer retained
+                # message for the topic while replaying, then the old one
+                # must not be sent
+                if not self.outbox.remove(seq, topic, retain):
+                    continue
+                self._commit_outbox_later()
+                # If the publish fails, the message is spooled again
+                self.retries += 1
+                await self._publish_mqtt(topic, payload, qos, retain)
@@ -0,0 +1,196 @@
+"""Disk backed outbox for MQTT messages that could not be delivered."""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from sqlite3 import Error as SQLError
+
+from .const import INDEX_OUTBOX_TOPIC, OUTBOX_MAX_MESSAGES, OUTBOX_VERSION, TABLE_OUTBOX
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class MqttOutbox:
+    """Class to spool MQTT messages to disk while the broker is unavailable.
+
+    Retained messages hold the state of a topic, so they are coalesced and
+    only the newest payload for a topic is kept. Other messages are events,
+    like lightning strikes, and every one of them is kept. Messages are
+    replayed in the order they were (last) spooled.
+    Changes are not committed right away, the owner calls `commit` to write
+    them to disk in batches.
+    """
+
+    def __init__(self, db_file: str, max_messages: int = OUTBOX_MAX_MESSAGES):
+        """Initialize the outbox."""
+        self.connection: sqlite3.Connection | None = None
+        self._db_file = db_file
+        self._max_messages = max_messages
+        self._pending = 0
+        # Sequence number of the spooled retained message, by topic
+        self._retained: dict[str, int] = {}
+
+    @property
+    def pending(self) -> int:
+        """Return the number of messages waiting in the outbox."""
+        return self._pending
+
+    def has_retained(self, topic: str) -> bool:
+        """Return `True` if a retained message for the topic is waiting in the outbox."""
+        return topic in self._retained
+
+    def open(self) -> None:
+        """Open the outbox database and load the spooled topics."""
+        try:
+            self.connection = sqlite3.connect(self._db_file)
+            self._upgrade()
+            self.connection.execute(TABLE_OUTBOX)
+            self.connection.execute(INDEX_OUTBOX_TOPIC)
+            self.connection.execute(f"PRAGMA main.user_version = {OUTBOX_VERSION};")
+            self.connection.commit()
+            self._pending = self.connection.execute(
+                "SELECT COUNT(*) FROM outbox;"
+            ).fetchone()[0]
+            self._retained = dict(
+                self.connection.execute("SELECT topic, seq FROM outbox WHERE retain = 1;")
+            )
+            if self._pending:
+                _LOGGER.info("MQTT outbox contains %s undelivered messages", self._pending)
+        except SQLError as e:
+            _LOGGER.error("Could not open the MQTT outbox. Error: %s", e)
+            self.connection = None
+
+    def _upgrade(self) -> None:
+        """Upgrade an outbox written by an older version."""
+        version = self.connection.execute("PRAGMA main.user_version;").fetchone()[0]
+        if version >= OUTBOX_VERSION or not self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'outbox';"
+        ).fetchone():
+            return
+        # Version 1 kept a single message per topic
+        self.connection.execute("ALTER TABLE outbox RENAME TO outbox_old;")
+        self.connection.execute(TABLE_OUTBOX)
+        self.connection.execute(
+            "INSERT INTO outbox(topic, payload, qos, retain, created) "
+            "SELECT topic, payload, qos, retain, created FROM outbox_old ORDER BY seq;"
+        )
+        self.connection.execute("DROP TABLE outbox_old;")
+
+    @property
+    def uncommitted(self) -> bool:
+        """Return `True` if there are changes that have not been committed."""
+        return self.connection is not None and self.connection.in_transaction
+
+    def commit(self) -> None:
+        """Write the pending changes to disk."""
+        if not self.uncommitted:
+            return
+        try:
+            self.connection.commit()
+        except SQLError as e:
+            _LOGGER.error("Could not commit the MQTT outbox. Error: %s", e)
+
+    def close(self) -> None:
+        """Commit the pending changes and close the outbox database."""
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
+
+    def spool(
+        self,
+        topic: str,
+        payload: str | bytes | None = None,
+        qos: int = 0,
+        retain: bool = False,
+    ) -> None:
+        """Store a message, replacing an older retained message for the same topic."""
+        if self.connection is None:
+            return
+
+        try:
+            if retain:
+                self.discard(topic)
+            cursor = self.connection.execute(
+                "INSERT INTO outbox(topic, payload, qos, retain, created) VALUES(?, ?, ?, ?, ?);",
+                (topic, payload, qos, int(retain), time.time()),
+            )
+            self._pending += 1
+            if retain:
+                self._retained[topic] = cursor.lastrowid
+
+            if (overflow := self._pending - self._max_messages) > 0:
+                dropped = self.connection.execute(
+                    "SELECT seq, topic, retain FROM outbox ORDER BY seq LIMIT ?;", (overflow,)
+                ).fetchall()
+                self.connection.executemany(
+                    "DELETE FROM outbox WHERE seq = ?;", [(row[0],) for row in dropped]
+                )
+                self._pending -= len(dropped)
+                for _, dropped_topic, dropped_retain in dropped:
+                    if dropped_retain:
+                        del self._retained[dropped_topic]
+                _LOGGER.warning(
+                    "MQTT outbox is full. Dropped %s of the oldest messages",
+                    len(dropped),
+                )
+        except SQLError as e:
+            _LOGGER.error("Could not write message to the MQTT outbox. Error: %s", e)
+
+    def discard(self, topic: str) -> int:
+        """Remove the spooled retained message for a topic.
+
+        Returns the number of messages removed.
+        """
+        if self.connection is None or (seq := self._retained.get(topic)) is None:
+            return 0
+
+        try:
+            cursor = self.connection.execute("DELETE FROM outbox WHERE seq = ?;", (seq,))
+        except SQLError as e:
+            _LOGGER.error("Could not remove message from the MQTT outbox. Error: %s", e)
+            return 0
+        del self._retained[topic]
+        self._pending -= cursor.rowcount
+        return cursor.rowcount
+
+    def remove(self, seq: int, topic: str, retain: bool) -> bool:
+        """Remove a message returned by `read`.
+
+        Returns `False` if it was already removed or replaced by a newer message.
+        """
+        if self.connection is None:
+            return False
+
+        try:
+            cursor = self.connection.execute("DELETE FROM outbox WHERE seq = ?;", (seq,))
+        except SQLError as e:
+            _LOGGER.error("Could not remove message from the MQTT outbox. Error: %s", e)
+            return False
+        if not cursor.rowcount:
+            return False
+        self._pending -= 1
+        if retain:
+            del self._retained[topic]
+        return True
+
+    def read(
+        self, limit: int = 100
+    ) -> list[tuple[int, str, str | bytes | None, int, bool]]:
+        """Return the oldest spooled messages, in the order they were spooled."""
+        if self.connection is None or not self._pending:
+            return []
+
+        try:
+            rows = self.connection.execute(
+                "SELECT seq, topic, payload, qos, retain FROM outbox ORDER BY seq LIMIT ?;",
+                (limit,),
+            ).fetchall()
+            return [
+                (seq, topic, payload, qos, bool(retain))
+                for seq, topic, payload, qos, retain in rows
+            ]
+        except SQLError as e:
+            _LOGGER.error("Could not read the MQTT outbox. Error: %s", e)
+            return []
@@ -0,0 +1,166 @@
+"""Run jobs at set times, without polling.
+
+The jobs wait in a heap ordered by when they are due, and the scheduler only
+wakes up when the first one is due. Each job computes its next run from the
+time it ran, so daily jobs can follow the local clock across DST changes.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Callable
+
+from .const import SCHEDULER_MAX_SLEEP
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def every(interval: float) -> Callable[[float], float]:
+    """Return a next run function for a job that runs every `interval` seconds."""
+    return lambda now: now + interval
+
+
+def next_local_midnight(now: float) -> float:
+    """Return the timestamp of the next local midnight after `now`.
+
+    The date is taken in local time, so days of 23 and 25 hours are handled.
+    """
+    tomorrow = date.fromtimestamp(now) + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+@dataclass
+class Job:
+    """A job and the metrics of its runs."""
+
+    name: str
+    func: Callable[[], Any]
+    next_run: Callable[[float], float]
+    due: float = 0
+    runs: int = 0
+    failures: int = 0
+    # Seconds between when the job was due and when it started, of the last run
+    lateness: float | None = None
+    # Duration in ms of the last and the longest run
+    duration: float | None = None
+    max_duration: float = 0
+    _total_duration: float = field(default=0, repr=False)
+
+    async def run(self) -> None:
+        """Run the job and record how it went."""
+        self.lateness = round(time.time() - self.due, 3)
+        start = time.perf_counter()
+        try:
+            if inspect.isawaitable(result := self.func()):
+                await result
+        except Exception as e:
+            self.failures += 1
+            _LOGGER.error("Scheduled job %s failed. Error is: %s", self.name, e)
+        finally:
+            self.runs += 1
+            self.duration = round((time.perf_counter() - start) * 1000, 1)
+            self.max_duration = max(self.max_duration, self.duration)
+            self._total_duration += self.duration
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the metrics of the job."""
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "lateness": self.lateness,
+            "duration": self.duration,
+            "duration_mean": round(self._total_duration / self.runs, 1)
+            if self.runs
+            else None,
+            "duration_max": self.max_duration,
+            "next_run": round(max(self.due - time.time(), 0)),
+        }
+
+
+class Scheduler:
+    """Scheduler for the time based updates."""
+
+    def __init__(self) -> None:
+        """Initialize the Scheduler."""
+        self.jobs: dict[str, Job] = {}
+        self._queue: list[tuple[float, int, Job]] = []
+        self._order = itertools.count()
+        self._changed = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._task: asyncio.Future | None = None
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        next_run: Callable[[float], float],
+        first_run: float | None = None,
+    ) -> Job:
+        """Add a job.
+
+        `func` may be a coroutine function. `next_run` is called with the time
+        the job last ran, or now for the first run unless `first_run` is given,
+        and returns the timestamp of its next run.
+        """
+        job = Job(name, func, next_run)
+        self.jobs[name] = job
+        self._push(job, next_run(time.time()) if first_run is None else first_run)
+        return job
+
+    def diagnostics(self) -> dict[str, dict[str, Any]]:
+        """Return the metrics of every job."""
+        return {name: job.diagnostics() for name, job in self.jobs.items()}
+
+    def start(self) -> None:
+        """Start running the jobs in the background."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop running the jobs."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._stopped.set()
+
+    async def wait(self) -> None:
+        """Wait until the scheduler is stopped."""
+        await self._stopped.wait()
+
+    def _push(self, job: Job, due: float) -> None:
+        """Queue the next run of a job."""
+        job.due = due
+        heapq.heappush(self._queue, (due, next(self._order), job))
+        self._changed.set()
+
+    async def _run(self) -> None:
+        """Run the jobs when they are due."""
+        while True:
+            self._changed.clear()
+            if not self._queue:
+                await self._changed.wait()
+                continue
+            due, _, job = self._queue[0]
+            if (delay := due - time.time()) > 0:
+                # The sleep is capped so that a change of the clock is noticed
+                try:
+                    await asyncio.wait_for(
+                        self._changed.wait(), min(delay, SCHEDULER_MAX_SLEEP)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            start = time.time()
+            await job.run()
+            self._push(job, job.next_run(start))
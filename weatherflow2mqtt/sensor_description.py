@@ -28,8 +28,12 @@ from .const import (
     DEVICE_CLASS_TIMESTAMP,
     DEVICE_CLASS_VOLTAGE,
     DEVICE_CLASS_WIND_SPEED,
+    ENTITY_CATEGORY_DIAGNOSTIC,
+    EVENT_DIAGNOSTICS,
     EVENT_FORECAST,
     FORECAST_ENTITY,
+    FORECAST_HOURLY_ENTITY,
+    STATE_CLASS_INCREASING,
     STATE_CLASS_MEASUREMENT,
     TEMP_CELSIUS,
     TEMP_FAHRENHEIT,
@@ -51,6 +55,7 @@ class BaseSensorDescription:
 
     attr: str | None = None
     device_class: str | None = None
+    entity_category: str | None = None
     extra_att: bool = False
     has_description: bool = False
     icon: str | None = None
@@ -677,9 +682,9 @@ DEVICE_SENSORS: tuple[BaseSensorDescription, ...] = (
         icon="angle-acute",
         event=EVENT_OBSERVATION,
         attr="solar_radiation",
-        custom_fn=lambda cnv, latitude, longitude: None
+        custom_fn=lambda cnv, latitude, longitude, now: None
         if None in (latitude, longitude)
-        else cnv.solar_elevation(latitude, longitude)
+        else cnv.solar_elevation(latitude, longitude, now)
     ),
     SensorDescription(
         id="solar_insolation",
@@ -690,9 +695,9 @@ DEVICE_SENSORS: tuple[BaseSensorDescription, ...] = (
         icon="solar-power",
         event=EVENT_OBSERVATION,
         attr="solar_radiation",
-        custom_fn=lambda cnv, elevation, latitude, longitude: None
+        custom_fn=lambda cnv, elevation, latitude, longitude, now: None
         if None in (elevation, latitude, longitude)
-        else cnv.solar_insolation(elevation, latitude, longitude)
+        else cnv.solar_insolation(elevation, latitude, longitude, now)
     ),
     SensorDescription(
         id="zambretti_number",
@@ -763,6 +768,87 @@ FORECAST_SENSORS: tuple[BaseSensorDescription, ...] = (
         icon="chart-box-outline",
         event=EVENT_FORECAST,
     ),
+    SensorDescription(
+        id=FORECAST_HOURLY_ENTITY,
+        name="Weather Hourly",
+        icon="calendar-clock",
+        event=EVENT_FORECAST,
+    ),
+)
+
+DIAGNOSTIC_SENSORS: tuple[BaseSensorDescription, ...] = (
+    SensorDescription(
+        id="mqtt_queue_latency",
+        name="MQTT Queue Latency",
+        unit_m="ms",
+        unit_i="ms",
+        state_class=STATE_CLASS_MEASUREMENT,
+        icon="timer-sand",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
+    SensorDescription(
+        id="mqtt_ack_latency",
+        name="MQTT Acknowledge Latency",
+        unit_m="ms",
+        unit_i="ms",
+        state_class=STATE_CLASS_MEASUREMENT,
+        icon="timer-check-outline",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
+    SensorDescription(
+        id="mqtt_queue_size",
+        name="MQTT Queue Size",
+        state_class=STATE_CLASS_MEASUREMENT,
+        icon="tray-full",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
+    SensorDescription(
+        id="mqtt_inflight",
+        name="MQTT Messages In Flight",
+        state_class=STATE_CLASS_MEASUREMENT,
+        icon="send-clock-outline",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
+    SensorDescription(
+        id="mqtt_failed",
+        name="MQTT Publish Failures",
+        state_class=STATE_CLASS_INCREASING,
+        icon="alert-circle-outline",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
+    SensorDescription(
+        id="mqtt_retries",
+        name="MQTT Publish Retries",
+        state_class=STATE_CLASS_INCREASING,
+        icon="replay",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
+    SensorDescription(
+        id="forecast_request_time",
+        name="Forecast Request Time",
+        unit_m="ms",
+        unit_i="ms",
+        state_class=STATE_CLASS_MEASUREMENT,
+        icon="web-clock",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
+    SensorDescription(
+        id="forecast_age",
+        name="Forecast Age",
+        unit_m="s",
+        unit_i="s",
+        state_class=STATE_CLASS_MEASUREMENT,
+        icon="clock-alert-outline",
+        event=EVENT_DIAGNOSTICS,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    ),
 )
 
 OBSOLETE_SENSORS = ["uptime"]
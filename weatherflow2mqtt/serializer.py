@@ -0,0 +1,67 @@
+"""Serialize MQTT payloads to JSON.
+
+`orjson` is used if it is installed, otherwise the standard library `json`
+module is used.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from types import MappingProxyType
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_LOGGER = logging.getLogger(__name__)
+
+SERIALIZER_JSON = "json"
+SERIALIZER_ORJSON = "orjson"
+
+
+def _default(value: Any) -> Any:
+    """Return a value the JSON libraries can write, for the frozen event bus records."""
+    if isinstance(value, MappingProxyType):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JsonSerializer:
+    """Serializer using the standard library `json` module."""
+
+    name = SERIALIZER_JSON
+
+    def dumps(self, data: Any) -> str:
+        """Return the data as a JSON string."""
+        return json.dumps(data, default=_default)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """Serializer using `orjson`, which returns compact JSON."""
+
+    name = SERIALIZER_ORJSON
+
+    def dumps(self, data: Any) -> str:
+        """Return the data as a JSON string."""
+        try:
+            return orjson.dumps(data, default=_default).decode()
+        except TypeError:
+            # Types orjson doesn't know about (or integers larger than 64 bit)
+            return json.dumps(
+                data, separators=(",", ":"), ensure_ascii=False, default=_default
+            )
+
+
+def get_serializer(name: str | None = None) -> JsonSerializer:
+    """Return the serializer with the given name, or the fastest one available."""
+    if not name:
+        name = SERIALIZER_JSON if orjson is None else SERIALIZER_ORJSON
+    if name == SERIALIZER_ORJSON:
+        if orjson is not None:
+            return OrjsonSerializer()
+        _LOGGER.warning("orjson is not installed. Using the json module instead")
+    elif name != SERIALIZER_JSON:
+        _LOGGER.warning("Unknown JSON serializer %s. Using the json module", name)
+    return JsonSerializer()
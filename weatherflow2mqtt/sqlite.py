@@ -30,6 +30,7 @@ from .const import (
     STRIKE_COUNT_TIMER,
     TABLE_HIGH_LOW,
     TABLE_LIGHTNING,
+    TABLE_MIGRATIONS,
     TABLE_PRESSURE,
     TABLE_STORAGE,
     UNITS_IMPERIAL,
@@ -51,7 +52,9 @@ class SQLFunctions:
     def create_connection(self, db_file):
         """Create a database connection to a SQLite database."""
         try:
-            self.connection = sqlite3.connect(db_file)
+            # The database is opened in a worker thread at startup, and only
+            # used from the event loop after that
+            self.connection = sqlite3.connect(db_file, check_same_thread=False)
 
         except SQLError as e:
             _LOGGER.error("Could not create SQL Database. Error: %s", e)
@@ -482,6 +485,7 @@ class SQLFunctions:
                 self.create_table(TABLE_LIGHTNING)
                 self.create_table(TABLE_PRESSURE)
                 self.create_table(TABLE_HIGH_LOW)
+                self.create_table(TABLE_MIGRATIONS)
 
                 # Store Initial Data
                 storage = (STORAGE_ID, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
@@ -514,21 +518,19 @@ class SQLFunctions:
                 # Add Initial data to High Low
                 self.initializeHighLow()
 
-            if db_version < DATABASE_VERSION:
+            if db_version < 2:
                 _LOGGER.info("Upgrading the database to version 2")
                 cursor.execute("ALTER TABLE high_low ADD max_yday REAL")
                 cursor.execute("ALTER TABLE high_low ADD max_yday_time REAL")
                 cursor.execute("ALTER TABLE high_low ADD min_yday REAL")
                 cursor.execute("ALTER TABLE high_low ADD min_yday_time REAL")
 
-                self.connection.commit()
+            if db_version < 3:
+                _LOGGER.info("Upgrading the database to version 3")
+                self.create_table(TABLE_MIGRATIONS)
 
-                # if db_version < 2:
-                #     _LOGGER.info("Upgrading the database to version 2")
-                #     cursor.execute("ALTER TABLE high_low ADD max_yday REAL")
-                #     cursor.execute("ALTER TABLE high_low ADD max_yday_time REAL")
-                #     cursor.execute("ALTER TABLE high_low ADD min_yday REAL")
-                #     cursor.execute("ALTER TABLE high_low ADD min_yday_time REAL")
+            if db_version < DATABASE_VERSION:
+                self.connection.commit()
 
                 # if db_version < DATABASE_VERSION:
                 #     _LOGGER.info("Upgrading the database to version %s...", DATABASE_VERSION)
@@ -542,6 +544,27 @@ class SQLFunctions:
         except Exception as e:
             _LOGGER.error("An undefined error occured. Error message: %s", e)
 
+    def readMigration(self, name: str) -> bool:
+        """Return `True` if the one-time migration with the name has been done."""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT 1 FROM migrations WHERE name = ?;", (name,))
+            return cursor.fetchone() is not None
+        except SQLError as e:
+            _LOGGER.error("Could not access migrations data. Error: %s", e)
+            return False
+
+    def writeMigration(self, name: str):
+        """Record that the one-time migration with the name has been done."""
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO migrations(name, timestamp) VALUES(?, ?);",
+                    (name, time.time()),
+                )
+        except SQLError as e:
+            _LOGGER.error("Could not Insert data in table migrations. Error: %s", e)
+
     def initializeHighLow(self):
         """Write Initial Data to the High Low Tabble."""
         try: